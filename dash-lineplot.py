@@ -38,6 +38,15 @@ according to the Excel config file specifications.
 In the present script the default config filename is './dash-config.xlsx'.
 Any other filename can be provided on the commandline using the -f input flag.
 
+The html graph files can also be written without starting the window or the server, 
+e.g. in nightly batch jobs, using the --export-only flag. The files are written in 
+parallel by a pool of processes (-w sets the number) and a timing summary is printed:
+    python dash-lineplot.py -f ./dash-config.xlsx --export-only -w 4
+
+The heavy modules (pandas, numpy, Qt, dash, plotly, scipy) are only imported on the code 
+paths that need them. The --profile-startup flag prints the time taken by each import 
+and the startup milestones (window shown, config loaded, data loaded, ...).
+
 Dash starts a Flask server at the specified port, so the browser must be 
 pointing to the appropriate port number
 localhost:port
@@ -49,6 +58,11 @@ This module requires the following data in the current directory:
  * assets/bWLwgP.css
 
 It will create folder 'graphs' for output. 
+The html files in this folder load plotly.js from the plotly.min.js file written once 
+into the same folder, copy the whole folder when the graphs are shared.
+A hash of each exported figure is kept in graphs/manifest.json: unchanged graphs are 
+not written again and files of graphs no longer in the config are removed. Each file 
+is recorded with the config that wrote it, files of other configs are never removed.
 
 There are numerous Dash and Plotly resources on the Internet:
 https://dash.plot.ly/integrating-dash
@@ -191,38 +205,158 @@ __author__='CJ & MS Willers'
 
 import sys, os
 import threading
-import pandas as pd
-import openpyxl as oxl
-import numpy as np
 import datetime   
 import itertools 
+import time
+
+# time reference for the --profile-startup report
+tLaunch = time.perf_counter()
+
+##########################################
+class LazyModule():
+    """
+    Stand-in for a module that is only imported when first used.
+
+    The heavy modules are imported on first attribute access, i.e. on the code path 
+    that needs them. In the PyInstaller bundle each import is a cold disk read,
+    deferring the imports gets the window on the screen sooner.
+    """
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            __import__(self._name)
+            self._module = sys.modules[self._name]
+        return getattr(self._module, attr)
+
+pd = LazyModule('pandas')
+np = LazyModule('numpy')
+
+# import times and startup milestones, only printed with --profile-startup
+importTimes = {}
+startupMarks = []
+
+def profileImports():
+    """
+    Record the time taken by each top-level import from now on.
+
+    The time of nested imports is included in the time of the outermost import.
+
+    Args:
+        | None.
+
+    Returns:
+        | None.
+
+    """
+    import builtins
+    builtinImport = builtins.__import__
+    depth = [0]
+
+    def timedImport(name, globals=None, locals=None, fromlist=(), level=0):
+        if depth[0] > 0 or level > 0 or name in sys.modules:
+            return builtinImport(name, globals, locals, fromlist, level)
+        depth[0] += 1
+        tStart = time.perf_counter()
+        try:
+            return builtinImport(name, globals, locals, fromlist, level)
+        finally:
+            depth[0] -= 1
+            topName = name.split('.')[0]
+            importTimes[topName] = importTimes.get(topName, 0.) + time.perf_counter() - tStart
+
+    builtins.__import__ = timedImport
+
+def markStartup(label):
+    """
+    Record a startup milestone, the time is measured from launch.
+
+    Args:
+        | label (string): milestone description.
+
+    Returns:
+        | None.
+
+    """
+    startupMarks.append((label, time.perf_counter() - tLaunch))
+
+def printStartupReport():
+    """
+    Print the import times and startup milestones recorded.
+
+    Args:
+        | None.
+
+    Returns:
+        | None.
+
+    """
+    print('\nStartup profile')
+    print(f'{"seconds":>10}  import (1 ms or longer)')
+    for name, seconds in sorted(importTimes.items(), key=lambda item: -item[1]):
+        if seconds >= 0.001:
+            print(f'{seconds:10.3f}  {name}')
+    print(f'\n{"seconds":>10}  milestone (from launch)')
+    for label, seconds in startupMarks:
+        print(f'{seconds:10.3f}  {label}')
+    print('')
+
+# The Qt bindings and Dash (which starts Flask) are only imported when they are needed.
+# This allows the --export-only mode to run without a display, Qt or a web server.
+# See importQt() and the imports inside the methods using dash.
+QtWidgets = None
+QtCore = None
+QtWebEngineWidgets = None
+
+def importQt():
+    """
+    Import the Qt bindings on first use and define the Qt window classes.
+
+    PySide2 is preferred based on licensing restrictions of PyQt5.
+
+    Args:
+        | None.
+
+    Returns:
+        | None.
+
+    """
+    global QtWidgets, QtCore, QtWebEngineWidgets
+
+    if QtWidgets is not None:
+        return
 
-# PySide2 is preferred based on licensing restrictions of PyQt5
-try:
-    __import__('PySide2')
-    from PySide2 import QtWidgets
-    import PySide2.QtCore as QtCore
-    from PySide2 import QtWebEngineWidgets
-except ImportError:
     try:
-        __import__("PyQt5")
-        from PyQt5 import QtWidgets
-        import PyQt5.QtCore as QtCore
-        from PyQt5 import QtWebEngineWidgets
+        __import__('PySide2')
+        from PySide2 import QtWidgets
+        import PySide2.QtCore as QtCore
+        from PySide2 import QtWebEngineWidgets
     except ImportError:
-        print("This script requires Python 3 with either PySide2 or PyQt5")
-        exit(-1)
-            
-import dash
-from dash import dcc
-from dash import html
-from dash.dependencies import Input, Output, State
-from plotly import subplots
-import visdcc
+        try:
+            __import__("PyQt5")
+            from PyQt5 import QtWidgets
+            import PyQt5.QtCore as QtCore
+            from PyQt5 import QtWebEngineWidgets
+        except ImportError:
+            print("This script requires Python 3 with either PySide2 or PyQt5")
+            exit(-1)
+
+    defineQtClasses()
+
+def __getattr__(name):
+    """
+    Module level attribute hook: applications using this file as a module can still 
+    import the Qt window classes, i.e. from ... import DashPlotWindow
+    """
+    if name in ('WebViewer', 'DashPlotWindow'):
+        importQt()
+        return globals()[name]
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 external_stylesheets = ['assets/bWLwgP.css']
 
-pd.set_option('display.max_rows', 500)
 
 # https://stackoverflow.com/questions/55596932/how-can-i-include-assets-of-a-dash-app-into-an-exe-file-created-with-pyinstaller
 # when packaging the app with pyInstaller the assets folder is not included correctly
@@ -241,311 +375,4016 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 ################################################################
-class DashLinePlot():
+# Figures are plain dicts in the plotly figure format.
+# The helpers below build subplot figures and write html files without importing 
+# plotly.graph_objs or the plotly validators (over a thousand modules in the bundle).
+# Only the plotly.js bundle file is read from the plotly package folder.
 
-    def __init__(self):
-        """
-        Initialise class variables.
-        """
-        self.useCallbacks = True
+def subplotFigure(rows, rowHeights, verticalSpacing=0.075, xTitle='', subplotTitles=None):
+    """
+    Create a figure dict with subplots in one column sharing the x-axis,
+    the equivalent of plotly.subplots.make_subplots(rows, 1, shared_xaxes=True).
 
-        # storage for last 2 clicked point all graphs
-        self.clickedData = {}
+    Args:
+        | rows (int): number of subplot rows.
+        | rowHeights (list): relative height of each row, top to bottom.
+        | verticalSpacing (double): space between rows as fraction of the figure height.
+        | xTitle (string): x-axis title shown below the bottom row.
+        | subplotTitles (list): title of each subplot (default None).
 
-    ##########################################
-    def generateFeedbackBoxes(self, id, isMarkers):
-        """
-        Builds the div with the click and rectangle tool feedback boxes
+    Returns:
+        | figdict (dict): figure with empty data and a layout with the subplot axes.
 
-        Args:
-            | id (string): id string.
+    """
+    layout = {'annotations': []}
+
+    # row domains from the top, the space between rows is taken from the total height
+    plotHeight = 1. - verticalSpacing * (rows - 1)
+    total = float(sum(rowHeights))
+    top = 1.
+    for row in range(1, rows + 1):
+        height = plotHeight * rowHeights[row - 1] / total
+        domain = [max(top - height, 0.), top]
+        top = top - height - verticalSpacing
+
+        axisNum = '' if row == 1 else str(row)
+        layout[f'xaxis{axisNum}'] = {
+            'anchor': f'y{axisNum}',
+            'domain': [0., 1.],
+            'showticklabels': row == rows,
+        }
+        # all x-axes follow the bottom axis
+        if row != rows:
+            layout[f'xaxis{axisNum}']['matches'] = f'x{rows}'
+        layout[f'yaxis{axisNum}'] = {'anchor': f'x{axisNum}', 'domain': domain}
+
+        if subplotTitles is not None:
+            layout['annotations'].append({
+                'text': subplotTitles[row - 1], 'showarrow': False,
+                'xref': 'paper', 'yref': 'paper', 'x': 0.5, 'y': domain[1],
+                'xanchor': 'center', 'yanchor': 'bottom', 'font': {'size': 16},
+            })
+
+    if xTitle:
+        layout['annotations'].append({
+            'text': xTitle, 'showarrow': False,
+            'xref': 'paper', 'yref': 'paper', 'x': 0.5, 'y': 0., 'yshift': -30,
+            'xanchor': 'center', 'yanchor': 'top', 'font': {'size': 16},
+        })
+
+    return {'data': [], 'layout': layout}
+
+def addSubplotTrace(figdict, trace, row, yaxisProps=None):
+    """
+    Add a trace to a subplot row of a figure created with subplotFigure.
 
+    Args:
+        | figdict (dict): figure data.
+        | trace (dict): trace to be added, a copy is added to the figure.
+        | row (int): subplot row, starting from one.
+        | yaxisProps (dict): y-axis properties to be set for this row (default None).
 
-        Returns:
-            | thisDivList (list): list of html Divs.
+    Returns:
+        | None.
 
+    """
+    axisNum = '' if row == 1 else str(row)
+    figdict['data'].append(dict(trace, xaxis=f'x{axisNum}', yaxis=f'y{axisNum}'))
+    if yaxisProps is not None:
+        figdict['layout'][f'yaxis{axisNum}'].update(yaxisProps)
 
-        """
+def updateSubplotAxes(figdict, axis, axisProps):
+    """
+    Set properties on all the x-axes or y-axes of a figure.
 
-        # style definition for the data display boxes
-        boxStyle = {
-            'border': 'thin lightgrey solid',
-            'overflowX': 'scroll'
-        }
+    Args:
+        | figdict (dict): figure data.
+        | axis (string): 'xaxis' or 'yaxis'.
+        | axisProps (dict): properties to be set.
 
-        # Divs for click data and rectangle tool data feedback
-        # https://dash.plot.ly/interactive-graphing
-        # https://dash.plot.ly/dash-html-components/pre
+    Returns:
+        | None.
 
-        clickDiv = html.Div(
-                        [
-                            dcc.Markdown(""" **Click Data** """), 
-                            html.Pre(id='click-'+ id, style=boxStyle),
-                        ], 
-                        className='four columns'
-                    )
+    """
+    for key in figdict['layout']:
+        if key.startswith(axis):
+            figdict['layout'][key].update(axisProps)
 
-        rectangleDiv =  html.Div(
-                            [
-                                dcc.Markdown(""" **Rectangle Tool Selection Data** """),
-                                html.Pre(id='select-'+ id, style=boxStyle),
-                            ], 
-                            className='four columns'
-                        )
+def jsonDefault(obj):
+    """
+    json.dumps default function for the numpy and pandas objects used in figures.
 
-        if isMarkers:
-            return html.Div(className='row', children=[ clickDiv, rectangleDiv ])
-        else:
-            return html.Div(className='row', children=[ clickDiv ])
-                
+    Args:
+        | obj (object): object not serialisable by the json module.
 
-    def graphToDisk(self, figdict, fbasename):
-        """
-        Save the figure to disk as html
+    Returns:
+        | value (object): serialisable value.
 
-        Args:
-            | figdict (dict): figure data
-            | fbasename (string): file base name.
+    """
+    if hasattr(obj, 'tolist'):
+        # numpy arrays and scalars, pandas Series and Index
+        return obj.tolist()
+    raise TypeError(f'Object of type {type(obj).__name__} is not serialisable in a figure')
 
-        Returns:
-            | None.
+def figureToJson(obj):
+    """
+    Serialise (part of) a figure dict.
 
+    NaN values are written as NaN, which is valid in the javascript of the html files
+    and is drawn by plotly as a gap in the line.
 
-        """
-        # Save the figure to disk as html
-        import plotly.offline as offline
-        offline.plot(figdict,
-            auto_open=False, 
-            output_type='file', filename=f'{fbasename}.html', validate=False)
+    Args:
+        | obj (dict or list): figure data or layout.
 
+    Returns:
+        | json (string): serialised figure.
 
-    ##########################################
-    def makeGraphSet(self, dft, graph, reqStart = 0, reqEnd = 0):
-        """
-        Builds the set of graphs on this tab (requested from one sheet in xls) 
+    """
+    import json
+    return json.dumps(obj, default=jsonDefault, separators=(',', ':'))
 
-        Args:
-            | dft (pd.dataframe): info for this graph set.
-            | graph (string): graph set name, i.e. text following "graph-" in the sheet name.
-            | reqStart (double): starting x-value, default the beginning.
-            | reqEnd (double): ending x-value, default the end. 
+def plotlyJsPath():
+    """
+    Get the path to the plotly.js bundle in the plotly package, without importing plotly.
 
-        Returns:
-            | thisDivList (list): list of html Divs.
-            | grList (list): list of the symbolic names of all graphs in this set.
-            | xmin (double): minimum x value
-            | xmax (double): maximum x value
+    Returns:
+        | path (string): path to plotly.min.js.
 
-        """
-        #  colors
-        backgroundColor = 'aliceblue'
-        gridColour = 'lightgrey'
+    """
+    # in the PyInstaller bundle the plotly folder is included as data
+    path = resource_path(os.path.join('plotly', 'package_data', 'plotly.min.js'))
+    if not os.path.isfile(path):
+        # find_spec locates the top level package without executing it
+        import importlib.util
+        spec = importlib.util.find_spec('plotly')
+        path = os.path.join(spec.submodule_search_locations[0], 'package_data', 'plotly.min.js')
+    return path
+
+# plotly.js is read from disk once per process
+plotlyJs = None
+
+def getPlotlyJs():
+    """
+    Get the contents of the plotly.js bundle.
 
-        # get the header info from the header sheet in the config file
-        pagetop = dfPlotterHeader.loc['PageTop','Value'] if 'PageTop' in dfPlotterHeader.index else ''
-        pagebottom = self.dateCreated + ' ' + dfPlotterHeader.loc['PageBottom','Value'] if 'PageBottom' in dfPlotterHeader.index else ''
-        
-        # create graphs output folder if not exist
-        grDir = './graphs'
-        if not os.path.exists(grDir):
-            os.mkdir(grDir)
+    Returns:
+        | plotlyjs (string): plotly.js source.
 
-        # get subplot bolean from the input
-        # handle all graphs separately (default) or as subplots
-        useSubplots = False
-        if 'UseSubplots' in dft.index:
-            if not np.isnan(dft[(dft['Variable']=='UseSubplots')]['Value'].values[0]):
-                useSubplots = dft[(dft['Variable']=='UseSubplots')]['Value'].values[0]
+    """
+    global plotlyJs
+    if plotlyJs is None:
+        with open(plotlyJsPath(), 'r', encoding='utf-8') as fin:
+            plotlyJs = fin.read()
+    return plotlyJs
 
-        # It seems that with the latest python modules, the visdcc module is not compatibl any more
-        # We need to solve this issue
-        # For the time being the subplot functionality will be disabled
-        useSubplots = False  
-        print('\nSubplots functionality disabled\n')   
+def figureToHtml(figdict, divId='graph', plotlyJsSrc='plotly.min.js'):
+    """
+    Create an html page for a figure.
+    The page has the same structure as written by plotly.offline.plot.
 
-        # graphs to disk requested?
-        toDisk = True
-        if 'ToDisk' in dft.index:
-            if not np.isnan(dft[(dft['Variable']=='ToDisk')]['Value'].values[0]):
-                toDisk = dft[(dft['Variable']=='ToDisk')]['Value'].values[0]
+    By default the page loads plotly.js from a file next to it (see copyPlotlyJs), 
+    i.e. the ~3 MB plotly.js bundle is not repeated in every page.
 
-        # list of all graph names created here [passed back to calling function]
-        # these names are the id of a Graph Div on the page, used in callback functions to update the figure
-        grList = []
+    Args:
+        | figdict (dict): figure data.
+        | divId (string): id of the graph Div in the page.
+        | plotlyJsSrc (string): plotly.js file name relative to the page, 
+        |     None to include plotly.js in the page.
 
-        # list of all the line entries for this graph set
-        #  before building the page, all lines are first created and stored here
-        graphData = []
-     
-        # get the filename for this graph to get to the data in the dataframe
-        dfilename = dft[(dft['Variable']=='Datafile')]['Value'].values[0]
-        df = self.datafiles[dfilename]
+    Returns:
+        | html (string): html page.
 
-        # ------- x data preparation
+    """
+    data = figureToJson(figdict.get('data', []))
+    layout = figureToJson(figdict.get('layout', {}))
+
+    if plotlyJsSrc is None:
+        loadPlotlyJs = f'<script type="text/javascript">{getPlotlyJs()}</script>\n'
+    else:
+        loadPlotlyJs = f'<script charset="utf-8" src="{plotlyJsSrc}"></script>\n'
+
+    return (
+        '<html>\n<head><meta charset="utf-8" /></head>\n<body>\n    <div>'
+        '<script type="text/javascript">window.PlotlyConfig = {MathJaxConfig: \'local\'};</script>\n'
+        + loadPlotlyJs +
+        f'<div id="{divId}" class="plotly-graph-div" style="height:100%; width:100%;"></div>\n'
+        '<script type="text/javascript">'
+        'window.PLOTLYENV=window.PLOTLYENV || {};'
+        f'if (document.getElementById("{divId}")) {{'
+        f'Plotly.newPlot("{divId}", {data}, {layout}, {{"responsive": true}})'
+        '};</script>\n'
+        '    </div>\n</body>\n</html>'
+    )
 
-        # 1) get the name of the x parameter
-        xVarName = dft[dft['Variable']=='xValue']['Value'].values[0]
+def copyPlotlyJs(folder):
+    """
+    Copy plotly.min.js to the html output folder, if not already there.
 
-        # check requested x-range input validity and slice as requested
-        if reqStart < df[xVarName].values[0]:
-            reqStart = df[xVarName].values[0]
-        if reqEnd > df[xVarName].values[-1]:
-            reqEnd = df[xVarName].values[-1]
-        if reqEnd <= reqStart:
-            reqEnd = df[xVarName].values[-1]
-        df = df[(df[xVarName] >= reqStart) & (df[xVarName] <= reqEnd)]
+    Args:
+        | folder (string): html output folder.
 
-        #  2) get the graph set x hover text format from config
-        hfmt_x = '.4f' 
-        if isinstance(dft[dft['Variable']=='xLabel']['Format'].values[0], str):
-            hfmt_x = dft[dft['Variable']=='xLabel']['Format'].values[0]
+    Returns:
+        | None.
 
-        # 3) apply the required scale and offset    
-        if not np.isnan(dft[(dft['Variable']=='xValue')]['Scale'][0]):
-            xscale = float(dft[(dft['Variable']=='xValue')]['Scale'][0])
-        else:
-            xscale = 1.0
-            
-        if not np.isnan(dft[(dft['Variable']=='xValue')]['Offset'][0]):
-            xoffset = float(dft[(dft['Variable']=='xValue')]['Offset'][0])
-        else:
-            xoffset = 0.
+    """
+    import shutil
+    source = plotlyJsPath()
+    target = os.path.join(folder, 'plotly.min.js')
+    if not os.path.isfile(target) or os.path.getsize(target) != os.path.getsize(source):
+        shutil.copyfile(source, target + '.tmp')
+        os.replace(target + '.tmp', target)
+
+def writeGraphHtml(figdict, fbasename):
+    """
+    Write a figure to an html file that uses the plotly.js copy in the same folder.
 
-        xData = df[xVarName] * xscale + xoffset
+    The file is first written to a temporary file and then renamed,
+    an interrupted write never leaves a half written html file.
 
-        # 4) slider marks dictionary based on set events in the data
-        xmin = xData.min()
-        xmax = xData.max()
-        xsteps = 11
-        sliderMarks={str(t): f'{t:.4f}s' for t in np.linspace(xmin,xmax,xsteps,endpoint=True)}
+    Args:
+        | figdict (dict): figure data
+        | fbasename (string): file base name.
 
-        # 5) step size of the x-axis slider
-        xSliderStep = np.nan
-        if 'xSliderStep' in dft['Variable']:
-            xSliderStep =  dft[dft['Variable']=='xSliderStep']['Value'].values[0]           
-        if np.isnan(xSliderStep):
-            xSliderStep = round((xmax - xmin) / len(xData), 3)  
+    Returns:
+        | None.
 
-        #  6) all graphs on one page or tab have the same x label 
-        xLabel = dft.loc['xLabel','Value']
+    """
+    copyPlotlyJs(os.path.dirname(fbasename) or '.')
+    with open(f'{fbasename}.html.tmp', 'w', encoding='utf-8') as fout:
+        fout.write(figureToHtml(figdict))
+    os.replace(f'{fbasename}.html.tmp', f'{fbasename}.html')
 
-        # ------- y data preparation
+# change this when the html written by figureToHtml changes, all files are then rewritten
+htmlExportVersion = '1'
 
-        # list of yValue values from config, i.e. the name of each variable to plot 
-        yVariableList = []
+def figureHash(figdict):
+    """
+    Hash of the contents of a figure dict, used to skip writing unchanged html files.
 
-        # build the traces for all required variables in this graph set
-        for index, row in dft[(dft['Variable']=='yValue')].iterrows():
+    Arrays are hashed from their memory buffer, the figure is not serialised.
 
-            # add to yValue line list
-            yVariableList.append(index)
+    Args:
+        | figdict (dict): figure data
 
-            # y scale
-            if 'Scale' in row:
-                if not np.isnan(row['Scale']):
-                    yscale = row['Scale']
-                else:
-                    yscale = 1.0
+    Returns:
+        | hash (string): hex digest.
 
-            # y offset
-            if 'Offset' in row:
-                if not np.isnan(row['Offset']):
-                    yoffset = row['Offset']
-                else:
-                    yoffset = 0.
-                    
-            # each line in each graph must be a dict as follows:
-            plotMode = 'lines'
-            if 'Mode' in row:
-                #  a sting and not empty
-                if isinstance(row['Mode'], str) and not row['Mode'] == "":
-                    plotMode = row['Mode']
+    """
+    import hashlib
+    digest = hashlib.blake2b(htmlExportVersion.encode(), digest_size=16)
+
+    def walk(obj):
+        if isinstance(obj, dict):
+            digest.update(b'{')
+            for key in sorted(obj):
+                digest.update(repr(key).encode())
+                walk(obj[key])
+            digest.update(b'}')
+        elif isinstance(obj, (list, tuple)):
+            digest.update(b'[')
+            for item in obj:
+                walk(item)
+            digest.update(b']')
+        elif hasattr(obj, 'dtype') and hasattr(obj, 'shape'):
+            # numpy arrays and scalars, pandas Series
+            values = np.ascontiguousarray(getattr(obj, 'values', obj))
+            if values.dtype == object:
+                walk(values.tolist())
+            else:
+                digest.update(f'{values.dtype}{values.shape}'.encode())
+                digest.update(values.data)
+        else:
+            digest.update(repr(obj).encode())
 
-            opacity = 0
-            if 'MarkerOpacity' in row:
-                if not np.isnan(row['MarkerOpacity']):
-                    opacity = row['MarkerOpacity']
-                    
-            markerDict = { 'opacity': opacity }
+    walk(figdict)
+    return digest.hexdigest()
 
-            dLines = {
-                'x':xData,
-                'y':df[row['Value']] * yscale + yoffset,
-                'line':{},
-                'mode': plotMode,
-                'marker': markerDict,   # we do not want markers but need them for the rectangle tool to appear
-            }
+##########################################
+class ExportManifest():
+    """
+    Record of the figure hash of each html file written to a graphs folder.
 
-            # fill in non-default values
-            if not np.isnan(row['Linewidth']):
-                dLines['line']['width'] = row['Linewidth']
+    The manifest is stored as manifest.json in the folder. A figure with the same hash as the 
+    file on disk is not written again. The folder can be shared by several configs, each file is 
+    recorded with the config that wrote it. Files recorded for a config that are no longer produced 
+    by it are removed, files of other configs and other files in the folder are never touched.
+    """
+    def __init__(self, folder):
+        """
+        Load the manifest of a folder, an empty manifest if there is none.
 
-            if isinstance(row['Colour'], str):
-                dLines['line']['color'] = row['Colour']
+        Args:
+            | folder (string): html output folder.
 
-            if isinstance(row['Dash'], str):
-                dLines['line']['dash'] = row['Dash']
+        """
+        import json
+        self.folder = folder
+        self.filename = os.path.join(folder, 'manifest.json')
+        self.lock = threading.Lock()
+        self.hashes = {}
+        if os.path.isfile(self.filename):
+            try:
+                with open(self.filename, 'r') as fin:
+                    self.hashes = json.load(fin)
+            except ValueError:
+                print(f'Ignoring corrupt export manifest {self.filename}')
+        # earlier manifests only hold the hash, the config of these files is not known
+        self.hashes = {name: entry if isinstance(entry, dict) else {'hash': entry, 'config': None}
+                       for name, entry in self.hashes.items()}
+
+    def unchanged(self, fbasename, figHash):
+        """
+        Check if the html file on disk was written from the same figure.
 
-            if isinstance(row['GraphType'], str):
-                dLines['type'] = row['GraphType']
+        Args:
+            | fbasename (string): file base name.
+            | figHash (string): hash of the figure to be written.
 
-            if isinstance(row['LineLabel'], str):
-                dLines['name'] = row['LineLabel']
-            else:
-                dLines['name'] = row['Value']
+        Returns:
+            | unchanged (bolean): True if the file need not be written.
 
-            dLines['showlegend'] = True
+        """
+        name = os.path.basename(fbasename)
+        with self.lock:
+            return (self.hashes.get(name, {}).get('hash') == figHash 
+                    and os.path.isfile(f'{fbasename}.html'))
 
-            # add this line to other lines in this graph
-            graphData.append(dLines)
+    def record(self, fbasename, figHash, config):
+        """
+        Record the hash of a file that was written.
 
-        # ------- html Div's preparation
-        thisDivList = []
+        Args:
+            | fbasename (string): file base name.
+            | figHash (string): hash of the figure written.
+            | config (string): config file that produced the figure.
 
-        # 1) Div header: append the header text at the top of the page
-        thisDivList.append(
-            html.Div([dcc.Markdown(id=f'headerMarkdown-{graph}',children=pagetop)]),
-        )  
+        Returns:
+            | None.
+
+        """
+        with self.lock:
+            self.hashes[os.path.basename(fbasename)] = {'hash': figHash, 'config': config}
+
+    def removeStale(self, fbasenames, config):
+        """
+        Remove the html files recorded for a config that are not in the list of its current exports.
+
+        Args:
+            | fbasenames (list): file base names of all the current exports of the config in this folder.
+            | config (string): config file being run.
+
+        Returns:
+            | removed (list): names of the files removed.
+
+        """
+        keep = set(os.path.basename(fbasename) for fbasename in fbasenames)
+        removed = []
+        with self.lock:
+            for name in [name for name, entry in self.hashes.items() 
+                         if name not in keep and entry['config'] == config]:
+                del self.hashes[name]
+                filename = os.path.join(self.folder, f'{name}.html')
+                if os.path.isfile(filename):
+                    os.remove(filename)
+                    removed.append(filename)
+        return removed
+
+    def save(self):
+        """
+        Write the manifest to disk.
+        """
+        import json
+        with self.lock:
+            with open(self.filename + '.tmp', 'w') as fout:
+                json.dump(self.hashes, fout, indent=1, sort_keys=True)
+            os.replace(self.filename + '.tmp', self.filename)
+
+# one manifest per graphs folder in this process
+exportManifests = {}
+exportManifestsLock = threading.Lock()
+
+# config file of the exports, as recorded in the manifests, set when the config is loaded
+exportConfig = None
+
+def graphManifest(folder):
+    """
+    Get the export manifest of a graphs folder.
+
+    Args:
+        | folder (string): html output folder.
+
+    Returns:
+        | manifest (ExportManifest): manifest of the folder.
+
+    """
+    folder = os.path.normpath(folder)
+    with exportManifestsLock:
+        if folder not in exportManifests:
+            exportManifests[folder] = ExportManifest(folder)
+        return exportManifests[folder]
+
+##########################################
+class BackgroundWriter():
+    """
+    Writes html graph files on a background thread, the callers never wait for the disk.
+
+    A request for a file that is still waiting to be written replaces the earlier figure,
+    e.g. when the slider is moved several times only the last figure is written.
+    Figures identical to the file on disk (same hash in the folder manifest) are not written.
+    """
+    def __init__(self):
+        """
+        Initialise the writer, the thread is started on the first request.
+        """
+        # figures waiting to be written, keyed by file base name, in request order
+        self.pending = {}
+        self.busy = False
+        self.condition = threading.Condition()
+        self.thread = None
+        # manifests with files written but not yet saved
+        self.changedManifests = set()
+
+    def submit(self, figdict, fbasename):
+        """
+        Queue a figure to be written to html.
+
+        Args:
+            | figdict (dict): figure data
+            | fbasename (string): file base name.
+
+        Returns:
+            | None.
+
+        """
+        with self.condition:
+            self.pending.pop(fbasename, None)
+            self.pending[fbasename] = (figdict, exportConfig)
+            if self.thread is None:
+                import atexit
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+                # do not lose queued files when the application closes
+                atexit.register(self.flush)
+            self.condition.notify_all()
+
+    def run(self):
+        """
+        Writer thread: write the pending figures in request order.
+        """
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                fbasename = next(iter(self.pending))
+                figdict, config = self.pending.pop(fbasename)
+                self.busy = True
+            manifest = graphManifest(os.path.dirname(fbasename) or '.')
+            try:
+                figHash = figureHash(figdict)
+                if not manifest.unchanged(fbasename, figHash):
+                    writeGraphHtml(figdict, fbasename)
+                    manifest.record(fbasename, figHash, config)
+                    self.changedManifests.add(manifest)
+            except Exception as e:
+                print(f'Writing {fbasename}.html failed: {e}')
+
+            # save the manifests once the queue is empty
+            with self.condition:
+                queueEmpty = not self.pending
+            if queueEmpty:
+                while self.changedManifests:
+                    self.changedManifests.pop().save()
+
+            with self.condition:
+                self.busy = False
+                self.condition.notify_all()
+
+    def flush(self):
+        """
+        Wait until all the pending figures are written.
+        """
+        with self.condition:
+            while self.pending or self.busy:
+                self.condition.wait()
+
+# the writer used by graphToDisk
+htmlWriter = BackgroundWriter()
+
+def figureBytes(figdict):
+    """
+    Memory held by the data arrays of a figure dict.
+
+    Args:
+        | figdict (dict): figure data
+
+    Returns:
+        | nbytes (int): number of bytes in the arrays of all traces.
+
+    """
+    nbytes = 0
+    for trace in figdict.get('data', []):
+        for value in trace.values():
+            nbytes += getattr(value, 'nbytes', 0)
+    return nbytes
+
+def divSetBytes(divSet):
+    """
+    Memory held by the figure data arrays in a list of Dash components.
+
+    Args:
+        | divSet (list): list of html Divs.
+
+    Returns:
+        | nbytes (int): number of bytes in the arrays of all figures.
+
+    """
+    nbytes = 0
+    stack = list(divSet)
+    while stack:
+        component = stack.pop()
+        figure = getattr(component, 'figure', None)
+        if isinstance(figure, dict):
+            nbytes += figureBytes(figure)
+        children = getattr(component, 'children', None)
+        if isinstance(children, (list, tuple)):
+            stack.extend(children)
+        elif children is not None and not isinstance(children, str):
+            stack.append(children)
+    return nbytes
+
+##########################################
+def parallelMap(func, items, workers=None):
+    """
+    Apply a function to each item on a pool of threads, the results are returned in the order of the items.
+
+    The figure building is mostly spent in numpy and pandas, which release the GIL,
+    so that the graph sets of several tabs can be built at the same time.
+    The first exception raised by the function is raised again here.
+
+    Args:
+        | func (function): function of one argument.
+        | items (list): arguments.
+        | workers (int): number of threads (default None, i.e. the number of processors).
+
+    Returns:
+        | results (list): func(item) for each item.
+
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    items = list(items)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(items))
+    if workers <= 1:
+        return [func(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(func, items))
+
+##########################################
+class MemoryBudget():
+    """
+    Central account of the memory held by the plotter, shared by the data file cache and the tab cache.
+
+    Each item is registered with its category (source data, derived arrays or figures), its size, the time it took to create, i.e. the cost to rebuild it, and a function
+    that releases it from its owner. When the total exceeds the limit, items are released in order:
+    items not yet used by a request (e.g. prefetched tabs) first, then the cheapest to rebuild,
+    then the least recently used. The item being added is kept, even if it is larger than the limit.
+    Released items are rebuilt by their owner when requested again.
+    """
+    categories = ('source', 'derived', 'figure')
+
+    def __init__(self, maxBytes):
+        """
+        Initialise the account
+
+        Args:
+            | maxBytes (int): memory limit.
+
+        """
+        self.maxBytes = maxBytes
+        # key: [category, nbytes, cost, release, used, last use]
+        self.items = {}
+        self.clock = 0
+        self.lock = threading.Lock()
+
+    def add(self, key, category, nbytes, cost, release, used=True):
+        """
+        Register an item and release other items if the limit is exceeded.
+
+        Args:
+            | key (tuple): unique item key.
+            | category (string): one of MemoryBudget.categories.
+            | nbytes (int): memory held by the item.
+            | cost (double): time in seconds to rebuild the item.
+            | release (function): release() drops the item from its owner.
+            | used (bool): the item was requested, False for items prepared ahead of a request.
+
+        Returns:
+            | None.
+
+        """
+        with self.lock:
+            self.clock += 1
+            self.items[key] = [category, nbytes, cost, release, used, self.clock]
+            released = self.overLimit(key if used else None)
+        for release in released:
+            release()
+
+    def touch(self, key):
+        """
+        Mark an item as used now.
+
+        Args:
+            | key (tuple): item key.
+
+        Returns:
+            | None.
+
+        """
+        with self.lock:
+            item = self.items.get(key)
+            if item is not None:
+                self.clock += 1
+                item[4] = True
+                item[5] = self.clock
+
+    def discard(self, key):
+        """
+        Remove an item dropped by its owner, without calling its release function.
+
+        Args:
+            | key (tuple): item key.
+
+        Returns:
+            | None.
+
+        """
+        with self.lock:
+            self.items.pop(key, None)
+
+    def setLimit(self, maxBytes):
+        """
+        Change the memory limit, releasing items if required.
+
+        Args:
+            | maxBytes (int): memory limit.
+
+        Returns:
+            | None.
+
+        """
+        with self.lock:
+            self.maxBytes = maxBytes
+            released = self.overLimit(None)
+        for release in released:
+            release()
+
+    def overLimit(self, keep):
+        """
+        Remove items from the account until the total is within the limit. Called with the lock held,
+        the release functions are returned to be called once the lock is released.
+
+        Args:
+            | keep (tuple): key of the item that must stay, None to keep no item.
+
+        Returns:
+            | released (list): release functions of the removed items.
+
+        """
+        total = sum(item[1] for item in self.items.values())
+        released = []
+        if total <= self.maxBytes:
+            return released
+
+        order = sorted((key for key in self.items if key != keep),
+                       key=lambda key: (self.items[key][4], self.items[key][2], self.items[key][5]))
+        for key in order:
+            if total <= self.maxBytes:
+                break
+            _, nbytes, _, release, _, _ = self.items.pop(key)
+            total -= nbytes
+            released.append(release)
+        return released
+
+    def usage(self):
+        """
+        Current memory usage per category.
+
+        Returns:
+            | usage (dict): limit and total in bytes, and the number of items and bytes per category.
+
+        """
+        with self.lock:
+            categories = {category: {'items': 0, 'bytes': 0} for category in self.categories}
+            for category, nbytes, _, _, _, _ in self.items.values():
+                categories[category]['items'] += 1
+                categories[category]['bytes'] += int(nbytes)
+            return {'limit': int(self.maxBytes),
+                    'total': sum(usage['bytes'] for usage in categories.values()),
+                    'categories': categories}
+
+    def report(self):
+        """
+        Current memory usage as text, one line per category.
+
+        Returns:
+            | report (string): usage report.
+
+        """
+        usage = self.usage()
+        lines = [f'{"category":>10} {"items":>6} {"MB":>10}']
+        for category, catUsage in usage['categories'].items():
+            lines.append(f'{category:>10} {catUsage["items"]:6d} {catUsage["bytes"]/1024**2:10.1f}')
+        lines.append(f'{"total":>10} {"":>6} {usage["total"]/1024**2:10.1f}  of {usage["limit"]/1024**2:.0f} MB')
+        return '\n'.join(lines)
+
+# memory account of the data files, derived arrays and figures held by the plotter
+# the limit is set by MemoryLimitMB on the header sheet of the config
+memoryBudget = MemoryBudget(2048 * 1024**2)
+
+##########################################
+class ColumnStore():
+    """
+    Columns of a data file held as contiguous numpy arrays, pandas is only used to parse the file.
+
+    Metadata of each column (dtype, sortedness, uniform step, min and max) is evaluated on first use.
+    Rows in an x-value range are found by binary search when the x column is sorted, 
+    so that the columns are sliced as views without a boolean mask.
+    Indexing the store with a column name returns the array of the column, 
+    or of a derived column evaluated by the expression engine.
+    """
+    # numbers of the loads, a file read again gets a new number
+    loadNumbers = itertools.count()
+
+    def __init__(self, columns, filename=None):
+        """
+        Initialise the store
+
+        Args:
+            | columns (dict): column name: 1-D array, all of the same length.
+            | filename (string): data file name, None if not from a data file.
+
+        """
+        self.filename = filename
+        self.columns = {name: np.ascontiguousarray(values) for name, values in columns.items()}
+        self.length = len(next(iter(self.columns.values()))) if self.columns else 0
+        self.meta = {}
+        # the caches of derived data use the load number, not to serve the columns of an earlier load
+        self.loadNumber = next(ColumnStore.loadNumbers)
+
+    @classmethod
+    def fromDataFrame(cls, df, filename=None):
+        """
+        Create the store from a parsed dataframe.
+
+        Args:
+            | df (pd.DataFrame): dataframe with loaded data.
+            | filename (string): data file name.
+
+        Returns:
+            | store (ColumnStore): columns of the dataframe.
+
+        """
+        return cls({name: df[name].to_numpy() for name in df.columns}, filename)
+
+    def __getitem__(self, name):
+        # derived columns are evaluated on first use by the expression engine
+        if name in self.columns:
+            return self.columns[name]
+        return expressionEngine.column(self, name)
+
+    def __contains__(self, name):
+        return name in self.columns or expressionEngine.defines(self, name)
+
+    def __len__(self):
+        return self.length
+
+    def keys(self):
+        return self.columns.keys()
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.columns.values())
+
+    def info(self, name):
+        """
+        Metadata of a column, evaluated once.
+
+        Args:
+            | name (string): column name.
+
+        Returns:
+            | info (dict): 'dtype', 'sorted' (ascending, no NaN), 'step' (uniform step or None),
+            |     'min' and 'max' (NaN ignored, None if not numeric).
+
+        """
+        info = self.meta.get(name)
+        if info is not None:
+            return info
+
+        values = self[name]
+        info = {'dtype': values.dtype, 'sorted': False, 'step': None, 'min': None, 'max': None}
+        if values.dtype.kind in 'iuf' and len(values) > 0:
+            if values.dtype.kind != 'f' or not np.isnan(values).all():
+                info['min'] = np.nanmin(values)
+                info['max'] = np.nanmax(values)
+            steps = np.diff(values)
+            info['sorted'] = bool(np.all(steps >= 0))
+            if info['sorted'] and len(steps) > 0:
+                step = (values[-1] - values[0]) / len(steps)
+                if step > 0 and np.all(np.abs(steps - step) <= 1e-6 * step):
+                    info['step'] = step
+        self.meta[name] = info
+        return info
+
+    def rowRange(self, name, start, end):
+        """
+        Rows with start <= value <= end in a column.
+
+        Args:
+            | name (string): column name, normally the x-value.
+            | start (double): first value.
+            | end (double): last value.
+
+        Returns:
+            | rows (slice or array): a slice if the column is sorted, else the row numbers.
+
+        """
+        values = self[name]
+        if self.info(name)['sorted']:
+            return slice(np.searchsorted(values, start, side='left'), np.searchsorted(values, end, side='right'))
+        return np.flatnonzero((values >= start) & (values <= end))
+
+    def transformed(self, name, scale, offset):
+        """
+        Scale and offset a column, computed in place in one preallocated buffer.
+        A float column with scale 1 and offset 0 is returned as is.
+
+        Args:
+            | name (string): column name.
+            | scale (double): scale.
+            | offset (double): offset.
+
+        Returns:
+            | values (np.array): values * scale + offset, read only.
+
+        """
+        values = self[name]
+        dtype = np.result_type(values.dtype, float)
+        if scale == 1 and offset == 0 and values.dtype == dtype:
+            return values
+        out = np.empty(len(values), dtype=dtype)
+        np.multiply(values, scale, out=out)
+        np.add(out, offset, out=out)
+        out.flags.writeable = False
+        return out
+
+##########################################
+class TransformCache():
+    """
+    Scaled and offset data columns, shared by all the graphs using the same transform of a column.
+
+    A transform is computed once for the full column and held in the memory budget as derived data,
+    the graphs slice the cached column. Identity transforms return the column of the data file itself.
+    """
+    def __init__(self, budget):
+        """
+        Initialise the cache
+
+        Args:
+            | budget (MemoryBudget): memory account.
+
+        """
+        self.budget = budget
+        self.arrays = {}
+        self.lock = threading.Lock()
+
+    def column(self, datafile, store, name, scale, offset):
+        """
+        Return a column of a data file with scale and offset applied.
+
+        Args:
+            | datafile (string): data file name.
+            | store (ColumnStore): columns of the data file.
+            | name (string): column name.
+            | scale (double): scale.
+            | offset (double): offset.
+
+        Returns:
+            | values (np.array): values * scale + offset, read only.
+
+        """
+        key = (datafile, store.loadNumber, name, float(scale), float(offset), str(store[name].dtype))
+        with self.lock:
+            values = self.arrays.get(key)
+        if values is not None:
+            self.budget.touch(('derived', key))
+            return values
+
+        tStart = time.perf_counter()
+        values = store.transformed(name, scale, offset)
+        if values is store[name]:
+            return values
+
+        with self.lock:
+            self.arrays[key] = values
+        self.budget.add(('derived', key), 'derived', values.nbytes, time.perf_counter() - tStart,
+                        lambda: self.release(key, values))
+        return values
+
+    def release(self, key, values):
+        """
+        Drop a transformed column released by the memory budget, it is computed again when next used.
+        """
+        with self.lock:
+            if self.arrays.get(key) is values:
+                del self.arrays[key]
+
+# scaled columns shared by the graphs
+transformCache = TransformCache(memoryBudget)
+
+##########################################
+def difference(values):
+    """
+    Difference of successive values along the last axis, the first value is NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.empty(values.shape)
+    out[..., 0] = np.nan
+    np.subtract(values[..., 1:], values[..., :-1], out=out[..., 1:])
+    return out
+
+# functions and constants available in derived column expressions
+# vectors such as X[0..2] are stacked as (components, rows) arrays
+expressionFunctions = {
+    'abs': np.abs, 'sqrt': np.sqrt, 'exp': np.exp, 'log': np.log, 'log10': np.log10,
+    'sin': np.sin, 'cos': np.cos, 'tan': np.tan, 'asin': np.arcsin, 'acos': np.arccos, 
+    'atan': np.arctan, 'atan2': np.arctan2, 'sinh': np.sinh, 'cosh': np.cosh, 'tanh': np.tanh,
+    'deg': np.degrees, 'rad': np.radians, 'sign': np.sign, 'floor': np.floor, 'ceil': np.ceil,
+    'min': np.fmin, 'max': np.fmax, 'clip': np.clip, 'where': np.where, 'isnan': np.isnan,
+    'unwrap': np.unwrap, 'cumsum': np.cumsum, 'diff': difference,
+    'norm': lambda vector: np.sqrt(np.sum(np.square(vector), axis=0)),
+    'dot': lambda a, b: np.sum(np.multiply(a, b), axis=0),
+    'cross': lambda a, b: np.cross(a, b, axis=0),
+    'sum': lambda vector: np.sum(vector, axis=0),
+    'mean': lambda vector: np.mean(vector, axis=0),
+    'pi': np.pi, 'e': np.e, 'nan': np.nan,
+}
+
+##########################################
+# kinematics of derived columns, for whole columns at once
+# angles are in radians, yaw, pitch and roll in the z-y-x sequence from the world to the body frame 
+# rotation matrices are (3, 3, rows) arrays and vectors (3, rows) arrays
+
+def dcm(yaw, pit, rol):
+    """
+    Rotation matrices from the world to the body frame, for Euler angles yaw, pitch and roll.
+    """
+    yaw, pit, rol = np.broadcast_arrays(*[np.asarray(angle, dtype=float) for angle in (yaw, pit, rol)])
+    cy, sy = np.cos(yaw), np.sin(yaw)
+    cp, sp = np.cos(pit), np.sin(pit)
+    cr, sr = np.cos(rol), np.sin(rol)
+    return np.array([[cp * cy,                cp * sy,                -sp     ],
+                     [sr * sp * cy - cr * sy, sr * sp * sy + cr * cy, sr * cp],
+                     [cr * sp * cy + sr * sy, cr * sp * sy - sr * cy, cr * cp]])
+
+def quat(yaw, pit, rol):
+    """
+    Attitude quaternions (w, x, y, z) of the body frame in the world frame, for Euler angles.
+    The quaternion rotates vectors from the body to the world frame, dcm() is the matrix of its inverse.
+    """
+    yaw, pit, rol = np.broadcast_arrays(*[np.asarray(angle, dtype=float) for angle in (yaw, pit, rol)])
+    cy, sy = np.cos(np.multiply(yaw, 0.5)), np.sin(np.multiply(yaw, 0.5))
+    cp, sp = np.cos(np.multiply(pit, 0.5)), np.sin(np.multiply(pit, 0.5))
+    cr, sr = np.cos(np.multiply(rol, 0.5)), np.sin(np.multiply(rol, 0.5))
+    return np.array([cr * cp * cy + sr * sp * sy,
+                     sr * cp * cy - cr * sp * sy,
+                     cr * sp * cy + sr * cp * sy,
+                     cr * cp * sy - sr * sp * cy])
+
+def euler(rotation):
+    """
+    Euler angles (yaw, pitch, roll) of rotation matrices from the world to the body frame.
+    """
+    return np.array([np.arctan2(rotation[0, 1], rotation[0, 0]),
+                     -np.arcsin(np.clip(rotation[0, 2], -1., 1.)),
+                     np.arctan2(rotation[1, 2], rotation[2, 2])])
+
+def rotate(rotation, vector):
+    """
+    Rotation matrices applied to vectors.
+    """
+    return np.einsum('ijn,jn->in', rotation, vector)
+
+def matmul(a, b):
+    """
+    Products of rotation matrices, e.g. matmul(dcm(gimbal), dcm(body)) from world to gimbal frame.
+    """
+    return np.einsum('ijn,jkn->ikn', a, b)
+
+def transpose(rotation):
+    """
+    Inverse of rotation matrices.
+    """
+    return np.transpose(rotation, (1, 0, 2))
+
+def toBody(vector, yaw, pit, rol):
+    """
+    World frame vectors in the body frame given by Euler angles.
+    """
+    return rotate(dcm(yaw, pit, rol), vector)
+
+def toWorld(vector, yaw, pit, rol):
+    """
+    Body frame vectors in the world frame, the body frame given by Euler angles.
+    """
+    return np.einsum('jin,jn->in', dcm(yaw, pit, rol), vector)
+
+def azimuth(vector):
+    """
+    Azimuth angle of vectors, from x towards y.
+    """
+    return np.arctan2(vector[1], vector[0])
+
+def elevation(vector):
+    """
+    Elevation angle of vectors above the x-y plane, with z down.
+    """
+    return np.arctan2(-vector[2], np.hypot(vector[0], vector[1]))
+
+def toLos(vector, los):
+    """
+    Vectors in the line-of-sight frame of los vectors: x along the line of sight, 
+    rotated from the frame of both vectors by the azimuth and elevation of the line of sight.
+    """
+    return rotate(dcm(azimuth(los), elevation(los), 0.), vector)
+
+# relative geometry of two objects, from the relative position and velocity vectors
+
+def rangeRate(relpos, relvel):
+    """
+    Rate of change of the range.
+    """
+    return np.sum(relpos * relvel, axis=0) / np.sqrt(np.sum(relpos * relpos, axis=0))
+
+def timeToGo(relpos, relvel):
+    """
+    Time to the closest approach, if the relative velocity stays constant.
+    """
+    return -np.sum(relpos * relvel, axis=0) / np.sum(relvel * relvel, axis=0)
+
+def predictedMiss(relpos, relvel):
+    """
+    Miss distance at the closest approach, if the relative velocity stays constant.
+    """
+    return np.sqrt(np.sum(np.square(relpos + relvel * timeToGo(relpos, relvel)), axis=0))
+
+def closestApproach(t, relpos):
+    """
+    Time and distance of the closest approach, with the relative position linear between samples.
+
+    The closest point of every interval between samples is computed at once, 
+    the closest approach is the closest of these.
+
+    Args:
+        | t (np.array): times.
+        | relpos (np.array): (3, rows) relative positions.
+
+    Returns:
+        | tCPA (double): time of the closest approach, NaN if less than two samples.
+        | miss (double): distance at the closest approach.
+
+    """
+    if len(t) < 2:
+        return np.nan, np.nan
+    start = relpos[:, :-1]
+    change = np.diff(relpos, axis=1)
+    changeSq = np.sum(change * change, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fraction = np.where(changeSq > 0, -np.sum(start * change, axis=0) / changeSq, 0.)
+    fraction = np.clip(fraction, 0., 1.)
+    distance = np.sqrt(np.sum(np.square(start + change * fraction), axis=0))
+    interval = int(np.argmin(distance))
+    return t[interval] + fraction[interval] * (t[interval + 1] - t[interval]), distance[interval]
+
+expressionFunctions.update({
+    'dcm': dcm, 'quat': quat, 'euler': euler, 'rotate': rotate, 'matmul': matmul, 'transpose': transpose,
+    'toBody': toBody, 'toWorld': toWorld, 'azimuth': azimuth, 'elevation': elevation, 'toLos': toLos,
+    'rangeRate': rangeRate, 'timeToGo': timeToGo, 'predictedMiss': predictedMiss,
+})
+
+##########################################
+class ExpressionEngine():
+    """
+    Derived columns of the data files, defined by expressions of the columns of a file.
+
+    Derived columns are named on the Derived sheet of the config, or given directly as a 
+    yValue that is not a column of the data file, e.g. 'norm(Rel-loc-World[0..2])'. A leading 
+    '=' is accepted, but Excel reads such a cell as a formula. Column names are matched 
+    as the longest name of the data file (or derived column) at each position, X[a..b] stacks 
+    the columns X[a] to X[b] as a vector. 'dt' is the step of the first (time) column.
+    file('name', 'column') is a column of another data file, resampled linearly onto the 
+    first (time) column of the file.
+    
+    An expression is compiled once into a Python expression of whole columns, only the 
+    functions in expressionFunctions are allowed. A derived column is evaluated on first use 
+    with numpy and held in the memory budget as derived data.
+    """
+    def __init__(self, budget):
+        """
+        Initialise the engine
+
+        Args:
+            | budget (MemoryBudget): memory account.
+
+        """
+        import weakref
+        self.budget = budget
+        self.datafiles = {}
+        self.definitions = {}
+        self.compiled = {}
+        self.values = weakref.WeakKeyDictionary()
+        self.lock = threading.RLock()
+        self.evaluating = threading.local()
+
+    def setDefinitions(self, definitions):
+        """
+        Set the named derived columns, dropping all evaluated columns.
+
+        Args:
+            | definitions (dict): name: expression.
+
+        """
+        with self.lock:
+            self.definitions = dict(definitions)
+            self.compiled = {}
+            for store in list(self.values.keys()):
+                for name in list(self.values[store]):
+                    self.budget.discard(('derived', 'expression', id(store), name))
+            self.values.clear()
+
+    def expression(self, store, name):
+        """
+        Expression of a derived column name, None if not a derived column.
+
+        Names starting with '=' and names that are neither a column of the data file nor 
+        a named derived column are taken as the expression itself.
+        """
+        if not isinstance(name, str) or not name.strip():
+            return None
+        if name.startswith('='):
+            return name[1:]
+        if name in self.definitions:
+            return self.definitions[name]
+        return None if name in store.columns else name
+
+    def compile(self, store, expression, quiet=False):
+        """
+        Compile an expression for the columns of a data file, the result is kept for 
+        all files with the same columns.
+
+        Args:
+            | store (ColumnStore): columns of the data file.
+            | expression (string): expression.
+            | quiet (bolean): do not report an invalid expression, e.g. when checking if a name is a column.
+
+        Returns:
+            | compiled (tuple): (code, {placeholder: column name or list of vector column names}),
+            |     None if the expression is not valid for the columns.
+
+        """
+        import ast
+        import re
+
+        key = (expression, tuple(store.keys()))
+        with self.lock:
+            if key in self.compiled:
+                return self.compiled[key]
+
+        names = list(store.keys()) + [name for name in self.definitions if name not in store.columns]
+        namePattern = re.compile('|'.join(re.escape(name) for name in sorted(names, key=len, reverse=True)))
+        vectorPattern = re.compile(r'(?P<base>' + '|'.join(sorted({re.escape(name.rsplit('[', 1)[0]) 
+                                   for name in names if name.endswith(']')}, key=len, reverse=True)) +
+                                   r')\[(?P<first>\d+)\.\.(?P<last>\d+)\]')
+        wordChars = re.compile(r'[\w.]')
+
+        # replace the column names by placeholders, the longest name matches
+        columns = {}
+        text = []
+        pos = 0
+        while pos < len(expression):
+            # strings, e.g. the data file and column of file(), are kept as is
+            if expression[pos] in '\'"':
+                end = expression.find(expression[pos], pos + 1)
+                end = len(expression) if end < 0 else end + 1
+                text.append(expression[pos:end])
+                pos = end
+                continue
+            if pos == 0 or not wordChars.match(expression[pos - 1]):
+                match = vectorPattern.match(expression, pos) if '[' in expression else None
+                vector = None
+                if match and match.group('base'):
+                    vector = [f"{match.group('base')}[{i}]" for i in range(int(match.group('first')), int(match.group('last')) + 1)]
+                if not (vector and all(name in names for name in vector)):
+                    match = namePattern.match(expression, pos) if names else None
+                if match and match.end() > pos:
+                    following = expression[match.end():].lstrip()
+                    isFunction = match.group(0) in expressionFunctions and following.startswith('(')
+                    if not isFunction and not (match.end() < len(expression) and wordChars.match(expression[match.end()])):
+                        placeholder = f'_col{len(columns)}'
+                        columns[placeholder] = vector if vector and match.re is vectorPattern else match.group(0)
+                        text.append(placeholder)
+                        pos = match.end()
+                        continue
+            text.append(expression[pos])
+            pos += 1
+
+        # only arithmetic, comparisons and calls of the expression functions are allowed
+        compiled = None
+        try:
+            tree = ast.parse(''.join(text), mode='eval')
+            allowedNames = set(columns) | set(expressionFunctions) | {'dt', 'file'}
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Name):
+                    if node.id not in allowedNames:
+                        raise ValueError(f'unknown name {node.id}')
+                elif isinstance(node, ast.Call):
+                    if not (isinstance(node.func, ast.Name) and (node.func.id in expressionFunctions or node.func.id == 'file')):
+                        raise ValueError('only the expression functions can be called')
+                elif isinstance(node, (ast.BoolOp, ast.Not)):
+                    # and/or/not need a single truth value, which a column does not have
+                    raise ValueError('use &, | and ~ with brackets around the comparisons instead of and, or and not')
+                elif not isinstance(node, (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare,
+                                           ast.Constant, ast.Load, ast.operator, ast.unaryop, ast.cmpop, 
+                                           ast.keyword, ast.Subscript, ast.Slice, ast.Tuple)):
+                    raise ValueError(f'{type(node).__name__} not allowed')
+            compiled = (compile(tree, expression, 'eval'), columns)
+        except (SyntaxError, ValueError) as e:
+            if not quiet:
+                print(f'Derived column expression {expression} not valid for the data file: {e}')
+
+        with self.lock:
+            self.compiled[key] = compiled
+        return compiled
+
+    def defines(self, store, name):
+        """
+        True if the name is a derived column that can be evaluated for the data file.
+        """
+        expression = self.expression(store, name)
+        return expression is not None and self.compile(store, expression, quiet=True) is not None
+
+    def column(self, store, name):
+        """
+        Values of a derived column, evaluated on first use.
+
+        Args:
+            | store (ColumnStore): columns of the data file.
+            | name (string): derived column name or the expression.
+
+        Returns:
+            | values (np.array): column values, read only.
+
+        """
+        import weakref
+
+        with self.lock:
+            values = self.values.get(store, {}).get(name)
+        if values is not None:
+            self.budget.touch(('derived', 'expression', id(store), name))
+            return values
+
+        expression = self.expression(store, name)
+        compiled = None if expression is None else self.compile(store, expression, quiet=True)
+        if compiled is None:
+            raise KeyError(name)
+
+        # derived columns can use other derived columns, but not themselves
+        active = self.evaluating.__dict__.setdefault('names', set())
+        if (id(store), name) in active:
+            raise KeyError(f'{name} is defined in terms of itself')
+        active.add((id(store), name))
+        try:
+            tStart = time.perf_counter()
+            code, columns = compiled
+            namespace = dict(expressionFunctions)
+            for placeholder, column in columns.items():
+                namespace[placeholder] = np.vstack([store[c] for c in column]) if isinstance(column, list) else store[column]
+            if 'dt' in code.co_names:
+                namespace['dt'] = difference(store[next(iter(store.keys()))])
+            if 'file' in code.co_names:
+                namespace['file'] = lambda filename, column: self.otherFile(store, filename, column)
+            values = np.asarray(eval(code, {'__builtins__': {}}, namespace), dtype=float)
+        finally:
+            active.discard((id(store), name))
+
+        if values.ndim == 0:
+            values = np.full(len(store), float(values))
+        if values.shape != (len(store),):
+            raise KeyError(f'{name} does not evaluate to a column of the data file')
+        values.flags.writeable = False
+
+        with self.lock:
+            if store not in self.values:
+                weakref.finalize(store, self.forget, id(store))
+            self.values.setdefault(store, {})[name] = values
+        storeRef = weakref.ref(store)
+        self.budget.add(('derived', 'expression', id(store), name), 'derived', values.nbytes, 
+                        time.perf_counter() - tStart, lambda: self.release(storeRef, name, values))
+        return values
+
+    def otherFile(self, store, filename, column):
+        """
+        Column or vector of another data file, resampled linearly onto the time of the data file.
+        The time column of the other file has the same name if present, else it is its first column.
+
+        Args:
+            | store (ColumnStore): columns of the data file.
+            | filename (string): other data file.
+            | column (string): column name, X[a..b] for a vector, or a derived column.
+
+        Returns:
+            | values (np.array): column values or (components, rows) vector.
+
+        """
+        import re
+        other = self.datafiles[filename]
+        timeName = next(iter(store.keys()))
+        otherTime = timeName if timeName in other else next(iter(other.keys()))
+        match = re.fullmatch(r'(.+)\[(\d+)\.\.(\d+)\]', column)
+        names = [f'{match.group(1)}[{i}]' for i in range(int(match.group(2)), int(match.group(3)) + 1)] if match else [column]
+        aligned = [alignmentCache.column((filename, other, otherTime), name, (store.filename, store, timeName)) 
+                   for name in names]
+        return np.vstack(aligned) if match else aligned[0]
+
+    def release(self, storeRef, name, values):
+        """
+        Drop a derived column released by the memory budget, it is evaluated again when next used.
+        """
+        store = storeRef()
+        with self.lock:
+            if store is not None and self.values.get(store, {}).get(name) is values:
+                del self.values[store][name]
+
+    def forget(self, storeId):
+        """
+        Remove the derived columns of a data file no longer held from the memory budget.
+        """
+        with self.budget.lock:
+            keys = [key for key in self.budget.items if key[1:3] == ('expression', storeId)]
+        for key in keys:
+            self.budget.discard(key)
+
+# derived columns of the data files
+expressionEngine = ExpressionEngine(memoryBudget)
+
+##########################################
+# interpolation methods for traces taken from another data file
+alignmentMethods = ('linear', 'previous', 'nearest')
+
+def alignmentMap(tSource, tTarget, method='linear'):
+    """
+    Sample positions of a target time grid in a source time grid, found by binary search.
+
+    The map is shared by all the columns resampled between the same two grids.
+    Target times outside the source time range are marked invalid and give NaN, i.e. a gap in the line.
+
+    Args:
+        | tSource (np.array): source times, ascending.
+        | tTarget (np.array): target times.
+        | method (string): 'linear', 'previous' (sample and hold) or 'nearest'.
+
+    Returns:
+        | alignMap (tuple): lower source index, upper source index, weight of the upper sample and valid mask.
+
+    """
+    numSource = len(tSource)
+    upper = np.searchsorted(tSource, tTarget, side='right')
+    valid = (tTarget >= tSource[0]) & (tTarget <= tSource[-1])
+
+    if method == 'previous' or numSource == 1:
+        index0 = np.clip(upper - 1, 0, numSource - 1)
+        return index0, index0, None, valid
+
+    index0 = np.clip(upper - 1, 0, numSource - 2)
+    index1 = index0 + 1
+    dt = tSource[index1] - tSource[index0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight = np.where(dt > 0, (tTarget - tSource[index0]) / dt, 0.)
+
+    if method == 'nearest':
+        nearest = np.where(weight > 0.5, index1, index0)
+        return nearest, nearest, None, valid
+
+    return index0, index1, weight, valid
+
+def applyAlignment(alignMap, values):
+    """
+    Resample a source column with an alignment map.
+
+    Args:
+        | alignMap (tuple): map as returned by alignmentMap.
+        | values (np.array): source column.
+
+    Returns:
+        | aligned (np.array): column on the target time grid, NaN outside the source time range.
+
+    """
+    index0, index1, weight, valid = alignMap
+    aligned = values[index0].astype(float)
+    if weight is not None:
+        aligned += weight * (values[index1] - aligned)
+    aligned[~valid] = np.nan
+    aligned.flags.writeable = False
+    return aligned
+
+def storeAlignmentMap(store, timeName, tTarget, method='linear'):
+    """
+    Alignment map of a time column of a column store onto a target time grid.
+
+    Args:
+        | store (ColumnStore): columns of the source data file.
+        | timeName (string): time column name.
+        | tTarget (np.array): target times.
+        | method (string): one of alignmentMethods.
+
+    Returns:
+        | alignMap (tuple): map as returned by alignmentMap, followed by the sort order of unsorted 
+        |     source times (None if sorted), to be applied to the columns before the map.
+
+    """
+    tSource = store[timeName]
+    if store.info(timeName)['sorted']:
+        return alignmentMap(tSource, tTarget, method) + (None,)
+    # unsorted source times are ordered first, the map then indexes the ordered samples
+    order = np.argsort(tSource, kind='stable')
+    return alignmentMap(tSource[order], tTarget, method) + (order,)
+
+##########################################
+class DerivedCache():
+    """
+    Arrays derived from the data files, computed once and held in the memory budget as derived data.
+
+    Items are an array, or a tuple or dict of arrays. Released items are computed again when next used.
+    """
+    def __init__(self, budget):
+        """
+        Initialise the cache
+
+        Args:
+            | budget (MemoryBudget): memory account.
+
+        """
+        self.budget = budget
+        self.items = {}
+        self.lock = threading.Lock()
+
+    def cached(self, key, compute, cost=None):
+        """
+        Return a cached item, computing and registering it when not present.
+
+        Args:
+            | key (tuple): unique item key.
+            | compute (function): compute() returns the item.
+            | cost (double): time in seconds to compute the item, default the time taken by compute().
+
+        Returns:
+            | item (object): cached item.
+
+        """
+        with self.lock:
+            item = self.items.get(key)
+        if item is not None:
+            self.budget.touch(('derived', key))
+            return item
+
+        tStart = time.perf_counter()
+        item = compute()
+        if cost is None:
+            cost = time.perf_counter() - tStart
+        arrays = item.values() if isinstance(item, dict) else item if isinstance(item, tuple) else [item]
+        nbytes = sum(getattr(array, 'nbytes', 0) for array in arrays)
+        with self.lock:
+            self.items[key] = item
+        self.budget.add(('derived', key), 'derived', nbytes, cost, lambda: self.release(key, item))
+        return item
+
+    def release(self, key, item):
+        """
+        Drop an item released by the memory budget, it is computed again when next used.
+        """
+        with self.lock:
+            if self.items.get(key) is item:
+                del self.items[key]
+
+##########################################
+class AlignmentCache(DerivedCache):
+    """
+    Columns of a data file resampled onto the time grid of another data file.
+
+    The alignment maps are cached per (source grid, target grid, method) and the resampled
+    columns per (source column, target grid, method), both held in the memory budget as derived data.
+    """
+    def column(self, source, name, target, method='linear'):
+        """
+        Return a column of the source file on the time grid of the target file.
+
+        Args:
+            | source (tuple): (file name, ColumnStore, time column name) of the source data.
+            | name (string): source column name.
+            | target (tuple): (file name, ColumnStore, time column name) of the target grid.
+            | method (string): one of alignmentMethods.
+
+        Returns:
+            | aligned (np.array): resampled column, read only.
+
+        """
+        sourceFile, sourceStore, sourceTime = source
+        targetFile, targetStore, targetTime = target
+        gridKey = ('align', sourceFile, sourceStore.loadNumber, sourceTime, 
+                   targetFile, targetStore.loadNumber, targetTime, method)
+
+        def computeMap():
+            return storeAlignmentMap(sourceStore, sourceTime, targetStore[targetTime], method)
+
+        def computeColumn():
+            *alignMap, order = self.cached(gridKey, computeMap)
+            values = sourceStore[name] if order is None else sourceStore[name][order]
+            return applyAlignment(alignMap, values)
+
+        return self.cached(gridKey + (name,), computeColumn)
+
+# columns resampled between data files
+alignmentCache = AlignmentCache(memoryBudget)
+
+# closest approach between trajectory files
+closestApproachCache = DerivedCache(memoryBudget)
+
+##########################################
+# number of histogram bins per time step, used to estimate the envelope percentiles
+envelopeBins = 128
+
+def envelopeStatistics(runFiles, xVarName, columns, grid, percentiles, workers=None):
+    """
+    Statistics of columns across runs, at each value of a common x-value grid.
+
+    The runs are read one at a time by a pool of worker processes and resampled (linear) onto the
+    grid. The results are reduced as they arrive, so that the memory used does 
+    not depend on the number of runs: the first pass keeps the count, minimum, maximum and the running
+    mean and variance (Welford), the second pass, only when percentiles are required, keeps a histogram 
+    between the minimum and maximum at each x-value, from which the percentiles are interpolated.
+    Runs not covering an x-value do not count at that x-value.
+
+    Args:
+        | runFiles (list): data file names.
+        | xVarName (string): x-value column.
+        | columns (list): column names.
+        | grid (np.array): common x-values.
+        | percentiles (list): percentiles to estimate.
+        | workers (int): number of worker processes (default None, i.e. the number of processors).
+
+    Returns:
+        | stats (dict): for each column a dict of arrays: 'count', 'min', 'max', 'mean', 'std' 
+        |     (sample standard deviation) and 'p<percentile>', NaN where no run has a value.
+
+    """
+    import itertools
+    from concurrent.futures import ProcessPoolExecutor
+
+    numGrid = len(grid)
+
+    def reduced(limits=None):
+        # results of the runs in order, computed in the worker processes
+        args = (runFiles, itertools.repeat(xVarName), itertools.repeat(columns), 
+                itertools.repeat(grid), itertools.repeat(limits))
+        if (workers or os.cpu_count() or 1) <= 1:
+            yield from map(envelopeWorker, *args)
+            return
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(envelopeWorker, *args)
+
+    # first pass: count, min, max, mean and sum of squared deviations
+    stats = {column: {'count': np.zeros(numGrid, dtype=np.int64), 
+                      'min': np.full(numGrid, np.nan), 'max': np.full(numGrid, np.nan), 
+                      'mean': np.zeros(numGrid), 'm2': np.zeros(numGrid)} for column in columns}
+    for result in reduced():
+        for column in columns:
+            colStats, values = stats[column], result[column]
+            valid = ~np.isnan(values)
+            count = colStats['count'][valid] + 1
+            delta = values[valid] - colStats['mean'][valid]
+            colStats['mean'][valid] += delta / count
+            colStats['m2'][valid] += delta * (values[valid] - colStats['mean'][valid])
+            colStats['count'][valid] = count
+            np.fmin(colStats['min'], values, out=colStats['min'])
+            np.fmax(colStats['max'], values, out=colStats['max'])
+
+    for colStats in stats.values():
+        count = colStats['count']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            colStats['std'] = np.sqrt(np.where(count > 1, colStats.pop('m2') / (count - 1), 0.))
+        colStats['mean'][count == 0] = np.nan
+        colStats['std'][count == 0] = np.nan
+
+    if not percentiles:
+        return stats
+
+    # second pass: histogram of the values between the minimum and maximum at each x-value
+    limits = {column: (stats[column]['min'], stats[column]['max']) for column in columns}
+    histograms = {column: np.zeros((numGrid, envelopeBins), dtype=np.int32) for column in columns}
+    rowStart = np.arange(numGrid) * envelopeBins
+    for result in reduced(limits):
+        for column in columns:
+            binNum = result[column]
+            valid = binNum >= 0
+            # one value per x-value and run, the flat indices are unique
+            histograms[column].ravel()[rowStart[valid] + binNum[valid]] += 1
+
+    gridRows = np.arange(numGrid)
+    for column in columns:
+        colStats = stats[column]
+        lower, upper = limits[column]
+        width = (upper - lower) / envelopeBins
+        histogram = histograms[column]
+        cumulative = histogram.cumsum(axis=1)
+        count = colStats['count']
+
+        def orderStatistic(k):
+            # value of the k-th smallest sample (from 0), at the middle of its share of its bin
+            rank = k + 0.5
+            binNum = np.minimum((cumulative < rank[:, None]).sum(axis=1), envelopeBins - 1)
+            below = np.where(binNum > 0, cumulative[gridRows, binNum - 1], 0)
+            inBin = histogram[gridRows, binNum]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                fraction = np.clip(np.where(inBin > 0, (rank - below) / inBin, 0.), 0., 1.)
+            return lower + (binNum + fraction) * width
+
+        for p in percentiles:
+            # linear interpolation between the order statistics, as numpy.percentile
+            position = np.maximum(count - 1, 0) * p / 100.
+            k = np.floor(position)
+            value = orderStatistic(k)
+            value += (position - k) * (orderStatistic(np.minimum(k + 1, np.maximum(count - 1, 0))) - value)
+            value[count == 0] = np.nan
+            colStats[f'p{p:g}'] = value
+
+    return stats
+
+##########################################
+class EnvelopeCache(DerivedCache):
+    """
+    Envelope statistics of columns across the runs of multi-run graph sets.
+
+    The statistics are held in the memory budget as derived data, with the time taken to compute them
+    as cost, so that re-opening a tab does not read the runs again. The key includes the modification
+    time of the runs, a changed run is read again.
+    """
+    def stats(self, runFiles, xVarName, columns, grid, percentiles):
+        """
+        Return the envelope statistics of columns, computing those not in the cache in one reduction.
+
+        Args:
+            | runFiles (list): data file names, the first defines the grid.
+            | xVarName (string): x-value column.
+            | columns (list): column names.
+            | grid (np.array): x-values of the first run.
+            | percentiles (list): percentiles to estimate.
+
+        Returns:
+            | stats (dict): statistics of each column, see envelopeStatistics.
+
+        """
+        runKey = tuple((runFile, os.path.getmtime(runFile)) for runFile in runFiles)
+        keys = {column: ('envelope', runKey, xVarName, column, tuple(percentiles)) for column in columns}
+        # the statistics found are held here, they may be released by the budget in the meantime
+        with self.lock:
+            found = {column: self.items[keys[column]] for column in columns if keys[column] in self.items}
+        missing = [column for column in dict.fromkeys(columns) if column not in found]
+
+        computed, cost = {}, None
+        if missing:
+            tStart = time.perf_counter()
+            computed = envelopeStatistics(runFiles, xVarName, missing, grid, percentiles)
+            cost = (time.perf_counter() - tStart) / len(missing)
+
+        stats = {}
+        for column in dict.fromkeys(columns):
+            if column in found:
+                self.budget.touch(('derived', keys[column]))
+                stats[column] = found[column]
+            else:
+                stats[column] = self.cached(keys[column], lambda column=column: computed[column], cost)
+        return stats
+
+# envelope statistics of multi-run graph sets
+envelopeCache = EnvelopeCache(memoryBudget)
+
+##########################################
+def columnStatistics(values):
+    """
+    Statistics of an array, NaN values are ignored.
+
+    Args:
+        | values (np.array): values.
+
+    Returns:
+        | stats (list): count, min, max, sum, sum of squares, index of the peak absolute value 
+        |     (-1 if no value) and the peak absolute value.
+
+    """
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    if not valid.any():
+        return [0, np.nan, np.nan, 0., 0., -1, -1.]
+    absolute = np.where(valid, np.abs(values), -1.)
+    peak = int(absolute.argmax())
+    return [int(valid.sum()), np.nanmin(values), np.nanmax(values), float(values[valid].sum()),
+            float((values[valid] ** 2).sum()), peak, absolute[peak]]
+
+##########################################
+def firstValid(values, step=1024):
+    """
+    First value that is not NaN, reading the array in steps so that only the start is scanned.
+    """
+    for start in range(0, len(values), step):
+        chunk = values[start:start + step]
+        valid = np.flatnonzero(~np.isnan(chunk))
+        if len(valid) > 0:
+            return chunk[valid[0]]
+    return np.nan
+
+##########################################
+class BlockIndex():
+    """
+    Count, minimum, maximum, sums and peak of a column per block of rows.
+
+    The statistics of a range of rows combine the blocks inside the range with a scan
+    of the partial blocks at both ends, so that at most two blocks of values are read
+    whatever the length of the range. NaN values are ignored.
+    """
+    blockSize = 1024
+    chunkBlocks = 256
+
+    def __init__(self, values):
+        """
+        Build the index
+
+        Args:
+            | values (np.array): column values.
+
+        """
+        self.values = values
+        numBlocks = len(values) // self.blockSize
+        self.count = np.zeros(numBlocks, dtype=np.int64)
+        self.min = np.empty(numBlocks)
+        self.max = np.empty(numBlocks)
+        self.sum = np.empty(numBlocks)
+        self.sumsq = np.empty(numBlocks)
+        self.peakRow = np.zeros(numBlocks, dtype=np.int64)
+        self.peakAbs = np.empty(numBlocks)
+
+        # the blocks are indexed a chunk at a time, the temporary arrays do not grow with the column
+        for first in range(0, numBlocks, self.chunkBlocks):
+            last = min(first + self.chunkBlocks, numBlocks)
+            blocks = np.asarray(values[first * self.blockSize:last * self.blockSize], dtype=float).reshape(-1, self.blockSize)
+            valid = ~np.isnan(blocks)
+            absolute = np.where(valid, np.abs(blocks), -1.)
+            self.count[first:last] = valid.sum(axis=1)
+            self.min[first:last] = np.fmin.reduce(blocks, axis=1)
+            self.max[first:last] = np.fmax.reduce(blocks, axis=1)
+            self.sum[first:last] = np.where(valid, blocks, 0.).sum(axis=1)
+            self.sumsq[first:last] = np.where(valid, blocks * blocks, 0.).sum(axis=1)
+            self.peakRow[first:last] = absolute.argmax(axis=1) + np.arange(first, last) * self.blockSize
+            self.peakAbs[first:last] = absolute.max(axis=1)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.count, self.min, self.max, self.sum, self.sumsq, self.peakRow, self.peakAbs))
+
+    def scan(self, start, stop):
+        """
+        Statistics of rows start to stop (excluded), from the values.
+        """
+        stats = columnStatistics(self.values[start:stop])
+        if stats[5] >= 0:
+            stats[5] += start
+        return stats
+
+    def stats(self, start, stop):
+        """
+        Statistics of a range of rows.
+
+        Args:
+            | start (int): first row.
+            | stop (int): row after the last row.
+
+        Returns:
+            | stats (list): count, min, max, sum, sum of squares, row of the peak absolute value 
+            |     (-1 if no value) and the peak absolute value.
+
+        """
+        firstBlock = -(-start // self.blockSize)
+        lastBlock = min(stop // self.blockSize, len(self.count))
+        if firstBlock >= lastBlock:
+            return self.scan(start, stop)
+
+        parts = [self.scan(start, firstBlock * self.blockSize), self.scan(lastBlock * self.blockSize, stop)]
+        blocks = slice(firstBlock, lastBlock)
+        if self.count[blocks].any():
+            peakBlock = firstBlock + int(self.peakAbs[blocks].argmax())
+            parts.append([int(self.count[blocks].sum()), np.nanmin(self.min[blocks]), np.nanmax(self.max[blocks]),
+                          float(self.sum[blocks].sum()), float(self.sumsq[blocks].sum()), 
+                          int(self.peakRow[peakBlock]), self.peakAbs[peakBlock]])
+
+        parts = [part for part in parts if part[0] > 0]
+        if not parts:
+            return columnStatistics([])
+        peak = max(parts, key=lambda part: part[6])
+        return [sum(part[0] for part in parts), min(part[1] for part in parts), max(part[2] for part in parts),
+                sum(part[3] for part in parts), sum(part[4] for part in parts), peak[5], peak[6]]
+
+# block indices of the traces, used for the statistics of rectangle selections
+blockIndexCache = DerivedCache(memoryBudget)
+
+# spectra of the traces of a graph, by trace columns, x-range and method
+spectrumCache = DerivedCache(memoryBudget)
+
+# number of points of a trace in the spectrum graph
+spectrumPoints = 4000
+
+# cross-correlations of pairs of traces, by trace columns and x-range
+correlationCache = DerivedCache(memoryBudget)
+
+# bin edges and counts of the histogram traces, by trace columns, x-range and number of bins
+histogramCache = DerivedCache(memoryBudget)
+
+# number of bins of a histogram trace if not given in the GraphType
+histogramBins = 100
+
+# 2-D counts of the density traces, by trace columns, x-range, zoomed ranges and grid
+densityCache = DerivedCache(memoryBudget)
+
+# number of cells along each axis of a density trace if not given in the GraphType
+densityGrid = 200
+
+##########################################
+def expandDatafiles(value):
+    """
+    Data files named in a Datafile entry of the config.
+
+    The entry is a file name, a glob pattern (e.g. data/tp*.rgeo) or a list of these separated 
+    by commas or semicolons. Glob patterns are expanded in sorted order.
+
+    Args:
+        | value (string): Datafile entry.
+
+    Returns:
+        | filenames (list): data file names, a pattern not matching any file is returned as is.
+
+    """
+    import glob
+    import re
+
+    filenames = []
+    for item in re.split('[,;]', str(value)):
+        item = item.strip()
+        if not item:
+            continue
+        matches = sorted(glob.glob(item)) if any(c in item for c in '*?[') else []
+        for filename in matches or [item]:
+            if filename not in filenames:
+                filenames.append(filename)
+    return filenames
+
+def decimateMinMax(values, maxPoints):
+    """
+    Rows of a trace to plot within a point budget, keeping the minimum and maximum of each interval.
+
+    Args:
+        | values (np.array): y-values of the trace.
+        | maxPoints (int): maximum number of points.
+
+    Returns:
+        | rows (slice or np.array): all rows if within the budget, else the ascending row numbers kept.
+
+    """
+    numValues = len(values)
+    if numValues <= maxPoints:
+        return slice(None)
+
+    numBuckets = max(maxPoints // 2, 1)
+    size = -(-numValues // numBuckets)
+    padded = np.empty(numBuckets * size, dtype=float)
+    padded[:numValues] = values
+    padded[numValues:] = values[-1]
+    buckets = padded.reshape(numBuckets, size)
+    start = np.arange(numBuckets) * size
+    rows = np.concatenate([start + buckets.argmin(axis=1), start + buckets.argmax(axis=1)])
+    return np.unique(np.minimum(rows, numValues - 1))
+
+##########################################
+def histogramCounts(values, bins, lo, hi, rows=None, chunkRows=1 << 20):
+    """
+    Counts of the values in equal bins from lo to hi, the equivalent of np.histogram(values[rows], bins, (lo, hi)).
+
+    The values are binned in chunks with np.bincount, so that the memory used does not
+    grow with the length of the column. NaN values and values outside the range are not counted.
+
+    Args:
+        | values (np.array): values to count.
+        | bins (int): number of bins.
+        | lo (double): lower edge of the first bin.
+        | hi (double): upper edge of the last bin, included in the last bin.
+        | rows (slice or np.array): rows to count, default all.
+        | chunkRows (int): number of values binned at a time.
+
+    Returns:
+        | counts (np.array): number of values in each bin.
+
+    """
+    if rows is None or isinstance(rows, slice):
+        values = values[rows or slice(None)]
+        rows = None
+    counts = np.zeros(bins, dtype=np.int64)
+    scale = bins / (hi - lo)
+    for start in range(0, len(values) if rows is None else len(rows), chunkRows):
+        chunk = values[start:start + chunkRows] if rows is None else values[rows[start:start + chunkRows]]
+        chunk = np.asarray(chunk, dtype=float)
+        chunk = chunk[(chunk >= lo) & (chunk <= hi)]
+        index = ((chunk - lo) * scale).astype(np.int64)
+        np.minimum(index, bins - 1, out=index)
+        counts += np.bincount(index, minlength=bins)
+    return counts
+
+def histogram2dCounts(x, y, bins, xRange, yRange, chunkRows=1 << 20):
+    """
+    Counts of the points in a grid of equal cells, the equivalent of np.histogram2d(x, y, bins, (xRange, yRange)).
+
+    The points are binned in chunks with np.bincount on the flat cell number, so that the 
+    memory used does not grow with the number of points. Points with a NaN coordinate or 
+    outside the ranges are not counted.
+
+    Args:
+        | x (np.array): x-values of the points.
+        | y (np.array): y-values of the points.
+        | bins (tuple): number of cells along x and along y.
+        | xRange (tuple): lower and upper edge of the grid along x.
+        | yRange (tuple): lower and upper edge of the grid along y.
+        | chunkRows (int): number of points binned at a time.
+
+    Returns:
+        | counts (np.array): number of points in each cell, indexed [x cell, y cell].
+
+    """
+    nx, ny = bins
+    (xlo, xhi), (ylo, yhi) = xRange, yRange
+    counts = np.zeros(nx * ny, dtype=np.int64)
+    xscale = nx / (xhi - xlo)
+    yscale = ny / (yhi - ylo)
+    for start in range(0, len(x), chunkRows):
+        xc = np.asarray(x[start:start + chunkRows], dtype=float)
+        yc = np.asarray(y[start:start + chunkRows], dtype=float)
+        inside = (xc >= xlo) & (xc <= xhi) & (yc >= ylo) & (yc <= yhi)
+        ix = ((xc[inside] - xlo) * xscale).astype(np.int64)
+        iy = ((yc[inside] - ylo) * yscale).astype(np.int64)
+        np.minimum(ix, nx - 1, out=ix)
+        np.minimum(iy, ny - 1, out=iy)
+        counts += np.bincount(ix * ny + iy, minlength=nx * ny)
+    return counts.reshape(nx, ny)
+
+##########################################
+def crossCorrelation(a, b, step):
+    """
+    Normalised cross-correlation of two traces on the same uniform grid, computed with the FFT.
+
+    The correlation at lag k is the sum of a[i] * b[i + k], after removing the means and setting NaN 
+    values to zero, divided by the norms of the traces. A positive lag means b is delayed with 
+    respect to a. The lag of the largest absolute correlation is refined by a parabola through 
+    the peak and its neighbours.
+
+    Args:
+        | a (np.array): first trace.
+        | b (np.array): second trace.
+        | step (double): x step of the grid.
+
+    Returns:
+        | lags (np.array): lags in x units, from -(n-1) to n-1 steps.
+        | correlation (np.array): correlation coefficient at each lag.
+        | lag (double): lag of the peak.
+        | peak (double): correlation at the peak.
+
+    """
+    # scipy.fft is faster than numpy.fft and uses all cores
+    try:
+        import scipy.fft
+        size = scipy.fft.next_fast_len(2 * len(a) - 1, real=True)
+        rfft = lambda values: scipy.fft.rfft(values, size, workers=-1)
+        irfft = lambda spectrum: scipy.fft.irfft(spectrum, size, overwrite_x=True, workers=-1)
+    except ImportError:
+        size = 1 << (2 * len(a) - 2).bit_length()
+        rfft = lambda values: np.fft.rfft(values, size)
+        irfft = lambda spectrum: np.fft.irfft(spectrum, size)
+
+    a = np.nan_to_num(np.asarray(a, dtype=float) - np.nanmean(a))
+    b = np.nan_to_num(np.asarray(b, dtype=float) - np.nanmean(b))
+    numValues = len(a)
+    product = rfft(a)
+    np.conj(product, out=product)
+    product *= rfft(b)
+    circular = irfft(product)
+    norm = np.sqrt(np.sum(a * a) * np.sum(b * b))
+    correlation = np.concatenate([circular[size - numValues + 1:], circular[:numValues]]) / (norm if norm > 0 else 1.)
+    lags = np.arange(-(numValues - 1), numValues) * step
+
+    index = int(np.argmax(np.abs(correlation)))
+    offset = 0.
+    if 0 < index < len(correlation) - 1:
+        left, centre, right = correlation[index - 1:index + 2]
+        curvature = left - 2 * centre + right
+        if curvature != 0:
+            offset = float(np.clip(0.5 * (left - right) / curvature, -0.5, 0.5))
+    return lags, correlation, lags[index] + offset * step, correlation[index]
+
+##########################################
+def spectra(values, step, method='welch', segment=4096):
+    """
+    Single-sided spectra of traces sampled on the same uniform grid, computed for all traces at once.
+
+    The mean of each trace (or segment) is removed and NaN values are set to zero before a periodic 
+    Hann window is applied. The FFT method returns the amplitude spectrum of the full window. 
+    The Welch method returns the power spectral density, averaged over segments with 50% overlap,
+    with the same scaling as scipy.signal.welch.
+
+    Args:
+        | values (np.array): 2D array, one row per trace.
+        | step (double): x step of the grid.
+        | method (string): 'fft' or 'welch'.
+        | segment (int): Welch segment length, limited to the trace length.
+
+    Returns:
+        | frequencies (np.array): frequencies in cycles per x unit.
+        | spectrum (np.array): 2D array, one row per trace.
+
+    """
+    values = np.asarray(values, dtype=float)
+    numValues = values.shape[1]
+    if method == 'fft':
+        window = np.hanning(numValues + 1)[:-1]
+        centred = np.nan_to_num(values - np.nanmean(values, axis=1, keepdims=True))
+        spectrum = np.abs(np.fft.rfft(centred * window, axis=1)) * (2. / window.sum())
+        spectrum[:, 0] /= 2.
+        if numValues % 2 == 0:
+            spectrum[:, -1] /= 2.
+        return np.fft.rfftfreq(numValues, step), spectrum
+
+    segment = max(min(int(segment), numValues), 2)
+    window = np.hanning(segment + 1)[:-1]
+    segments = np.lib.stride_tricks.sliding_window_view(values, segment, axis=1)[:, ::segment - segment // 2]
+    centred = np.nan_to_num(segments - np.nanmean(segments, axis=2, keepdims=True))
+    power = np.abs(np.fft.rfft(centred * window, axis=2)) ** 2
+    spectrum = power.mean(axis=1) * (step / (window * window).sum())
+    spectrum[:, 1:None if segment % 2 else -1] *= 2.
+    return np.fft.rfftfreq(segment, step), spectrum
+
+##########################################
+# filters of the trace columns, all O(n) on whole columns
+# the x step of a filter is the median step of the time column
+
+def windowSums(cumulative, window):
+    """
+    Sums over centred windows of rows from a cumulative sum with a leading zero, 
+    with contiguous slices. The window is shortened at the ends.
+    """
+    numValues = len(cumulative) - 1
+    half = window // 2
+    if window > numValues:
+        start = np.arange(numValues) - half
+        return cumulative[np.clip(start + window, 0, numValues)] - cumulative[np.clip(start, 0, numValues)]
+    sums = np.empty(numValues, dtype=cumulative.dtype)
+    interior = numValues - window + 1
+    np.subtract(cumulative[window:], cumulative[:interior], out=sums[half:half + interior])
+    sums[:half] = cumulative[window - half:window] - cumulative[0]
+    sums[half + interior:] = cumulative[numValues] - cumulative[interior:numValues - half]
+    return sums
+
+def rollingMeanStd(values, window, std=True):
+    """
+    Centred rolling mean and standard deviation, from cumulative sums. NaN values are ignored,
+    the window is shortened at the ends of the column.
+
+    Args:
+        | values (np.array): column values.
+        | window (int): number of rows in the window.
+        | std (bool): also compute the standard deviation.
+
+    Returns:
+        | mean (np.array): rolling mean.
+        | std (np.array): rolling standard deviation, None if not requested.
+
+    """
+    values = np.asarray(values, dtype=float)
+    window = int(window)
+    missing = np.isnan(values)
+    anyMissing = missing.any()
+    # centred on the overall mean to keep the precision of the sums of squares
+    centre = np.nanmean(values) if not missing.all() else 0.
+    centred = values - centre
+    if anyMissing:
+        centred[missing] = 0.
+
+    def cumulative(column):
+        out = np.empty(len(column) + 1, dtype=float if column.dtype.kind == 'f' else np.int64)
+        out[0] = 0
+        np.cumsum(column, out=out[1:])
+        return out
+
+    count = windowSums(cumulative(~missing) if anyMissing else np.arange(len(values) + 1), window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = windowSums(cumulative(centred), window) / count
+        deviation = None
+        if std:
+            var = windowSums(cumulative(centred * centred), window) / count - mean * mean
+            deviation = np.sqrt(np.maximum(var, 0.))
+    return mean + centre, deviation
+
+def butterworth(values, step, cutoff, order=4, btype='low'):
+    """
+    Zero phase Butterworth filter, with scipy.signal.sosfiltfilt if available, else with the same 
+    magnitude response applied to the FFT of the column. NaN values are interpolated for the 
+    filter and set again in the result.
+
+    Args:
+        | values (np.array): column values.
+        | step (double): x step of the column.
+        | cutoff (double): cut-off frequency, in cycles per x unit.
+        | order (int): filter order.
+        | btype (string): 'low' or 'high'.
+
+    Returns:
+        | filtered (np.array): filtered values.
+
+    """
+    values = np.asarray(values, dtype=float)
+    nyquist = 0.5 / step
+    if not cutoff > 0:
+        print(f'Butterworth cut-off {cutoff} not above 0, not filtered')
+        return values
+    if not cutoff < nyquist:
+        print(f'Butterworth cut-off {cutoff} not below the Nyquist frequency {nyquist}, not filtered')
+        return values
+    if len(values) < 2:
+        return values
+    missing = np.isnan(values)
+    if missing.all():
+        return values
+    if missing.any():
+        rows = np.arange(len(values))
+        values = np.interp(rows, rows[~missing], values[~missing])
+
+    try:
+        import scipy.signal
+        sos = scipy.signal.butter(int(order), cutoff, btype=btype, fs=1. / step, output='sos')
+        filtered = scipy.signal.sosfiltfilt(sos, values, padlen=min(3 * (2 * len(sos) + 1), len(values) - 1))
+    except ImportError:
+        # the forward and backward filter has the squared magnitude of the Butterworth response
+        spectrum = np.fft.rfft(values)
+        ratio = np.fft.rfftfreq(len(values), step) / cutoff
+        with np.errstate(divide='ignore'):
+            ratio = ratio if btype == 'low' else 1. / ratio
+        spectrum *= 1. / (1. + ratio ** (2 * int(order)))
+        filtered = np.fft.irfft(spectrum, len(values))
+
+    filtered[missing] = np.nan
+    return filtered
+
+def filterChain(values, t, chain):
+    """
+    Apply a chain of filters to a column, e.g. 'movavg(25) | butter_lp(20Hz) | diff'.
+
+    The filters are movavg(rows), butter_lp(cutoff[, order]), butter_hp(cutoff[, order]),
+    diff (derivative to t) and int (integral over t from the first row). 
+    The cut-off frequencies are in cycles per unit of t, a trailing Hz is allowed.
+
+    Args:
+        | values (np.array): column values.
+        | t (np.array): time column.
+        | chain (string): filters separated by |.
+
+    Returns:
+        | filtered (np.array): filtered values, read only.
+
+    """
+    import re
+    values = np.asarray(values, dtype=float)
+    steps = np.diff(t)
+    step = float(np.nanmedian(steps)) if len(steps) else 1.
+    for stage in chain.split('|'):
+        match = re.fullmatch(r'\s*(\w+)\s*(?:\((.*)\))?\s*', stage)
+        if not match:
+            print(f'Filter {stage} not known, skipped')
+            continue
+        name = match.group(1).lower()
+        try:
+            args = [float(re.sub('hz$', '', arg.strip(), flags=re.I)) for arg in (match.group(2) or '').split(',') if arg.strip()]
+        except ValueError:
+            print(f'Filter {stage.strip()} has an argument that is not a number, skipped')
+            continue
+        if name == 'movavg' and args:
+            values = rollingMeanStd(values, max(int(args[0]), 1), std=False)[0]
+        elif name in ('butter_lp', 'butter_hp') and args:
+            values = butterworth(values, step, args[0], args[1] if len(args) > 1 else 4, 
+                                 'low' if name == 'butter_lp' else 'high')
+        elif name == 'diff':
+            values = np.gradient(values, t) if len(values) > 1 else np.full(len(values), np.nan)
+        elif name == 'int':
+            increments = np.nan_to_num(0.5 * (values[1:] + values[:-1]) * steps)
+            values = np.concatenate([[0.], np.cumsum(increments)])
+        else:
+            print(f'Filter {stage.strip()} not known, skipped')
+    values = np.array(values, dtype=float)
+    values.flags.writeable = False
+    return values
+
+# filtered trace columns and rolling bands, shared by all tabs
+filterCache = DerivedCache(memoryBudget)
+
+##########################################
+class StreamBuffer():
+    """
+    Write-only file object collecting the bytes written, emptied by the reader after each write.
+    Used to stream files of which the writer needs a file object.
+    """
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+##########################################
+def exportStream(columns, fmt, chunkRows=100000):
+    """
+    Generator of the bytes of an export file, a chunk of rows at a time, so that the file is never 
+    built in memory.
+
+    CSV files are written as text with a header line. NPZ files are zip files of one .npy array per 
+    column, written without compression. MAT files are written by scipy.io.savemat with compression 
+    in a separate thread, the bytes are passed on through a bounded queue. The thread stops when 
+    the generator is closed before the end, e.g. when the client disconnects.
+
+    Args:
+        | columns (list): (name, values) for each column, all with the same number of rows.
+        | fmt (string): 'csv', 'npz' or 'mat'.
+        | chunkRows (int): number of rows per chunk.
+
+    Returns:
+        | chunks (generator): bytes of the file.
+
+    """
+    import io
+    numRows = len(columns[0][1]) if columns else 0
+
+    if fmt == 'csv':
+        import csv
+        header = io.StringIO()
+        csv.writer(header, lineterminator='\n').writerow([name for name, _ in columns])
+        yield header.getvalue().encode()
+        # one format operation per chunk is faster than formatting row by row,
+        # 17 significant digits give back the exact double when read
+        rowFormat = ','.join(['%.17g'] * len(columns)) + '\n'
+        for start in range(0, numRows, chunkRows):
+            chunk = np.column_stack([values[start:start + chunkRows] for _, values in columns]).astype(float)
+            yield ((rowFormat * len(chunk)) % tuple(chunk.ravel())).encode()
+
+    elif fmt == 'npz':
+        import zipfile
+        stream = StreamBuffer()
+        names = set()
+        with zipfile.ZipFile(stream, 'w', zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for name, values in columns:
+                # unique array names
+                arrayName = name
+                while arrayName in names:
+                    arrayName += '_'
+                names.add(arrayName)
+
+                with zf.open(arrayName + '.npy', 'w', force_zip64=True) as entry:
+                    dtype = values.dtype if values.dtype.kind in 'biuf' else np.dtype(float)
+                    np.lib.format.write_array_header_1_0(entry, {'descr': np.lib.format.dtype_to_descr(dtype), 
+                                                                 'fortran_order': False, 'shape': (numRows,)})
+                    for start in range(0, numRows, chunkRows):
+                        entry.write(np.ascontiguousarray(values[start:start + chunkRows], dtype=dtype).tobytes())
+                        yield stream.take()
+        yield stream.take()
+
+    elif fmt == 'mat':
+        import queue
+        import re
+        from scipy.io import savemat
+
+        # the MAT file variables must be valid and unique names
+        variables = {}
+        for name, values in columns:
+            varName = re.sub(r'\W', '_', name)
+            if not re.match('[A-Za-z]', varName):
+                varName = 'v' + varName
+            while varName in variables:
+                varName += '_'
+            variables[varName] = values
+
+        chunks = queue.Queue(maxsize=16)
+        # set when the download ends early, the writer thread then stops and drops the columns
+        cancelled = threading.Event()
+
+        def put(item):
+            while not cancelled.is_set():
+                try:
+                    chunks.put(item, timeout=0.5)
+                    return
+                except queue.Full:
+                    pass
+            raise IOError('MAT export cancelled')
+
+        class QueueWriter(StreamBuffer):
+            def write(self, data):
+                put(bytes(data))
+                self.position += len(data)
+                return len(data)
+
+        def writer():
+            try:
+                savemat(QueueWriter(), variables, do_compression=True)
+            except Exception as e:
+                if cancelled.is_set():
+                    return
+                print(f'MAT export failed: {e}')
+            try:
+                put(None)
+            except IOError:
+                pass
+
+        threading.Thread(target=writer, daemon=True).start()
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            cancelled.set()
+
+##########################################
+class DataFileCache():
+    """
+    Data files used by the graphs, loaded once and held in the memory budget.
+
+    Files released by the memory budget are read again from disk when next used.
+    Indexing the cache with the file name returns the column store of the file.
+    """
+    def __init__(self, loader, budget):
+        """
+        Initialise the cache
+
+        Args:
+            | loader (function): loader(filename) returns the column store of a data file, or None.
+            | budget (MemoryBudget): memory account.
+
+        """
+        self.loader = loader
+        self.budget = budget
+        self.frames = {}
+        self.lock = threading.Lock()
+        # one load at a time per file, concurrent requests wait for the same load
+        self.loadLocks = {}
+
+    def __contains__(self, filename):
+        with self.lock:
+            return filename in self.frames
+
+    def __getitem__(self, filename):
+        with self.lock:
+            df = self.frames.get(filename)
+            loadLock = self.loadLocks.setdefault(filename, threading.Lock())
+        if df is not None:
+            self.budget.touch(('source', filename))
+            return df
+
+        with loadLock:
+            # loaded by another request while waiting?
+            with self.lock:
+                df = self.frames.get(filename)
+            if df is not None:
+                self.budget.touch(('source', filename))
+                return df
+
+            tStart = time.perf_counter()
+            df = self.loader(filename)
+            if df is None:
+                return None
+
+            with self.lock:
+                self.frames[filename] = df
+            self.budget.add(('source', filename), 'source', df.nbytes,
+                            time.perf_counter() - tStart, lambda: self.release(filename, df))
+
+        return df
+
+    def release(self, filename, df):
+        """
+        Drop a data file, it is read again on the next request.
+
+        Args:
+            | filename (string): data file name.
+            | df (ColumnStore): column store released, a newer load is kept.
+
+        Returns:
+            | None.
+
+        """
+        with self.lock:
+            if self.frames.get(filename) is df:
+                del self.frames[filename]
+
+##########################################
+class TabCache():
+    """
+    Contents of the tabs, built on first request and held in the memory budget.
+
+    When the memory limit is exceeded tabs are dropped and rebuilt when requested again. 
+    The tab being requested is always kept, even if it is larger than the limit.
+    Indexing the cache with the tab number returns the list of Divs of the tab.
+
+    Tabs built ahead of a request by the prefetcher are marked as not used, 
+    so that they are the first to be dropped.
+    """
+    def __init__(self, builder, numTabs, budget):
+        """
+        Initialise the cache
+
+        Args:
+            | builder (function): builder(tabNum) returns the Div list of a tab and its size in bytes.
+            | numTabs (int): number of tabs.
+            | budget (MemoryBudget): memory account.
+
+        """
+        self.builder = builder
+        self.numTabs = numTabs
+        self.budget = budget
+        # tabNum: divSet
+        self.entries = {}
+        self.lock = threading.Lock()
+        # one build at a time per tab, concurrent requests wait for the same build
+        self.buildLocks = [threading.Lock() for _ in range(numTabs)]
+
+    def __len__(self):
+        return self.numTabs
+
+    def __contains__(self, tabNum):
+        with self.lock:
+            return tabNum in self.entries
+
+    def __getitem__(self, tabNum):
+        return self.get(tabNum)
+
+    def cached(self, tabNum, recent):
+        """
+        Return the Div list of a tab if in the cache, marking it as used.
+        """
+        with self.lock:
+            divSet = self.entries.get(tabNum)
+        if divSet is not None and recent:
+            self.budget.touch(('figure', tabNum))
+        return divSet
+
+    def get(self, tabNum, recent=True):
+        """
+        Return the Div list of a tab, building it when not in the cache.
+
+        Args:
+            | tabNum (int): tab number.
+            | recent (bool): the tab is requested, else it is prepared ahead of a request.
+
+        Returns:
+            | divSet (list): list of html Divs.
+
+        """
+        divSet = self.cached(tabNum, recent)
+        if divSet is not None:
+            return divSet
+
+        with self.buildLocks[tabNum]:
+            # built by another request while waiting?
+            divSet = self.cached(tabNum, recent)
+            if divSet is not None:
+                return divSet
+
+            tStart = time.perf_counter()
+            divSet, nbytes = self.builder(tabNum)
+            self.insert(tabNum, divSet, nbytes, recent, time.perf_counter() - tStart)
+
+        return divSet
+
+    def insert(self, tabNum, divSet, nbytes, recent=True, cost=0.):
+        """
+        Store a built tab in the cache.
+
+        Args:
+            | tabNum (int): tab number.
+            | divSet (list): list of html Divs.
+            | nbytes (int): memory held by the figure data.
+            | recent (bool): the tab is requested, else it is prepared ahead of a request.
+            | cost (double): time in seconds taken to build the tab.
+
+        Returns:
+            | None.
+
+        """
+        with self.lock:
+            self.entries[tabNum] = divSet
+        self.budget.add(('figure', tabNum), 'figure', nbytes, cost, 
+                        lambda: self.release(tabNum, divSet), used=recent)
+
+    def prefetch(self, tabNum):
+        """
+        Build a tab ahead of its request, without displacing the tabs in use.
+
+        Args:
+            | tabNum (int): tab number.
+
+        Returns:
+            | None.
+
+        """
+        self.get(tabNum, recent=False)
+
+    def release(self, tabNum, divSet):
+        """
+        Drop a tab released by the memory budget, a newer build is kept.
+        """
+        with self.lock:
+            if self.entries.get(tabNum) is divSet:
+                del self.entries[tabNum]
+
+    def invalidate(self, tabNum):
+        """
+        Drop a tab from the cache, it is rebuilt on the next request.
+
+        Args:
+            | tabNum (int): tab number.
+
+        Returns:
+            | None.
+
+        """
+        with self.lock:
+            self.entries.pop(tabNum, None)
+        self.budget.discard(('figure', tabNum))
+
+################################################################
+class TabPrefetcher():
+    """
+    Low priority background worker, building tabs ahead of their request.
+
+    The worker only runs while no foreground callback is being served, and it only takes
+    up the next tab or job step between foreground requests. Each new plan replaces the previous one.
+    Background jobs are generators, stepped when there are no tabs left to prefetch.
+    """
+    def __init__(self, tabCache):
+        """
+        Initialise the worker, the thread is started with the first plan or job.
+
+        Args:
+            | tabCache (TabCache): cache holding the tabs.
+
+        """
+        self.tabCache = tabCache
+        # tab numbers to prefetch, in order
+        self.plan = []
+        # generators of background jobs, stepped in order
+        self.jobs = []
+        # number of foreground callbacks in progress
+        self.foreground = 0
+        self.stopped = False
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def start(self):
+        """
+        Start the worker thread if not running. Called with the condition held.
+        """
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def schedule(self, tabNums):
+        """
+        Replace the prefetch plan.
+
+        Args:
+            | tabNums (list): tab numbers to prefetch, in order of priority.
+
+        Returns:
+            | None.
+
+        """
+        with self.condition:
+            self.plan = list(tabNums)
+            self.start()
+            self.condition.notify_all()
+
+    def addJob(self, job):
+        """
+        Add a background job, run after the prefetch plan.
+
+        Args:
+            | job (generator): yields after each step.
+
+        Returns:
+            | None.
+
+        """
+        with self.condition:
+            self.jobs.append(job)
+            self.start()
+            self.condition.notify_all()
+
+    def foregroundStart(self):
+        with self.condition:
+            self.foreground += 1
+
+    def foregroundEnd(self):
+        with self.condition:
+            self.foreground -= 1
+            self.condition.notify_all()
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+    def run(self):
+        """
+        Worker loop: wait until idle, then prefetch the next planned tab or step the next job.
+        """
+        while True:
+            with self.condition:
+                while not self.stopped and (self.foreground > 0 or not (self.plan or self.jobs)):
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                if self.plan:
+                    tabNum, job = self.plan.pop(0), None
+                else:
+                    tabNum, job = None, self.jobs[0]
+
+            try:
+                if job is None:
+                    self.tabCache.prefetch(tabNum)
+                else:
+                    next(job)
+            except StopIteration:
+                with self.condition:
+                    self.jobs.remove(job)
+            except Exception as err:
+                print(f'Background tab preparation failed: {err}')
+                if job is not None:
+                    with self.condition:
+                        self.jobs.remove(job)
+
+# number of recently viewed tabs kept prepared, besides the neighbouring tabs
+prefetchRecentTabs = 3
+
+################################################################
+class DashLinePlot():
+
+    def __init__(self):
+        """
+        Initialise class variables.
+        """
+        self.useCallbacks = True
+
+        # storage for last 2 clicked point all graphs
+        self.clickedData = {}
+
+        # html files exported for the current config, used to remove stale exports
+        self.exportedFiles = set()
+
+        # source of the traces of each graph id, for the analysis of the full resolution data
+        self.traceRegistry = {}
+
+        # figure and density traces of each graph id with density traces, 
+        # (figure, [(trace number, source)]) to be binned again on zoom
+        self.densityGraphs = {}
+
+        # graph ids of which the traces are read out when clicking on a graph
+        self.readoutGraphs = {}
+
+        # Welch segment length of the spectra of each graph id
+        self.spectrumSegments = {}
+
+    ##########################################
+    def generateFeedbackBoxes(self, id, isMarkers, traceNames=()):
+        """
+        Builds the div with the click and rectangle tool feedback boxes
+
+        Args:
+            | id (string): id string.
+            | isMarkers (bool): rectangle tool present.
+            | traceNames (list): names of the traces that can be cross-correlated.
+
+
+        Returns:
+            | thisDivList (list): list of html Divs.
+
+
+        """
+
+        from dash import dcc
+        from dash import html
+
+        # style definition for the data display boxes
+        boxStyle = {
+            'border': 'thin lightgrey solid',
+            'overflowX': 'scroll'
+        }
+
+        # Divs for click data and rectangle tool data feedback
+        # https://dash.plot.ly/interactive-graphing
+        # https://dash.plot.ly/dash-html-components/pre
+
+        clickDiv = html.Div(
+                        [
+                            dcc.Markdown(""" **Click Data** """), 
+                            html.Pre(id='click-'+ id, style=boxStyle),
+                        ], 
+                        className='four columns'
+                    )
+
+        rectangleDiv =  html.Div(
+                            [
+                                dcc.Markdown(""" **Rectangle Tool Selection Data** """),
+                                html.Pre(id='select-'+ id, style=boxStyle),
+                            ], 
+                            className='four columns'
+                        )
+
+        # statistics of the traces in the x-range of the rectangle selection
+        statsDiv = html.Div(
+                        [
+                            dcc.Markdown(""" **Selection Statistics** """),
+                            html.Div(id='stats-'+ id, style=boxStyle),
+                        ], 
+                        className='twelve columns'
+                    )
+
+        # spectra of the traces in the rectangle selection or zoomed x-range, in a companion graph
+        spectrumDiv = html.Div(
+                        [
+                            html.Button('Spectrum', id='spectrum-button-'+ id, className='margin2'),
+                            dcc.RadioItems(id='spectrum-method-'+ id, 
+                                           options=[{'label': 'FFT', 'value': 'fft'}, 
+                                                    {'label': 'PSD (Welch)', 'value': 'welch'}],
+                                           value='welch', inline=True, className='margin2'),
+                            dcc.Graph(id='spectrum-'+ id, style={'display': 'none'}),
+                        ], 
+                        className='twelve columns'
+                    )
+
+        # download of the traces in the rectangle selection or zoomed x-range
+        exportDiv = html.Div(
+                        [
+                            html.A('Export data', id='export-'+ id, href=f'/export/{id}?format=csv', 
+                                   className='margin2'),
+                            dcc.RadioItems(id='export-format-'+ id, 
+                                           options=[{'label': 'CSV', 'value': 'csv'}, 
+                                                    {'label': 'NPZ', 'value': 'npz'},
+                                                    {'label': 'MAT', 'value': 'mat'}],
+                                           value='csv', inline=True, className='margin2'),
+                        ], 
+                        className='twelve columns'
+                    )
+
+        # cross-correlation of two traces in the rectangle selection or zoomed x-range
+        options = [{'label': name, 'value': i} for i, name in enumerate(traceNames)]
+        correlationDiv = html.Div(
+                        [
+                            html.Div(
+                                [
+                                    dcc.Dropdown(id='xcorr-first-'+ id, options=options, value=0, clearable=False,
+                                                 style={'width': '300px', 'display': 'inline-block'}),
+                                    dcc.Dropdown(id='xcorr-second-'+ id, options=options, value=1, clearable=False,
+                                                 style={'width': '300px', 'display': 'inline-block'}),
+                                    html.Button('Cross-correlation', id='xcorr-button-'+ id, className='margin2'),
+                                ]
+                            ),
+                            html.Pre(id='xcorr-result-'+ id, style=boxStyle),
+                            dcc.Graph(id='xcorr-'+ id, style={'display': 'none'}),
+                        ], 
+                        className='twelve columns'
+                    )
+
+        rows = [ html.Div(className='row', children=[ clickDiv, rectangleDiv ] if isMarkers else [ clickDiv ]) ]
+        if isMarkers:
+            rows.append(html.Div(className='row', children=[ statsDiv ]))
+        rows.append(html.Div(className='row', children=[ spectrumDiv ]))
+        if len(traceNames) > 1:
+            rows.append(html.Div(className='row', children=[ correlationDiv ]))
+        rows.append(html.Div(className='row', children=[ exportDiv ]))
+        return html.Div(children=rows)
+                
+
+    @staticmethod
+    def graphToDisk(figdict, fbasename):
+        """
+        Save the figure to disk as html, the file is written on a background thread
+
+        Args:
+            | figdict (dict): figure data
+            | fbasename (string): file base name.
+
+        Returns:
+            | None.
+
+
+        """
+        # Save the figure to disk as html
+        # plotly.offline.plot is not used to avoid importing the plotly graph objects
+        htmlWriter.submit(figdict, fbasename)
+
+
+    ##########################################
+    def usesSubplots(self, dft):
+        """
+        Get the subplot bolean of a graph set from the config
+
+        Args:
+            | dft (pd.dataframe): info for this graph set.
+
+        Returns:
+            | useSubplots (bolean): True if the graphs are subplots of one figure.
+
+        """
+        # get subplot bolean from the input
+        # handle all graphs separately (default) or as subplots
+        useSubplots = False
+        if 'UseSubplots' in dft.index:
+            if not np.isnan(dft[(dft['Variable']=='UseSubplots')]['Value'].values[0]):
+                useSubplots = dft[(dft['Variable']=='UseSubplots')]['Value'].values[0]
+
+        # It seems that with the latest python modules, the visdcc module is not compatibl any more
+        # We need to solve this issue
+        # For the time being the subplot functionality will be disabled
+        useSubplots = False  
+
+        return useSubplots
+
+    ##########################################
+    def xScaleOffset(self, dft):
+        """
+        Get the x-value scale and offset of a graph set from the config
+
+        Args:
+            | dft (pd.dataframe): info for this graph set.
+
+        Returns:
+            | xscale (double): x scale, default 1.
+            | xoffset (double): x offset, default 0.
+
+        """
+        if not np.isnan(dft[(dft['Variable']=='xValue')]['Scale'][0]):
+            xscale = float(dft[(dft['Variable']=='xValue')]['Scale'][0])
+        else:
+            xscale = 1.0
+            
+        if not np.isnan(dft[(dft['Variable']=='xValue')]['Offset'][0]):
+            xoffset = float(dft[(dft['Variable']=='xValue')]['Offset'][0])
+        else:
+            xoffset = 0.
+
+        return xscale, xoffset
+
+    ##########################################
+    def graphIds(self, dft, graph):
+        """
+        Get the ids of the Graph Divs of a graph set, without building the figures
+
+        Args:
+            | dft (pd.dataframe): info for this graph set.
+            | graph (string): graph set name, i.e. the sheet name.
+
+        Returns:
+            | grList (list): list of the symbolic names of all graphs in this set.
+
+        """
+        # for subplots we have only one Graph Div, named after the graph set
+        if self.usesSubplots(dft):
+            return [graph]
+
+        titleRows = dft[(dft['Variable']=='Title')]
+        return [graph+str(index).split('#')[1] for index in titleRows.index]
+
+    ##########################################
+    @staticmethod
+    def isEnvelope(row):
+        """
+        Check if a yValue row asks for the envelope statistics of its column across the runs
+
+        Args:
+            | row (pd.Series): yValue row of the config.
+
+        Returns:
+            | isEnvelope (bolean): True if GraphType is envelope.
+
+        """
+        return isinstance(row['GraphType'], str) and row['GraphType'].strip().lower() == 'envelope'
+
+    ##########################################
+    @staticmethod
+    def histogramType(row):
+        """
+        Check if a yValue row asks for the histogram of its column, binned on the server
+
+        The GraphType is histogram, optionally followed by the number of bins in brackets and
+        by +cdf for the cumulative distribution, e.g. histogram(50)+cdf.
+
+        Args:
+            | row (pd.Series): yValue row of the config.
+
+        Returns:
+            | bins (int): number of bins, None if the row is not a histogram.
+            | cumulative (bolean): True if the cumulative distribution is requested.
+
+        """
+        import re
+
+        graphType = row['GraphType'].strip().lower() if isinstance(row['GraphType'], str) else ''
+        match = re.fullmatch(r'histogram\s*(?:\(\s*(\d+)\s*\))?\s*(\+\s*cdf)?', graphType)
+        if match is None:
+            return None, False
+        bins = int(match.group(1)) if match.group(1) else histogramBins
+        return max(bins, 1), match.group(2) is not None
+
+    ##########################################
+    @staticmethod
+    def densityType(row):
+        """
+        Check if a yValue row asks for the density of its points against the x-values, as a heatmap
+
+        The GraphType is density, optionally followed by the number of cells along both axes, 
+        or along x and y separated by a comma, in brackets, e.g. density(300) or density(300,150).
+
+        Args:
+            | row (pd.Series): yValue row of the config.
+
+        Returns:
+            | bins (tuple): number of cells along x and y, None if the row is not a density.
+
+        """
+        import re
+
+        graphType = row['GraphType'].strip().lower() if isinstance(row['GraphType'], str) else ''
+        match = re.fullmatch(r'density\s*(?:\(\s*(\d+)\s*(?:,\s*(\d+)\s*)?\))?', graphType)
+        if match is None:
+            return None
+        nx = int(match.group(1)) if match.group(1) else densityGrid
+        ny = int(match.group(2)) if match.group(2) else nx
+        return max(nx, 1), max(ny, 1)
+
+    ##########################################
+    def graphRuns(self, dft):
+        """
+        Get the data files of a graph set, one for each run
+
+        Args:
+            | dft (pd.dataframe): info for this graph set.
+
+        Returns:
+            | runFiles (list): data file names.
+            | envelopeOnly (bolean): all the traces are envelopes across several runs, only the
+            |     first run is loaded for the x-values, the runs are read by the envelope statistics.
+
+        """
+        runFiles = expandDatafiles(dft[(dft['Variable']=='Datafile')]['Value'].values[0])
+        yRows = dft[(dft['Variable']=='yValue')]
+        envelopeOnly = len(runFiles) > 1 and len(yRows) > 0 and all(self.isEnvelope(row) for _, row in yRows.iterrows())
+        return runFiles, envelopeOnly
+
+    ##########################################
+    def xRange(self, dft):
+        """
+        Get the full x-value range of a graph set, after scale and offset, without building the figures
+
+        Args:
+            | dft (pd.dataframe): info for this graph set.
+
+        Returns:
+            | xmin (double): minimum x value
+            | xmax (double): maximum x value
+
+        """
+        runFiles, envelopeOnly = self.graphRuns(dft)
+        xVarName = dft[dft['Variable']=='xValue']['Value'].values[0]
+        xscale, xoffset = self.xScaleOffset(dft)
+        # the column limits are kept by the column store, no need to scale the whole column
+        # envelopes are drawn on the x-values of the first run
+        xValues = []
+        for dfilename in (runFiles[:1] if envelopeOnly else runFiles):
+            xInfo = self.datafiles[dfilename].info(xVarName)
+            xValues.extend([xInfo['min'], xInfo['max']])
+        xValues = np.array(xValues, dtype=float) * xscale + xoffset
+        return np.nanmin(xValues), np.nanmax(xValues)
+
+    ##########################################
+    def checkColumns(self, dft, graph, dfilename):
+        """
+        Check that the xValue and all yValues of a graph set are columns or valid expressions of their data files
+
+        Args:
+            | dft (pd.dataframe): info for this graph set.
+            | graph (string): sheet name.
+            | dfilename (string): data file of the graph set, the first run.
+
+        Returns:
+            | None.
+
+        Raises:
+            | ValueError: naming the sheet and row of the first empty or unknown column.
+
+        """
+        for index, row in dft[dft['Variable'].isin(['xValue', 'yValue'])].iterrows():
+            traceFile = row['Datafile'] if row['Variable'] == 'yValue' and isinstance(row.get('Datafile'), str) else dfilename
+            value = row['Value']
+            if not isinstance(value, str) or not value.strip() or value.startswith('#'):
+                raise ValueError(f"Sheet {graph}, row {index}: {row['Variable']} is empty or an Excel error ({value}). "
+                                 f"Expressions are entered without a leading '=', which Excel reads as a formula.")
+            store = self.datafiles[traceFile]
+            if store is not None and value not in store:
+                raise ValueError(f"Sheet {graph}, row {index}: {row['Variable']} {value} is neither a column "
+                                 f"of {traceFile} nor a valid expression of its columns.")
+
+    ##########################################
+    def sliderLimits(self, tabNum):
+        """
+        Get the limits of the x-value slider of a tab, read from the data files on first use
+
+        Args:
+            | tabNum (int): tab number in the page layout.
+
+        Returns:
+            | xmin (double): minimum x value
+            | xmax (double): maximum x value
+
+        """
+        if self.tabLimits[tabNum] is None:
+            self.tabLimits[tabNum] = self.xRange(self.tabConfigs[tabNum][0])
+        return self.tabLimits[tabNum]
+
+    ##########################################
+    def traceColumn(self, row, dfilename, xVarName, yscale, yoffset):
+        """
+        Get the y-values of a trace on the x-value grid of its graph set, after scale and offset
+
+        A trace can name its own data file in the Datafile column of its yValue row. The values are then
+        resampled onto the x-values of the graph set with the method in the Interpolation column 
+        (linear, previous or nearest, default linear). The time column of the trace data file is the 
+        x-value column of the graph set if present in that file, else its first column.
+        The filter chain in the Filter column is applied last, see filterChain().
+
+        Args:
+            | row (pd.Series): yValue row of the config.
+            | dfilename (string): data file of the graph set.
+            | xVarName (string): x-value column of the graph set.
+            | yscale (double): y scale.
+            | yoffset (double): y offset.
+
+        Returns:
+            | yValues (np.array): y-values for all rows of the graph set data file.
+
+        """
+        df = self.datafiles[dfilename]
+        traceFile = row['Datafile'] if isinstance(row.get('Datafile'), str) else dfilename
+
+        # the filter chain of the Filter column, applied after scale and offset
+        chain = row.get('Filter')
+        if isinstance(chain, str) and chain.strip():
+            # empty cells are NaN, which never compare equal in a key
+            interpolation = row.get('Interpolation') if isinstance(row.get('Interpolation'), str) else None
+            key = ('filter', dfilename, xVarName, row['Value'], traceFile, interpolation, 
+                   float(yscale), float(yoffset), chain.strip())
+            row = row.drop('Filter')
+            return filterCache.cached(key, lambda: filterChain(self.traceColumn(row, dfilename, xVarName, yscale, yoffset), 
+                                                               df[next(iter(df.keys()))], chain))
+
+        if traceFile == dfilename:
+            return transformCache.column(dfilename, df, row['Value'], yscale, yoffset)
+
+        method = 'linear'
+        if isinstance(row.get('Interpolation'), str):
+            if row['Interpolation'].strip().lower() in alignmentMethods:
+                method = row['Interpolation'].strip().lower()
+            else:
+                print(f"Interpolation {row['Interpolation']} for {row['Value']} not known, using linear")
+
+        traceStore = self.datafiles[traceFile]
+        traceTime = xVarName if xVarName in traceStore else next(iter(traceStore.keys()))
+        aligned = alignmentCache.column((traceFile, traceStore, traceTime), row['Value'], 
+                                        (dfilename, df, xVarName), method)
+        return transformCache.column(f'{traceFile}>{dfilename}:{method}', ColumnStore({row['Value']: aligned}), 
+                                     row['Value'], yscale, yoffset)
+
+    ##########################################
+    def envelopePercentiles(self, dft):
+        """
+        Get the envelope settings of a graph set from the config
+
+        EnvelopePercentiles on the sheet is a list of percentiles separated by commas, default 5. 
+        A percentile p draws the band from p to 100-p, 50 draws the median line.
+
+        Args:
+            | dft (pd.dataframe): info for this graph set.
+
+        Returns:
+            | percentiles (list): sorted percentiles required for the bands.
+
+        """
+        value = '5'
+        if 'EnvelopePercentiles' in dft.index:
+            value = dft.loc['EnvelopePercentiles','Value']
+        percentiles = set()
+        if isinstance(value, str) or not np.isnan(value):
+            for item in str(value).split(','):
+                if item.strip():
+                    p = float(item)
+                    percentiles.update([min(p, 100 - p), max(p, 100 - p)])
+        return sorted(percentiles)
+
+    ##########################################
+    def envelopeTraces(self, dLines, stats, gridRun, yscale, yoffset, dft):
+        """
+        Build the envelope traces of one yValue row across the runs of a multi-run graph set
+
+        The traces are, from the outside in: the min-max band, the percentile bands, 
+        the mean plus and minus EnvelopeSigma (on the sheet, default 2) standard deviations band,
+        the mean line and the median line (if 50 is in EnvelopePercentiles).
+
+        Args:
+            | dLines (dict): trace properties from the config, without data.
+            | stats (dict): envelope statistics of the column, see envelopeStatistics.
+            | gridRun (tuple): (data file, rows, x-values) of the first run, the grid of the statistics.
+            | yscale (double): y scale.
+            | yoffset (double): y offset.
+            | dft (pd.dataframe): info for this graph set.
+
+        Returns:
+            | traces (list): trace dicts.
+
+        """
+        _, rows, xData = gridRun
+        name = dLines['name']
+        colour = dLines['line'].get('color', 'steelblue')
+
+        sigma = 2.
+        if 'EnvelopeSigma' in dft.index and not np.isnan(dft.loc['EnvelopeSigma','Value']):
+            sigma = float(dft.loc['EnvelopeSigma','Value'])
+
+        def scaled(values):
+            return values[rows] * yscale + yoffset
+
+        def band(lower, upper, label, opacity):
+            # the lower edge is not drawn, the upper edge is filled down to the lower edge
+            lowerTrace = {'x': xData, 'y': scaled(lower), 'mode': 'lines', 'type': 'scatter',
+                          'line': {'width': 0, 'color': colour}, 'name': label, 'showlegend': False}
+            upperTrace = dict(lowerTrace, y=scaled(upper), fill='tonexty', fillcolor=colour, 
+                              opacity=opacity, showlegend=True)
+            return [lowerTrace, upperTrace]
+
+        traces = band(stats['min'], stats['max'], f'{name} min-max', 0.15)
+        for p in [p for p in self.envelopePercentiles(dft) if p < 50]:
+            traces += band(stats[f'p{p:g}'], stats[f'p{100 - p:g}'], f'{name} P{p:g}-P{100 - p:g}', 0.25)
+        traces += band(stats['mean'] - sigma * stats['std'], stats['mean'] + sigma * stats['std'], 
+                       f'{name} mean \u00b1 {sigma:g}\u03c3', 0.35)
+
+        meanTrace = dict(dLines, x=xData, y=scaled(stats['mean']), type='scatter', name=f'{name} mean')
+        traces.append(meanTrace)
+        if 'p50' in stats:
+            traces.append(dict(meanTrace, y=scaled(stats['p50']), name=f'{name} median', 
+                               line=dict(dLines['line'], dash='dot')))
+        return traces
+
+    ##########################################
+    def bandTraces(self, dLines, row, values, rows, xData, key):
+        """
+        Rolling mean plus and minus a number of standard deviations of a trace, as a filled band
+
+        The Band column of the yValue row is the number of rows in the window, optionally 
+        followed by a comma and the number of standard deviations (default 1).
+
+        Args:
+            | dLines (dict): trace properties from the config, without data.
+            | row (pd.Series): yValue row of the config.
+            | values (np.array): y-values of the trace, all rows of the data file.
+            | rows (slice or np.array): rows in the requested x-range.
+            | xData (np.array): x-values of the rows.
+            | key (tuple): key of the trace values, see sourceKey().
+
+        Returns:
+            | traces (list): lower and upper edge trace dicts, empty if no band requested.
+
+        """
+        band = row.get('Band')
+        if isinstance(band, str) and band.strip():
+            items = [float(item) for item in band.split(',')]
+        elif isinstance(band, (int, float)) and not np.isnan(band):
+            items = [float(band)]
+        else:
+            return []
+        window = max(int(items[0]), 2)
+        sigma = items[1] if len(items) > 1 else 1.
+
+        mean, std = filterCache.cached(('band',) + key + (window,), lambda: rollingMeanStd(values, window))
+        colour = dLines['line'].get('color', 'steelblue')
+        label = f"{dLines['name']} mean \u00b1 {sigma:g}\u03c3 ({window})"
+
+        # the lower edge is not drawn, the upper edge is filled down to the lower edge
+        lowerTrace = {'x': xData, 'y': (mean - sigma * std)[rows], 'mode': 'lines', 'type': 'scatter',
+                      'line': {'width': 0, 'color': colour}, 'name': label, 'showlegend': False}
+        upperTrace = dict(lowerTrace, y=(mean + sigma * std)[rows], fill='tonexty', fillcolor=colour, 
+                          opacity=0.25, showlegend=True)
+        return [lowerTrace, upperTrace]
+
+    ##########################################
+    def histogramTraces(self, dLines, row, runs, xVarName, yscale, yoffset, bins, cumulative, xRange):
+        """
+        Histogram of the y-values of one yValue row in the x-range, pooled over all the runs
+
+        The counts are binned on the server over all the rows in the x-range, a chunk at a time 
+        without copying the columns, only the bin centres, widths and counts are sent to the 
+        browser. The bins span the minimum to maximum of the values, from the block index 
+        of the trace if the rows are a slice.
+
+        Args:
+            | dLines (dict): trace properties from the config, without data.
+            | row (pd.Series): yValue row of the config.
+            | runs (list): (data file, rows, x-values) of each run.
+            | xVarName (string): x-value column of the graph set.
+            | yscale (double): y scale.
+            | yoffset (double): y offset.
+            | bins (int): number of bins.
+            | cumulative (bolean): add the cumulative distribution on the right-hand axis.
+            | xRange (tuple): requested start and end x-values, part of the cache key.
+
+        Returns:
+            | traces (list): bar trace of the counts and the cumulative distribution line if requested.
+
+        """
+        sources = [{'row': row, 'xVarName': xVarName, 'yscale': yscale, 'yoffset': yoffset, 'dfilename': dfilename}
+                   for dfilename, _, _ in runs]
+
+        def valueRange(source, values, rows):
+            if isinstance(rows, slice):
+                index = blockIndexCache.cached(self.sourceKey(source), lambda: BlockIndex(values))
+                count, lo, hi = index.stats(*rows.indices(len(values))[:2])[:3]
+                return (lo, hi) if count else None
+            lo, hi = np.inf, -np.inf
+            for start in range(0, len(rows), 1 << 20):
+                chunk = values[rows[start:start + (1 << 20)]]
+                if np.isfinite(chunk).any():
+                    lo, hi = min(lo, np.nanmin(chunk)), max(hi, np.nanmax(chunk))
+            return (lo, hi) if lo <= hi else None
+
+        def compute():
+            columns = [(source, self.traceColumn(row, source['dfilename'], xVarName, yscale, yoffset), rows) 
+                       for source, (_, rows, _) in zip(sources, runs)]
+            ranges = [valueRange(*column) for column in columns]
+            ranges = [r for r in ranges if r is not None]
+            if not ranges:
+                return None
+            lo = float(min(r[0] for r in ranges))
+            hi = float(max(r[1] for r in ranges))
+            if hi <= lo:
+                lo, hi = lo - 0.5, hi + 0.5
+            counts = sum(histogramCounts(values, bins, lo, hi, rows) for _, values, rows in columns)
+            return np.linspace(lo, hi, bins + 1), counts
+
+        key = tuple(self.sourceKey(source) for source in sources)
+        result = histogramCache.cached(('histogram',) + key + (float(xRange[0]), float(xRange[1]), bins), compute)
+        if result is None:
+            return []
+        edges, counts = result
+
+        colour = dLines['line'].get('color', 'steelblue')
+        traces = [{'type': 'bar', 'x': 0.5 * (edges[:-1] + edges[1:]), 'y': counts, 'width': np.diff(edges),
+                   'name': dLines['name'], 'marker': {'color': colour}, 'opacity': 0.6, 'showlegend': True}]
+        if cumulative:
+            total = max(int(counts.sum()), 1)
+            traces.append({'type': 'scatter', 'mode': 'lines', 'x': edges, 
+                           'y': np.concatenate([[0], np.cumsum(counts)]) / total, 'yaxis': 'y2',
+                           'line': dict(dLines['line'], color=colour, dash='dot'), 
+                           'name': f"{dLines['name']} CDF", 'showlegend': True})
+        return traces
+
+    ##########################################
+    def densityTrace(self, source, xRange=None, yRange=None):
+        """
+        Heatmap of the number of points of one yValue row in each cell of a grid, pooled over all the runs
+
+        The points are binned on the server, only the grid is sent to the browser. The grid 
+        spans the requested ranges, an axis without a requested range spans the points 
+        inside the range of the other axis. Empty cells are not drawn.
+
+        Args:
+            | source (dict): row, x-value column, scales and offsets, (data file, rows) of each run,
+            |     grid size and requested x-range of the density trace, see buildFigures.
+            | xRange (list): zoomed x-range of the graph (default None, all the points).
+            | yRange (list): zoomed y-range of the graph (default None, all the points).
+
+        Returns:
+            | trace (dict): heatmap trace dict.
+
+        """
+        xRange = None if xRange is None else sorted(float(value) for value in xRange)
+        yRange = None if yRange is None else sorted(float(value) for value in yRange)
+
+        def extent(values, others, otherRange):
+            lo, hi = np.inf, -np.inf
+            for v, o in zip(values, others):
+                keep = np.isfinite(v)
+                if otherRange is not None:
+                    keep &= (o >= otherRange[0]) & (o <= otherRange[1])
+                if keep.any():
+                    lo, hi = min(lo, float(v[keep].min())), max(hi, float(v[keep].max()))
+            if lo > hi:
+                return None
+            return (lo - 0.5, hi + 0.5) if hi == lo else (lo, hi)
+
+        def compute():
+            xs, ys = [], []
+            for dfilename, rows in source['runs']:
+                store = self.datafiles[dfilename]
+                xs.append(transformCache.column(dfilename, store, source['xVarName'], 
+                                                source['xscale'], source['xoffset'])[rows])
+                ys.append(self.traceColumn(source['row'], dfilename, source['xVarName'], 
+                                           source['yscale'], source['yoffset'])[rows])
+            xLimits = xRange or extent(xs, ys, yRange)
+            yLimits = yRange or extent(ys, xs, xRange)
+            if xLimits is None or yLimits is None:
+                return None
+            counts = sum(histogram2dCounts(x, y, source['bins'], xLimits, yLimits) for x, y in zip(xs, ys))
+            return (np.linspace(*xLimits, source['bins'][0] + 1), np.linspace(*yLimits, source['bins'][1] + 1), 
+                    counts)
+
+        key = tuple(self.sourceKey(dict(source, dfilename=dfilename)) for dfilename, _ in source['runs'])
+        key += (float(source['xscale']), float(source['xoffset']), tuple(float(v) for v in source['xRange']), 
+                tuple(xRange or ()), tuple(yRange or ()), source['bins'])
+        result = densityCache.cached(('density',) + key, compute)
+
+        trace = {'type': 'heatmap', 'name': source['name'], 'colorscale': 'Viridis', 'zsmooth': False, 
+                 'hoverongaps': False, 'colorbar': {'title': 'Count'}, 'x': [], 'y': [], 'z': []}
+        if result is not None:
+            xEdges, yEdges, counts = result
+            z = counts.T.astype(float)
+            z[z == 0] = np.nan
+            trace.update(x=0.5 * (xEdges[:-1] + xEdges[1:]), y=0.5 * (yEdges[:-1] + yEdges[1:]), z=z)
+        return trace
+
+    ##########################################
+    def runTraces(self, dLines, row, runs, xVarName, yscale, yoffset, runPoints):
+        """
+        Build the traces of one yValue row for every run of a multi-run graph set
+
+        The traces of a run share its colour and legend group. Each trace is reduced to the
+        point budget of a run, keeping the minimum and maximum in each x interval, 
+        and drawn with WebGL, so that graphs with hundreds of runs stay interactive.
+
+        Args:
+            | dLines (dict): trace properties from the config, without data.
+            | row (pd.Series): yValue row of the config.
+            | runs (list): (data file, rows, x-values) of each run.
+            | xVarName (string): x-value column of the graph set.
+            | yscale (double): y scale.
+            | yoffset (double): y offset.
+            | runPoints (int): maximum number of points in a trace of one run.
+
+        Returns:
+            | traces (list): trace dicts, one per run.
+
+        """
+        traces = []
+        for runNum, (dfilename, rows, xData) in enumerate(runs):
+            runLabel = os.path.splitext(os.path.basename(dfilename))[0]
+            yData = self.traceColumn(row, dfilename, xVarName, yscale, yoffset)[rows]
+            keep = decimateMinMax(yData, runPoints)
+
+            trace = dict(dLines, x=xData[keep], y=yData[keep], line=dict(dLines['line']))
+            trace['line']['color'] = f'hsl({360 * runNum // len(runs)},70%,45%)'
+            trace['type'] = 'scattergl'
+            trace['name'] = f"{dLines['name']} {runLabel}"
+            trace['legendgroup'] = runLabel
+            traces.append(trace)
+
+        return traces
+
+    ##########################################
+    @staticmethod
+    def sourceKey(source):
+        """
+        Key of the y-values of a trace in the trace registry, used for the caches of derived data.
+        """
+        row = source['row']
+        # empty cells are NaN on the rows of iterrows, which never compare equal in a key
+        datafile, interpolation, chain = [value if isinstance(value, str) else None 
+                                          for value in (row.get('Datafile'), row.get('Interpolation'), row.get('Filter'))]
+        return (source['dfilename'], source['xVarName'], row['Value'], datafile, interpolation, 
+                float(source['yscale']), float(source['yoffset']), chain)
+
+    ##########################################
+    def graphClosestApproach(self, dft):
+        """
+        Closest approach between the two trajectory files named by ClosestApproach on the sheet
+
+        ClosestApproach is two data files separated by a comma or semicolon. The position vector 
+        columns are ClosestApproachPosition[0..2] (on the sheet, default position.w). The second 
+        file is resampled onto the time of the first file.
+
+        Args:
+            | dft (pd.dataframe): info for this graph set.
+
+        Returns:
+            | cpa (tuple): time and distance of the closest approach, None if not requested.
+
+        """
+        if 'ClosestApproach' not in dft.index or not isinstance(dft.loc['ClosestApproach','Value'], str):
+            return None
+        files = expandDatafiles(dft.loc['ClosestApproach','Value'])
+        if len(files) != 2:
+            print(f"ClosestApproach requires two data files, not {dft.loc['ClosestApproach','Value']}")
+            return None
+        position = 'position.w'
+        if 'ClosestApproachPosition' in dft.index and isinstance(dft.loc['ClosestApproachPosition','Value'], str):
+            position = dft.loc['ClosestApproachPosition','Value']
+
+        def compute():
+            first = self.datafiles[files[0]]
+            t = first[next(iter(first.keys()))]
+            relpos = np.vstack([first[f"=file('{files[1]}', '{position}[{i}]') - {position}[{i}]"] for i in range(3)])
+            valid = np.isfinite(relpos).all(axis=0)
+            return np.array(closestApproach(t[valid], relpos[:, valid]))
+
+        return tuple(closestApproachCache.cached(('cpa', files[0], files[1], position), compute))
+
+    ##########################################
+    def windowRows(self, source, xLeft=None, xRight=None):
+        """
+        Rows of a trace in an x-range, in ascending order of the x-values
+
+        On a sorted x column the rows are found by binary search. Else only the blocks of rows
+        with x-values in the range, from the block index of the x-values, are searched and the 
+        rows found are sorted by x-value.
+
+        Args:
+            | source (dict): trace in the trace registry.
+            | xLeft (double): start of the x-range, in scaled x-values, default the start of the data.
+            | xRight (double): end of the x-range, in scaled x-values, default the end of the data.
+
+        Returns:
+            | xValues (np.array): x-values of all the rows, after scale and offset.
+            | rows (slice or np.array): a slice if the x column is sorted, else the row numbers.
+
+        """
+        dfilename, xVarName = source['dfilename'], source['xVarName']
+        store = self.datafiles[dfilename]
+        xValues = transformCache.column(dfilename, store, xVarName, source['xscale'], source['xoffset'])
+        left = -np.inf if xLeft is None else xLeft
+        right = np.inf if xRight is None else xRight
+
+        if store.info(xVarName)['sorted'] and source['xscale'] > 0:
+            return xValues, slice(np.searchsorted(xValues, left, 'left'), np.searchsorted(xValues, right, 'right'))
+
+        index = blockIndexCache.cached(('x', dfilename, xVarName, float(source['xscale']), float(source['xoffset'])), 
+                                       lambda: BlockIndex(xValues))
+        size = BlockIndex.blockSize
+        numBlocks = len(index.count)
+        blocks = np.flatnonzero((index.max >= left) & (index.min <= right))
+        inside = xValues[:numBlocks * size].reshape(numBlocks, size)[blocks]
+        blockNums, offsets = np.nonzero((inside >= left) & (inside <= right))
+        tail = xValues[numBlocks * size:]
+        rows = np.concatenate([blocks[blockNums] * size + offsets, 
+                               numBlocks * size + np.flatnonzero((tail >= left) & (tail <= right))])
+        return xValues, rows[np.argsort(xValues[rows], kind='stable')]
+
+    ##########################################
+    def selectionStatistics(self, grID, xLeft, xRight):
+        """
+        Statistics of the traces of a graph in an x-range, on the full resolution data
+
+        The rows in the range are found by windowRows(). On a sorted x column the statistics 
+        are combined from the block index of the y-values.
+
+        Args:
+            | grID (string): graph id.
+            | xLeft (double): start of the x-range, in scaled x-values.
+            | xRight (double): end of the x-range, in scaled x-values.
+
+        Returns:
+            | statsList (list): one dict per trace with keys 'name', 'count', 'min', 'max', 'mean', 
+            |     'rms', 'std', 'first', 'last' and 'peak' (x-value of the peak absolute value).
+
+        """
+        statsList = []
+        for source in self.traceRegistry.get(grID, []):
+            yValues = self.traceColumn(source['row'], source['dfilename'], source['xVarName'], 
+                                       source['yscale'], source['yoffset'])
+            xValues, rows = self.windowRows(source, xLeft, xRight)
+
+            if isinstance(rows, slice):
+                index = blockIndexCache.cached(self.sourceKey(source), lambda: BlockIndex(yValues))
+                count, vmin, vmax, vsum, vsumsq, peakRow, _ = index.stats(rows.start, rows.stop)
+            else:
+                count, vmin, vmax, vsum, vsumsq, peakRow, _ = columnStatistics(yValues[rows])
+                if peakRow >= 0:
+                    peakRow = rows[peakRow]
+
+            stats = {'name': source['name'], 'count': count}
+            if count > 0:
+                mean = vsum / count
+                values = yValues[rows]
+                stats.update({'min': vmin, 'max': vmax, 'mean': mean, 
+                              'rms': np.sqrt(vsumsq / count), 
+                              'std': np.sqrt(max(vsumsq / count - mean * mean, 0.)),
+                              'first': firstValid(values), 'last': firstValid(values[::-1]), 
+                              'peak': xValues[peakRow]})
+            statsList.append(stats)
+
+        return statsList
+
+    ##########################################
+    def traceSpectra(self, grID, xLeft=None, xRight=None, method='welch'):
+        """
+        Spectra of the traces of a graph in an x-range, on the full resolution data
+
+        Traces on the same x-values are stacked and transformed together. When the x-values 
+        are not uniform, the traces are first resampled onto a uniform grid with the same number 
+        of points. The spectra are cached by trace columns, x-range and method.
+
+        Args:
+            | grID (string): graph id.
+            | xLeft (double): start of the x-range, in scaled x-values, default the start of the data.
+            | xRight (double): end of the x-range, in scaled x-values, default the end of the data.
+            | method (string): 'fft' (amplitude spectrum) or 'welch' (power spectral density).
+
+        Returns:
+            | spectraList (list): (trace name, frequencies, spectrum) for each trace.
+
+        """
+        segment = self.spectrumSegments.get(grID, 4096)
+
+        # traces with the same x-values
+        groups = {}
+        for source in self.traceRegistry.get(grID, []):
+            xKey = (source['dfilename'], source['xVarName'], float(source['xscale']), float(source['xoffset']))
+            groups.setdefault(xKey, []).append(source)
+
+        spectraList = []
+        for (dfilename, xVarName, xscale, xoffset), sources in groups.items():
+            left = -np.inf if xLeft is None else xLeft
+            right = np.inf if xRight is None else xRight
+
+            def compute():
+                columns = [self.traceColumn(source['row'], dfilename, xVarName, source['yscale'], source['yoffset'])
+                           for source in sources]
+                info = self.datafiles[dfilename].info(xVarName)
+                xValues, rows = self.windowRows(sources[0], xLeft, xRight)
+                xWindow = xValues[rows]
+                if len(xWindow) < 2 or not xWindow[-1] > xWindow[0]:
+                    return None
+
+                # resample onto a uniform grid if required
+                if info['step'] is not None and xscale > 0:
+                    values = np.vstack([column[rows] for column in columns])
+                    step = info['step'] * xscale
+                else:
+                    grid = np.linspace(xWindow[0], xWindow[-1], len(xWindow))
+                    values = np.vstack([np.interp(grid, xWindow, column[rows]) for column in columns])
+                    step = grid[1] - grid[0]
+                return spectra(values, step, method, segment)
+
+            key = (tuple(self.sourceKey(source) for source in sources), float(xscale), float(xoffset), 
+                   float(left), float(right), method, segment)
+            result = spectrumCache.cached(key, compute)
+            if result is None:
+                continue
+            frequencies, spectrum = result
+            for source, values in zip(sources, spectrum):
+                spectraList.append((source['name'], frequencies, values))
+
+        return spectraList
+
+    ##########################################
+    def spectrumFigure(self, grID, xLeft=None, xRight=None, method='welch'):
+        """
+        Figure of the spectra of the traces of a graph, companion to the graph
+
+        Args:
+            | grID (string): graph id.
+            | xLeft (double): start of the x-range, default the start of the data.
+            | xRight (double): end of the x-range, default the end of the data.
+            | method (string): 'fft' (amplitude spectrum) or 'welch' (power spectral density).
+
+        Returns:
+            | figdict (dict): figure dictionary.
+
+        """
+        data = []
+        for name, frequencies, values in self.traceSpectra(grID, xLeft, xRight, method):
+            # the spectrum is reduced to the point budget, keeping the peaks
+            keep = decimateMinMax(values, spectrumPoints)
+            data.append({'x': frequencies[keep], 'y': values[keep], 'name': name, 
+                         'mode': 'lines', 'type': 'scattergl'})
+
+        xRange = 'all' if xLeft is None else f'{xLeft:.4f} to {xRight:.4f}'
+        yTitle = 'Amplitude' if method == 'fft' else 'Power spectral density'
+        return {'layout': {'title': f'{yTitle}, x-range {xRange}',
+                           'xaxis': {'title': 'Frequency [1/x unit]'},
+                           'yaxis': {'title': yTitle, 'type': 'log'},
+                           'hovermode': 'x',
+                           'plot_bgcolor': 'aliceblue'},
+                'data': data}
+
+    ##########################################
+    def exportColumns(self, grID, xLeft=None, xRight=None):
+        """
+        Columns of the traces of a graph in an x-range, at the resolution of the source data
+
+        The first column is the x-values of the first trace, after scale and offset. Traces 
+        on other x-values, for example other runs, are interpolated onto these x-values.
+
+        Args:
+            | grID (string): graph id.
+            | xLeft (double): start of the x-range, default the start of the data.
+            | xRight (double): end of the x-range, default the end of the data.
+
+        Returns:
+            | columns (list): (name, values) for the x-values and for each trace.
+
+        """
+        sources = self.traceRegistry.get(grID, [])
+        if not sources:
+            return []
+
+        first = sources[0]
+        xValues, rows = self.windowRows(first, xLeft, xRight)
+        xKey = (first['dfilename'], first['xVarName'], first['xscale'], first['xoffset'])
+        columns = [(first['xVarName'], xValues[rows])]
+        for source in sources:
+            yValues = self.traceColumn(source['row'], source['dfilename'], source['xVarName'], 
+                                       source['yscale'], source['yoffset'])
+            if (source['dfilename'], source['xVarName'], source['xscale'], source['xoffset']) == xKey:
+                columns.append((source['name'], yValues[rows]))
+            else:
+                sourceX, sourceRows = self.windowRows(source, xLeft, xRight)
+                columns.append((source['name'], np.interp(xValues[rows], sourceX[sourceRows], 
+                                                          yValues[sourceRows], left=np.nan, right=np.nan)))
+        return columns
 
-        # 2) Div top text: if supplied, append the sheet top text  
-        if 'GraphTop' in dft.index:
-            thisDivList.append(
-                html.Div([dcc.Markdown(id=f'topMarkdown-{graph}',children=dft.loc['GraphTop','Value'])])
-            )            
+    ##########################################
+    def traceCorrelation(self, grID, first, second, xLeft=None, xRight=None):
+        """
+        Cross-correlation of two traces of a graph in an x-range, on the full resolution data
 
-        # 3) Div x-axis slider 
-        #    Disable for now
-        #    With updated python modules the "click tab again" functionaity does not work to trigger an update to the tab
-        #    This must be sorted out
+        The second trace is resampled onto the x-values of the first trace, which are first 
+        resampled onto a uniform grid if not uniform.
 
-        # instruction = '**Click on current tab to refresh the x-axis slider and the graphs**'
+        Args:
+            | grID (string): graph id.
+            | first (int): index of the first trace in the trace registry of the graph.
+            | second (int): index of the second trace.
+            | xLeft (double): start of the x-range, default the start of the data.
+            | xRight (double): end of the x-range, default the end of the data.
 
-        # setName = graph
-        # thisDivList.append(
-        #     html.Div([
-        #         dcc.Markdown(id='header-xSlider-'+ setName,children=instruction),
-        #         dcc.RangeSlider(
-        #             id='xSlider-'+ setName, min=xData.min(), max=xData.max(),  step=xSliderStep, 
-        #             value=[xData.min(), xData.max()],  
-        #             marks=sliderMarks, 
-        #             allowCross=False,
-        #             tooltip={'always_visible': False, 'placement': 'bottom'},  # use either the tooltip or the text display in next div
-        #             # updatemode='drag',   # default is mouseup
-        #             className='margin150'
-        #         ),
-        #         html.Div(
-        #             style={'marginTop':40, 'fontSize':12},
-        #             id='output-container-xSlider-'+ setName,
-        #             className='margin150'
-        #         ),
-        #         dcc.Input(id='minVal-'+ setName, type='number', min=0, step=xSliderStep, placeholder='type start value', className='margin150-2', style={'fontSize':12}),
-        #         dcc.Input(id='maxVal-'+ setName, type='number', min=0, step=xSliderStep, placeholder='type end value', className='margin2', style={'fontSize':12}),
-        #         html.Button(id='submit-button-'+ setName, type='submit', children='Submit', className='margin2'),
-        #         html.Button('Reset slider', id='resetSlider-'+ setName, className='margin2'),
-        #     ])
-        # )
+        Returns:
+            | result (tuple): lags, correlation, lag of the peak and peak correlation (see crossCorrelation), 
+            |     None if a trace is not in the registry or less than two values in the range.
 
-        # 4) Graph and data feedback Divs
+        """
+        sources = self.traceRegistry.get(grID, [])
+        if not all(isinstance(i, int) and 0 <= i < len(sources) for i in (first, second)):
+            return None
+        left = -np.inf if xLeft is None else xLeft
+        right = np.inf if xRight is None else xRight
+
+        def window(source):
+            yValues = self.traceColumn(source['row'], source['dfilename'], source['xVarName'], 
+                                       source['yscale'], source['yoffset'])
+            xValues, rows = self.windowRows(source, xLeft, xRight)
+            uniform = self.datafiles[source['dfilename']].info(source['xVarName'])['step'] is not None
+            return xValues[rows], yValues[rows], uniform
+
+        def compute():
+            xFirst, yFirst, uniform = window(sources[first])
+            xSecond, ySecond, _ = window(sources[second])
+            if len(xFirst) < 2 or not xFirst[-1] > xFirst[0] or len(xSecond) < 2:
+                return None
+            grid = xFirst if uniform else np.linspace(xFirst[0], xFirst[-1], len(xFirst))
+            a = yFirst if uniform else np.interp(grid, xFirst, yFirst)
+            b = np.interp(grid, xSecond, ySecond, left=np.nan, right=np.nan)
+            lags, correlation, lag, peak = crossCorrelation(a, b, (grid[-1] - grid[0]) / (len(grid) - 1))
+            return lags, correlation, np.array([lag, peak])
+
+        key = (self.sourceKey(sources[first]), self.sourceKey(sources[second]), 
+               float(sources[first]['xscale']), float(sources[first]['xoffset']), 
+               float(sources[second]['xscale']), float(sources[second]['xoffset']), float(left), float(right))
+        result = correlationCache.cached(key, compute)
+        if result is None:
+            return None
+        lags, correlation, (lag, peak) = result
+        return lags, correlation, lag, peak
+
+    ##########################################
+    def cursorReadout(self, grID, x):
+        """
+        Values of the traces at an x-value, interpolated on the full resolution data
+
+        The traces are those of the graph, or of all graphs on the tab (see ClickReadout). 
+        The rows around the x-value are found by binary search on the x-values, 
+        values outside the x-range of a trace are NaN.
+
+        Args:
+            | grID (string): graph id.
+            | x (double): x-value, in scaled x-values.
+
+        Returns:
+            | readout (list): (trace name, value) for each trace.
+
+        """
+        readout = []
+        for readID in self.readoutGraphs.get(grID, [grID]):
+            for source in self.traceRegistry.get(readID, []):
+                dfilename, xVarName = source['dfilename'], source['xVarName']
+                store = self.datafiles[dfilename]
+                xValues = transformCache.column(dfilename, store, xVarName, source['xscale'], source['xoffset'])
+                yValues = self.traceColumn(source['row'], dfilename, xVarName, source['yscale'], source['yoffset'])
+
+                value = np.nan
+                if store.info(xVarName)['sorted'] and source['xscale'] > 0:
+                    i = np.searchsorted(xValues, x, 'left')
+                    if i < len(xValues) and xValues[i] == x:
+                        value = yValues[i]
+                    elif 0 < i < len(xValues):
+                        fraction = (x - xValues[i-1]) / (xValues[i] - xValues[i-1])
+                        value = yValues[i-1] + fraction * (yValues[i] - yValues[i-1])
+                elif len(xValues) > 0 and not np.isnan(xValues).all():
+                    value = yValues[np.nanargmin(np.abs(xValues - x))]
+
+                readout.append((source['name'], float(value)))
+
+        return readout
+
+    ##########################################
+    def buildFigures(self, dft, graph, reqStart = 0, reqEnd = 0):
+        """
+        Builds the figure dictionaries for the set of graphs on this tab (requested from one sheet in xls).
+        No Dash components are created here, so this can be used without the Flask server.
+
+        Args:
+            | dft (pd.dataframe): info for this graph set.
+            | graph (string): graph set name, i.e. text following "graph-" in the sheet name.
+            | reqStart (double): starting x-value, default the beginning.
+            | reqEnd (double): ending x-value, default the end. 
+
+        Returns:
+            | figList (list): list of dicts, one per Graph Div, with keys
+            |     'id' (graph id), 'figure' (figure dict), 'isMarkers' (rectangle tool present),
+            |     'subplots' (figure uses subplots), 'height' (graph height) and
+            |     'file' (html export base name, None if not exported).
+            | xmin (double): minimum x value
+            | xmax (double): maximum x value
+
+        """
+        #  colors
+        backgroundColor = 'aliceblue'
+        gridColour = 'lightgrey'
+
+        # create graphs output folder if not exist
+        grDir = './graphs'
+        os.makedirs(grDir, exist_ok=True)
+
+        # handle all graphs separately (default) or as subplots
+        useSubplots = self.usesSubplots(dft)
+        print('\nSubplots functionality disabled\n')   
+
+        # graphs to disk requested?
+        toDisk = self.isToDisk(dft)
+
+        # list of all figures created here [passed back to calling function]
+        figList = []
+
+        # list of all the line entries for this graph set
+        #  before building the page, all lines are first created and stored here
+        graphData = []
+
+        # source of every trace in graphData: data file, columns and transforms 
+        # envelope traces have no single source and are not listed
+        graphSources = []
+     
+        # get the filename for this graph to get to the data in the column store
+        # the Datafile entry can also be a glob pattern or a list of runs, 
+        # each trace is then drawn once for every run
+        runFiles, envelopeOnly = self.graphRuns(dft)
+        multiRun = len(runFiles) > 1
+
+        # ------- x data preparation
+
+        # 1) get the name of the x parameter
+        xVarName = dft[dft['Variable']=='xValue']['Value'].values[0]
+
+        #  2) get the graph set x hover text format from config
+        hfmt_x = '.4f' 
+        if isinstance(dft[dft['Variable']=='xLabel']['Format'].values[0], str):
+            hfmt_x = dft[dft['Variable']=='xLabel']['Format'].values[0]
+
+        # 3) apply the required scale and offset, the scaled columns are shared across graph sets
+        xscale, xoffset = self.xScaleOffset(dft)
+
+        # data file, rows in the requested x-range and x-values of each run
+        # envelopes are drawn on the x-values of the first run, the other runs are not loaded here
+        # the data files of the runs are read in parallel on first use
+        graphFiles = runFiles[:1] if envelopeOnly else runFiles
+        if len(graphFiles) > 1:
+            parallelMap(lambda dfilename: self.datafiles[dfilename], graphFiles)
+        self.checkColumns(dft, graph, graphFiles[0])
+        runs = []
+        for dfilename in graphFiles:
+            df = self.datafiles[dfilename]
+
+            # check requested x-range input validity and slice as requested
+            # the rows are found by binary search on a sorted x column
+            runStart, runEnd = reqStart, reqEnd
+            if runStart < df[xVarName][0]:
+                runStart = df[xVarName][0]
+            if runEnd > df[xVarName][-1]:
+                runEnd = df[xVarName][-1]
+            if runEnd <= runStart:
+                runEnd = df[xVarName][-1]
+            rows = df.rowRange(xVarName, runStart, runEnd)
+
+            xData = transformCache.column(dfilename, df, xVarName, xscale, xoffset)[rows]
+            runs.append((dfilename, rows, xData))
+
+        # 4) slider marks dictionary based on set events in the data
+        xmin = min(np.nanmin(xData) for _, _, xData in runs)
+        xmax = max(np.nanmax(xData) for _, _, xData in runs)
+        xsteps = 11
+        sliderMarks={str(t): f'{t:.4f}s' for t in np.linspace(xmin,xmax,xsteps,endpoint=True)}
+
+        # 5) step size of the x-axis slider
+        xSliderStep = np.nan
+        if 'xSliderStep' in dft['Variable']:
+            xSliderStep =  dft[dft['Variable']=='xSliderStep']['Value'].values[0]           
+        if np.isnan(xSliderStep):
+            xSliderStep = round((xmax - xmin) / max(len(xData) for _, _, xData in runs), 3)  
+
+        # 6) number of points per trace and run when plotting several runs
+        runPoints = 2000
+        if 'RunPoints' in dft.index and not np.isnan(dft.loc['RunPoints','Value']):
+            runPoints = int(dft.loc['RunPoints','Value'])
+
+        #  6) all graphs on one page or tab have the same x label 
+        xLabel = dft.loc['xLabel','Value']
+
+        # 7) statistics across the runs of all the envelope traces, on the x-values of the first run
+        envelopes = {}
+        if multiRun:
+            envelopeColumns = [row['Value'] for _, row in dft[(dft['Variable']=='yValue')].iterrows() if self.isEnvelope(row)]
+            if envelopeColumns:
+                envelopes = envelopeCache.stats(runFiles, xVarName, envelopeColumns, 
+                                                self.datafiles[runFiles[0]][xVarName],
+                                                self.envelopePercentiles(dft))
+
+        # ------- y data preparation
+
+        # list of yValue values from config, i.e. the name of each variable to plot 
+        yVariableList = []
+
+        # positions in yVariableList of the histogram rows
+        histogramRows = set()
+
+        # sources of the density rows by position in yVariableList
+        densityRows = {}
+
+        # build the traces for all required variables in this graph set
+        for index, row in dft[(dft['Variable']=='yValue')].iterrows():
+
+            # add to yValue line list
+            yVariableList.append(index)
+
+            # y scale
+            if 'Scale' in row:
+                if not np.isnan(row['Scale']):
+                    yscale = row['Scale']
+                else:
+                    yscale = 1.0
+
+            # y offset
+            if 'Offset' in row:
+                if not np.isnan(row['Offset']):
+                    yoffset = row['Offset']
+                else:
+                    yoffset = 0.
+                    
+            # each line in each graph must be a dict as follows:
+            plotMode = 'lines'
+            if 'Mode' in row:
+                #  a sting and not empty
+                if isinstance(row['Mode'], str) and not row['Mode'] == "":
+                    plotMode = row['Mode']
+
+            opacity = 0
+            if 'MarkerOpacity' in row:
+                if not np.isnan(row['MarkerOpacity']):
+                    opacity = row['MarkerOpacity']
+                    
+            markerDict = { 'opacity': opacity }
+
+            dLines = {
+                'x':None,
+                'y':None,
+                'line':{},
+                'mode': plotMode,
+                'marker': markerDict,   # we do not want markers but need them for the rectangle tool to appear
+            }
+
+            # fill in non-default values
+            if not np.isnan(row['Linewidth']):
+                dLines['line']['width'] = row['Linewidth']
+
+            if isinstance(row['Colour'], str):
+                dLines['line']['color'] = row['Colour']
+
+            if isinstance(row['Dash'], str):
+                dLines['line']['dash'] = row['Dash']
+
+            if isinstance(row['GraphType'], str):
+                dLines['type'] = row['GraphType']
+
+            if isinstance(row['LineLabel'], str):
+                dLines['name'] = row['LineLabel']
+            else:
+                dLines['name'] = row['Value']
+
+            dLines['showlegend'] = True
+
+            # add this line to other lines in this graph, once for every run
+            # or as the envelope statistics across the runs
+            source = {'row': row, 'xVarName': xVarName, 'xscale': xscale, 'xoffset': xoffset, 
+                      'yscale': yscale, 'yoffset': yoffset}
+            bins, cumulative = self.histogramType(row)
+            densityBins = self.densityType(row)
+            if densityBins is not None:
+                densityRows[len(graphData)] = dict(source, name=dLines['name'], bins=densityBins, 
+                                                   runs=[(dfilename, rows) for dfilename, rows, _ in runs],
+                                                   xRange=(reqStart, reqEnd))
+                graphSources.append([])
+                graphData.append([self.densityTrace(densityRows[len(graphData)])])
+            elif bins is not None:
+                histogramRows.add(len(graphData))
+                graphSources.append([])
+                graphData.append(self.histogramTraces(dLines, row, runs, xVarName, yscale, yoffset, 
+                                                      bins, cumulative, (reqStart, reqEnd)))
+            elif multiRun and self.isEnvelope(row):
+                graphSources.append([])
+                graphData.append(self.envelopeTraces(dLines, envelopes[row['Value']], runs[0], yscale, yoffset, dft))
+            elif multiRun:
+                graphData.append(self.runTraces(dLines, row, runs, xVarName, yscale, yoffset, runPoints))
+                graphSources.append([dict(source, name=trace['name'], dfilename=dfilename)
+                                     for trace, (dfilename, _, _) in zip(graphData[-1], runs)])
+            else:
+                # the envelope of a single run is the line itself
+                if self.isEnvelope(row):
+                    del dLines['type']
+                dfilename, rows, xData = runs[0]
+                yValues = self.traceColumn(row, dfilename, xVarName, yscale, yoffset)
+                dLines['x'] = xData
+                dLines['y'] = yValues[rows]
+                graphSources.append([dict(source, name=dLines['name'], dfilename=dfilename)])
+                graphData.append([dLines] + self.bandTraces(dLines, row, yValues, rows, xData, 
+                                                            self.sourceKey(graphSources[-1][0])))
+
+        # ------- figure preparation
 
         # title rows
         titleRows = dft[(dft['Variable']=='Title')]
@@ -559,29 +4398,22 @@ class DashLinePlot():
         # subplot environment setup to be done before running through the data collection
         if useSubplots:
 
-            # for subplots we have only one Graph Div
-            # use the graph set name without any added numbers
-            grList.append(graph)
-
             # row heights
             grHeight = dft.loc['Height','Value']
             rowHeights = [grHeight] * numGraphSets
 
             # generate the subplot figure
-            figdict = subplots.make_subplots(rows=numGraphSets, cols=1,
-                                        shared_xaxes=True, shared_yaxes=False,
-                                        vertical_spacing=0.075,
-                                        row_heights=rowHeights,
-                                        x_title=xLabel, 
-                                        subplot_titles=grTitles
-                                        )
-            figdict.update_xaxes(hoverformat=hfmt_x, 
-                                gridcolor=gridColour   # default is white
-                                )  
-            figdict.update_layout(hovermode='x', 
-                                    plot_bgcolor=backgroundColor, 
-                                    font=dict(size=10))   # setting the font size of all y-axes labels and legends
-
+            figdict = subplotFigure(numGraphSets, rowHeights,
+                                    verticalSpacing=0.075,
+                                    xTitle=xLabel, 
+                                    subplotTitles=grTitles
+                                    )
+            updateSubplotAxes(figdict, 'xaxis', {'hoverformat': hfmt_x, 
+                                                 'gridcolor': gridColour   # default is white
+                                                 })  
+            figdict['layout'].update({'hovermode': 'x', 
+                                      'plot_bgcolor': backgroundColor, 
+                                      'font': {'size': 10}})   # setting the font size of all y-axes labels and legends
 
         # subplot counter used to pack the graph data to the figdict
         subNum = 0
@@ -608,51 +4440,244 @@ class DashLinePlot():
             #  this will be the case if in any line is using markers 
             isMarkers = False
 
+            # with several runs, the legend shows each run once and toggles all its traces
+            runLegends = set()
+
+            # histograms show the distribution of the y-values instead of the y-values against x
+            isHistogram = False
+            isCumulative = False
+
+            # (trace number, source) of the density traces, binned again when zooming
+            densityTraces = []
+
             # pack the graph data in
             #  * either a list to be used in the Graph Div
             #  * or in the relevant subplot 
             thisGraphData = []
+            thisGraphSources = []
 
             # run through all variables in the trace set
             for traceNum, value in enumerate(yVariableList):
                 # identity the specific trace
                 if 'yValue#'+setStr in value:
 
-                    # add to plot set    
-                    if useSubplots:
-                        figdict.append_trace(graphData[traceNum], subNum, 1) 
-                        figdict.update_yaxes(
-                            hoverformat=hfmt_y, 
-                            title=yLabel, 
-                            gridcolor=gridColour,
-                            row = subNum, col = 1) 
-                    else:                 
-                        thisGraphData.append(graphData[traceNum])
+                    thisGraphSources.extend(graphSources[traceNum])
+                    for trace in graphData[traceNum]:
+                        if 'legendgroup' in trace:
+                            trace['showlegend'] = trace['legendgroup'] not in runLegends
+                            runLegends.add(trace['legendgroup'])
+
+                        isHistogram = isHistogram or traceNum in histogramRows
+                        isCumulative = isCumulative or trace.get('yaxis') == 'y2'
+
+                        # add to plot set, subplots share the x-axis and have no right-hand axis 
+                        # for the cumulative distribution
+                        if useSubplots and trace.get('yaxis') == 'y2':
+                            continue
+                        elif useSubplots:
+                            addSubplotTrace(figdict, trace, subNum, {
+                                'hoverformat': hfmt_y, 
+                                'title': yLabel, 
+                                'gridcolor': gridColour}) 
+                        else:                 
+                            if traceNum in densityRows:
+                                densityTraces.append((len(thisGraphData), densityRows[traceNum]))
+                            thisGraphData.append(trace)
                         
                     # check for usage of markers
                     # at least one trace with markers will trigger the rectangle tool
                     # with associated Rectangle Tool Selection Data box
-                    if 'markers' in graphData[traceNum]['mode']:
+                    if graphData[traceNum] and 'markers' in graphData[traceNum][0].get('mode', ''):
                         isMarkers = True
 
-            # Not using subplots we create a Graph Div for each set 
-            if not useSubplots:
+            # Not using subplots we create a figure for each set 
+            if not useSubplots:
+
+                # create dictionary with the layout and data 
+                figdict = {'layout':{'title': grTitle,
+                                    'xaxis':{'title': xLabel, 'hoverformat': hfmt_x},
+                                    'yaxis':{'title': yLabel, 'hoverformat': hfmt_y},	
+                                    'clickmode': 'event+select',
+                                    'hovermode': 'x',           # set compare data on hover
+                                    'plot_bgcolor': backgroundColor, 
+                                    },
+                            'data':thisGraphData}
+
+                # the x-axis of a histogram is the y-value, the cumulative fraction is on the right
+                if isHistogram:
+                    figdict['layout']['xaxis']['title'] = yLabel
+                    figdict['layout']['yaxis'] = {'title': 'Count'}
+                    figdict['layout'].update({'barmode': 'overlay', 'bargap': 0})
+                if isCumulative:
+                    figdict['layout']['yaxis2'] = {'title': 'Cumulative fraction', 'overlaying': 'y', 
+                                                   'side': 'right', 'range': [0, 1]}
+
+                # the zoom is kept when the density traces are binned again for the zoomed ranges
+                if densityTraces:
+                    figdict['layout'].update({'hovermode': 'closest', 'uirevision': graph+setStr})
+           
+                #  store the id of this set - to be used in callback function generation
+                #  we mark all relevant Divs with this string
+                grID = graph+setStr
+                self.traceRegistry[grID] = thisGraphSources
+                if densityTraces:
+                    self.densityGraphs[grID] = (figdict, densityTraces)
+                else:
+                    self.densityGraphs.pop(grID, None)
+
+                figList.append({
+                    'id': grID,
+                    'figure': figdict,
+                    'isMarkers': isMarkers,
+                    'subplots': False,
+                    'height': str(dft.loc['Height','Value']),
+                    'file': f'{grDir}/{graph}#{setStr}' if toDisk else None,
+                })
+
+        # a click reads out the traces of the clicked graph, or of all graphs on the tab 
+        # if ClickReadout on the sheet is 'tab'
+        readoutTab = 'ClickReadout' in dft.index and str(dft.loc['ClickReadout','Value']).strip().lower() == 'tab'
+        for fig in figList:
+            self.readoutGraphs[fig['id']] = [tabFig['id'] for tabFig in figList] if readoutTab else [fig['id']]
+
+        # segment length of the Welch spectra, SpectrumSegment on the sheet
+        segment = 4096
+        if 'SpectrumSegment' in dft.index and not np.isnan(dft.loc['SpectrumSegment','Value']):
+            segment = int(dft.loc['SpectrumSegment','Value'])
+        for fig in figList:
+            self.spectrumSegments[fig['id']] = segment
+
+        # closest approach between two trajectory files marked on all graphs, 
+        # the x-values of the graphs are the times of the trajectories
+        cpa = self.graphClosestApproach(dft)
+        if cpa is not None and not np.isnan(cpa[0]):
+            tCPA, miss = cpa
+            xCPA = tCPA * xscale + xoffset
+            for fig in figList:
+                layout = fig['figure']['layout']
+                layout['shapes'] = layout.get('shapes', []) + [{
+                    'type': 'line', 'xref': 'x', 'yref': 'paper', 'x0': xCPA, 'x1': xCPA, 'y0': 0, 'y1': 1,
+                    'line': {'color': 'red', 'width': 1, 'dash': 'dot'}}]
+                layout['annotations'] = layout.get('annotations', []) + [{
+                    'x': xCPA, 'y': 1, 'xref': 'x', 'yref': 'paper', 'yanchor': 'bottom', 'showarrow': False,
+                    'text': f'CPA {miss:.3f} at {tCPA:.4f}', 'font': {'color': 'red'}}]
+
+        # only one figure if all graphs are in subplots
+        # for subplots we use the graph set name without any added numbers
+        if useSubplots:
+
+            figdict['layout']['height'] = numGraphSets*grHeight  
+
+            figList.append({
+                'id': graph,
+                'figure': figdict,
+                'isMarkers': isMarkers,
+                'subplots': True,
+                'height': None,
+                'file': f'{grDir}/{graph}' if toDisk else None,
+            })
+
+        return figList, xmin, xmax
+
+    ##########################################
+    def makeGraphSet(self, dft, graph, reqStart = 0, reqEnd = 0):
+        """
+        Builds the set of graphs on this tab (requested from one sheet in xls) 
+
+        Args:
+            | dft (pd.dataframe): info for this graph set.
+            | graph (string): graph set name, i.e. text following "graph-" in the sheet name.
+            | reqStart (double): starting x-value, default the beginning.
+            | reqEnd (double): ending x-value, default the end. 
+
+        Returns:
+            | thisDivList (list): list of html Divs.
+            | grList (list): list of the symbolic names of all graphs in this set.
+            | xmin (double): minimum x value
+            | xmax (double): maximum x value
+
+        """
+        from dash import dcc
+        from dash import html
+
+        # get the header info from the header sheet in the config file
+        pagetop = dfPlotterHeader.loc['PageTop','Value'] if 'PageTop' in dfPlotterHeader.index else ''
+        pagebottom = self.dateCreated + ' ' + dfPlotterHeader.loc['PageBottom','Value'] if 'PageBottom' in dfPlotterHeader.index else ''
+
+        # build the figures for all graphs in this set
+        figList, xmin, xmax = self.buildFigures(dft, graph, reqStart, reqEnd)
+
+        # list of all graph names created here [passed back to calling function]
+        # these names are the id of a Graph Div on the page, used in callback functions to update the figure
+        grList = [fig['id'] for fig in figList]
+
+        # ------- html Div's preparation
+        thisDivList = []
+
+        # 1) Div header: append the header text at the top of the page
+        thisDivList.append(
+            html.Div([dcc.Markdown(id=f'headerMarkdown-{graph}',children=pagetop)]),
+        )  
+
+        # 2) Div top text: if supplied, append the sheet top text  
+        if 'GraphTop' in dft.index:
+            thisDivList.append(
+                html.Div([dcc.Markdown(id=f'topMarkdown-{graph}',children=dft.loc['GraphTop','Value'])])
+            )            
+
+        # 3) Div x-axis slider 
+        #    Disable for now
+        #    With updated python modules the "click tab again" functionaity does not work to trigger an update to the tab
+        #    This must be sorted out
+
+        # instruction = '**Click on current tab to refresh the x-axis slider and the graphs**'
+
+        # setName = graph
+        # thisDivList.append(
+        #     html.Div([
+        #         dcc.Markdown(id='header-xSlider-'+ setName,children=instruction),
+        #         dcc.RangeSlider(
+        #             id='xSlider-'+ setName, min=xmin, max=xmax,  step=xSliderStep, 
+        #             value=[xmin, xmax],  
+        #             marks=sliderMarks, 
+        #             allowCross=False,
+        #             tooltip={'always_visible': False, 'placement': 'bottom'},  # use either the tooltip or the text display in next div
+        #             # updatemode='drag',   # default is mouseup
+        #             className='margin150'
+        #         ),
+        #         html.Div(
+        #             style={'marginTop':40, 'fontSize':12},
+        #             id='output-container-xSlider-'+ setName,
+        #             className='margin150'
+        #         ),
+        #         dcc.Input(id='minVal-'+ setName, type='number', min=0, step=xSliderStep, placeholder='type start value', className='margin150-2', style={'fontSize':12}),
+        #         dcc.Input(id='maxVal-'+ setName, type='number', min=0, step=xSliderStep, placeholder='type end value', className='margin2', style={'fontSize':12}),
+        #         html.Button(id='submit-button-'+ setName, type='submit', children='Submit', className='margin2'),
+        #         html.Button('Reset slider', id='resetSlider-'+ setName, className='margin2'),
+        #     ])
+        # )
+
+        # 4) Graph and data feedback Divs
+        for fig in figList:
 
-                # create dictionary with the layout and data 
-                figdict = {'layout':{'title': grTitle,
-                                    'xaxis':{'title': xLabel, 'hoverformat': hfmt_x},
-                                    'yaxis':{'title': yLabel, 'hoverformat': hfmt_y},	
-                                    'clickmode': 'event+select',
-                                    'hovermode': 'x',           # set compare data on hover
-                                    'plot_bgcolor': backgroundColor, 
-                                    },
-                            'data':thisGraphData}
-           
-                #  store the id of this set - to be used in callback function generation
-                #  we mark all relevant Divs with this string
-                grID = graph+setStr
-                grList.append(grID)
+            if fig['subplots']:
+                import visdcc
 
+                # for subplots we have only one Graph Div
+                thisDivList.append(
+                    html.Div
+                    (
+                        [
+                            dcc.Graph
+                            (
+                                id=fig['id'], 
+                                figure=fig['figure'],
+                            ),
+                            visdcc.Run_js(id='hover-js')  # need this to get the hover data on all lines of all subplots simultaneously
+                        ]
+                    )
+                )
+            else:
                 # Div with dcc.Graph using the figdict
                 thisDivList.append(
                     html.Div
@@ -660,45 +4685,21 @@ class DashLinePlot():
                         [
                             dcc.Graph
                             (
-                                id=grID,
-                                figure=figdict,
-                                style={'height': str(dft.loc['Height','Value']),'padding':20},
+                                id=fig['id'],
+                                figure=fig['figure'],
+                                style={'height': fig['height'],'padding':20},
                             )
                         ]
                     )
                 )
 
-                # Divs for click data and rectangle tool data feedback
-                thisDivList.append(self.generateFeedbackBoxes(grID, isMarkers))
-                
-                if toDisk:
-                    self.graphToDisk(figdict, f'{grDir}/{graph}#{setStr}')
-
-        # only one Graph Div if all graphs are in subplots
-        if useSubplots:
-
-            figdict.update_layout(height=numGraphSets*grHeight)  
-
-            # Div with dcc.Graph using the figdict
-            thisDivList.append(
-                html.Div
-                (
-                    [
-                        dcc.Graph
-                        (
-                            id=graph, 
-                            figure=figdict,
-                        ),
-                        visdcc.Run_js(id='hover-js')  # need this to get the hover data on all lines of all subplots simultaneously
-                    ]
-                )
-            )
-
-            # Divs for click data and rectangle tool data feedback          
-            thisDivList.append(self.generateFeedbackBoxes(graph, isMarkers))
+            # Divs for click data and rectangle tool data feedback
+            thisDivList.append(self.generateFeedbackBoxes(fig['id'], fig['isMarkers'], 
+                                                          [source['name'] for source in self.traceRegistry.get(fig['id'], [])]))
 
-            if toDisk:
-                self.graphToDisk(figdict, f'{grDir}/{graph}')
+            if fig['file'] is not None:
+                self.graphToDisk(fig['figure'], fig['file'])
+                self.exportedFiles.add(fig['file'])
 
         # 5) Div bottom text: if supplied, append the sheet bottom text
         if 'GraphBottom' in dft.index:
@@ -723,7 +4724,118 @@ class DashLinePlot():
                     )
         )
 
-        return thisDivList, grList, xData.min(), xData.max()
+        return thisDivList, grList, xmin, xmax
+
+    ##########################################
+    def isIncluded(self, dft):
+        """
+        Check the Include flag of a graph set
+
+        Args:
+            | dft (pd.dataframe): info for this graph set.
+
+        Returns:
+            | toInclude (bolean): True if the graph set must be included, default True.
+
+        """
+        toInclude = True
+        if 'Include' in dft.index:
+            if not np.isnan(dft[(dft['Variable']=='Include')]['Value'].values[0]):
+                toInclude = dft[(dft['Variable']=='Include')]['Value'].values[0]
+
+        return toInclude
+
+    ##########################################
+    def isToDisk(self, dft):
+        """
+        Check the ToDisk flag of a graph set
+
+        Args:
+            | dft (pd.dataframe): info for this graph set.
+
+        Returns:
+            | toDisk (bolean): True if the graphs must be saved as html, default True.
+
+        """
+        toDisk = True
+        if 'ToDisk' in dft.index:
+            if not np.isnan(dft[(dft['Variable']=='ToDisk')]['Value'].values[0]):
+                toDisk = dft[(dft['Variable']=='ToDisk')]['Value'].values[0]
+
+        return toDisk
+
+    ##########################################
+    def buildTab(self, tabNum):
+        """
+        Build the contents of a tab, used by the tab cache
+
+        Args:
+            | tabNum (int): tab number on the page.
+
+        Returns:
+            | divSet (list): list of html Divs.
+            | nbytes (int): memory held by the figure data.
+
+        """
+        dft, graphTab = self.tabConfigs[tabNum]
+        reqStart, reqEnd = self.tabRanges[tabNum]
+        divSet, _, _, _ = self.makeGraphSet(dft, graphTab, reqStart, reqEnd)
+        return divSet, divSetBytes(divSet)
+
+    ##########################################
+    def exportPass(self):
+        """
+        Write the html exports of the tabs not yet built, then remove stale exports.
+
+        With the tabs built on request, this runs as a job of the background tab prefetcher
+        after the first tab is served, so that all the graphs are still exported as before.
+        The figures are built one tab at a time and not kept. 
+        The generator yields after each tab, to give way to foreground requests and prefetching.
+
+        Args:
+            | None.
+
+        Returns:
+            | None.
+
+        """
+        for tabNum, (dft, graphTab) in enumerate(self.tabConfigs):
+            if tabNum in divSets or not self.isToDisk(dft):
+                continue
+            figList, _, _ = self.buildFigures(dft, graphTab, *self.tabRanges[tabNum])
+            for fig in figList:
+                if fig['file'] is not None:
+                    self.graphToDisk(fig['figure'], fig['file'])
+                    self.exportedFiles.add(fig['file'])
+            yield
+
+        # html files of graphs no longer in the config are removed
+        self.removeStaleExports(self.exportedFiles)
+
+    ##########################################
+    def tabServed(self, tabNum):
+        """
+        Plan the background preparation after a tab is served: first the neighbouring tabs,
+        then the most recently viewed tabs. The html export pass is started with the first tab.
+
+        Args:
+            | tabNum (int): tab number served.
+
+        Returns:
+            | None.
+
+        """
+        if tabNum in self.tabHistory:
+            self.tabHistory.remove(tabNum)
+        self.tabHistory.append(tabNum)
+
+        plan = [tabNum + 1, tabNum - 1] + self.tabHistory[-2::-1][:prefetchRecentTabs]
+        plan = [t for t in dict.fromkeys(plan) if 0 <= t < len(divSets) and t != tabNum]
+        self.prefetcher.schedule(plan)
+
+        if not self.exportPassStarted:
+            self.exportPassStarted = True
+            self.prefetcher.addJob(self.exportPass())
 
     ##########################################
     def prepareGraphs(self):
@@ -741,12 +4853,6 @@ class DashLinePlot():
         global divSets
         global graphTabs
         global graphList
-        global sliderMinValues
-        global sliderMaxValues
-
-        # divSets to be used when constructing the page
-        # each entry in this list is a different tab containing several graphs
-        divSets = []
 
         # list with the names of the tabs on the page
         graphTabs = []
@@ -754,10 +4860,6 @@ class DashLinePlot():
         #  List of all the unique graph names for which we need to register callback functions
         graphList = []
 
-        # slider limits
-        sliderMinValues = []
-        sliderMaxValues = []
-        
         # make a list of all possible graph tabs and graphs sets in dataframe dfg
         # to be used in generating all possible callbacks
         global allTabs, allTabUsedIdx
@@ -767,9 +4869,20 @@ class DashLinePlot():
         global allGraphs
         allGraphs = []
 
+        # graphs with density traces, binned again on the server when zoomed
+        global allDensityGraphs
+        allDensityGraphs = []
+
         # counter for active tabs
         tabIndex = 0
 
+        # html files exported for this config
+        self.exportedFiles = set()
+
+        # config and requested x-range of each tab, used to build the tab when requested
+        self.tabConfigs = []
+        self.tabRanges = []
+
         # for each graph tab in the input data, i.e. each sheet starting with 'graph-'
         for i, graphTab in enumerate(allTabs):
 
@@ -778,30 +4891,169 @@ class DashLinePlot():
             
             # extract all graph names for this tab    
             titleRows = dft[(dft['Variable']=='Title')]
+            yRows = dft[(dft['Variable']=='yValue')]
             for index, row in titleRows.iterrows():
                 setStr = str(index).split('#')[1]
                 grID = graphTab+setStr
                 allGraphs.append(grID)
+                if any(self.densityType(yRow) is not None for yIndex, yRow in yRows.iterrows() 
+                       if 'yValue#'+setStr in yIndex):
+                    allDensityGraphs.append(grID)
             
-            # First check exclude flag
-            toInclude = True
-            if 'Include' in dft.index:
-                if not np.isnan(dft[(dft['Variable']=='Include')]['Value'].values[0]):
-                    toInclude = dft[(dft['Variable']=='Include')]['Value'].values[0]
-            
-            # collect data and build the data for the sheet
-            if toInclude:
+            # register the sheet, if not excluded
+            # the graphs are only built when the tab is requested
+            if self.isIncluded(dft):
                 allTabUsedIdx[i] = tabIndex
                 tabIndex = tabIndex + 1
 
-                divSet, grList, xmin, xmax = self.makeGraphSet(dft, graphTab)
-
-                divSets.append(divSet)
-                graphList.append(grList)
-                sliderMinValues.append(xmin)
-                sliderMaxValues.append(xmax)
+                self.tabConfigs.append((dft, graphTab))
+                self.tabRanges.append((0, 0))
+                graphList.append(self.graphIds(dft, graphTab))
                 graphTabs.append(graphTab.split('-')[1])
 
+        # slider limits of each tab, evaluated when first needed so that only the data
+        # files of the tabs viewed are read
+        self.tabLimits = [None] * len(self.tabConfigs)
+
+        # divSets to be used when constructing the page
+        # each entry is a different tab containing several graphs, built when first requested
+        # the tabs of a previous config are removed from the memory budget
+        if isinstance(globals().get('divSets'), TabCache):
+            for tabNum in range(len(divSets)):
+                divSets.invalidate(tabNum)
+        divSets = TabCache(self.buildTab, len(self.tabConfigs), memoryBudget)
+
+        # the html exports of tabs not yet viewed are written after the first tab is served
+        self.exportPassStarted = False
+
+        # tabs next to the tab served and the recently viewed tabs are prepared in the background
+        if getattr(self, 'prefetcher', None) is not None:
+            self.prefetcher.stop()
+        self.prefetcher = TabPrefetcher(divSets)
+        self.tabHistory = []
+
+        # without callbacks all tabs are on the page, build them now
+        # the tabs are built in parallel and stored in sheet order
+        if not self.useCallbacks:
+            for tabNum, (divSet, nbytes) in enumerate(parallelMap(self.buildTab, range(len(divSets)))):
+                divSets.insert(tabNum, divSet, nbytes)
+            self.removeStaleExports(self.exportedFiles)
+            self.exportPassStarted = True
+
+    ##########################################
+    def removeStaleExports(self, fbasenames):
+        """
+        Remove html exports recorded for this config in the graphs folder manifests that are no longer produced.
+
+        Args:
+            | fbasenames (set): file base names of all the current exports.
+
+        Returns:
+            | None.
+
+        """
+        folders = set(os.path.normpath(os.path.dirname(fbasename)) for fbasename in fbasenames)
+        folders.add(os.path.normpath('./graphs'))
+        for folder in folders:
+            if os.path.isdir(folder):
+                manifest = graphManifest(folder)
+                current = [fbasename for fbasename in fbasenames 
+                           if os.path.normpath(os.path.dirname(fbasename)) == folder]
+                for filename in manifest.removeStale(current, exportConfig):
+                    print(f'Removed stale export {filename}')
+                manifest.save()
+
+    ##########################################
+    def exportGraphs(self, configfile, workers=None):
+        """
+        Headless export of the html graph files, no Qt window or Flask server is started.
+
+        The config and data are loaded and all included graph sets are built in this process,
+        on a pool of threads. The html files are then written in parallel across a pool of worker processes.
+        A timing summary for each file is printed at the end.
+
+        Args:
+            | configfile (string): Excel configuration file defining the graphs.
+            | workers (int): number of worker threads and processes (default None, i.e. the number of processors).
+
+        Returns:
+            | success (bolean): True if all the requested files were written.
+
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        tStart = time.perf_counter()
+
+        self.loadConfig(configfile)
+        markStartup('config loaded')
+        if not self.loadData():
+            return False
+        markStartup('data loaded')
+
+        tLoaded = time.perf_counter()
+
+        # build the figures of all included graph sets with ToDisk set
+        # the graph sets are built in parallel threads, the jobs are kept in sheet order
+        tabConfigs = []
+        for graphTab in dfPlotterConfig['Graph'].unique():
+            dft = dfPlotterConfig[(dfPlotterConfig['Graph']==graphTab)]
+            if self.isIncluded(dft):
+                tabConfigs.append((dft, graphTab))
+
+        jobs = []
+        for figList, _, _ in parallelMap(lambda tabConfig: self.buildFigures(*tabConfig), tabConfigs, workers):
+            jobs.extend([(fig['figure'], fig['file']) for fig in figList if fig['file'] is not None])
+
+        tBuilt = time.perf_counter()
+        markStartup('figures built')
+
+        # plotly.js is written once to each output folder, before the workers start
+        for folder in sorted(set(os.path.dirname(fbasename) for _, fbasename in jobs)):
+            copyPlotlyJs(folder)
+
+        # figures identical to the files on disk are not written again
+        hashes = [figureHash(figdict) for figdict, _ in jobs]
+        toWrite = [not graphManifest(os.path.dirname(fbasename)).unchanged(fbasename, figHash)
+                   for (_, fbasename), figHash in zip(jobs, hashes)]
+
+        # write the files in parallel, results are collected in sheet order
+        results = []
+        success = True
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(exportWorker, figdict, fbasename) if write else None
+                       for (figdict, fbasename), write in zip(jobs, toWrite)]
+            for (figdict, fbasename), figHash, future in zip(jobs, hashes, futures):
+                if future is None:
+                    results.append((f'{fbasename}.html', None, os.path.getsize(f'{fbasename}.html')))
+                    continue
+                try:
+                    results.append(future.result())
+                    graphManifest(os.path.dirname(fbasename)).record(fbasename, figHash, exportConfig)
+                except Exception as e:
+                    print(f'Export of {fbasename}.html failed: {e}')
+                    success = False
+
+        # html files of graphs no longer in the config are removed
+        self.removeStaleExports(set(fbasename for _, fbasename in jobs))
+
+        tDone = time.perf_counter()
+
+        # timing summary
+        numWritten = sum(toWrite)
+        print(f'\nExported {len(results)} of {len(jobs)} html files, {len(jobs) - numWritten} unchanged')
+        print(f'{"seconds":>10} {"kB":>10}  file')
+        for filename, seconds, nbytes in results:
+            if seconds is None:
+                print(f'{"unchanged":>10} {nbytes/1024:10.0f}  {filename}')
+            else:
+                print(f'{seconds:10.3f} {nbytes/1024:10.0f}  {filename}')
+        print(f'\nConfig and data load: {tLoaded - tStart:8.3f} s')
+        print(f'Figure build:         {tBuilt - tLoaded:8.3f} s')
+        print(f'Html export (wall):   {tDone - tBuilt:8.3f} s')
+        print(f'Total:                {tDone - tStart:8.3f} s\n')
+
+        return success
+
     ##########################################
     def makePage(self):
         """
@@ -814,6 +5066,8 @@ class DashLinePlot():
             | page (html Div): created page.
 
         """
+        from dash import dcc
+        from dash import html
 
         # each entry in this list is a different tab containing several graphs
         lsttabs = []
@@ -826,9 +5080,7 @@ class DashLinePlot():
         #          Tab(id='MissilePosition', label='MissilePosition', value='Tab 3'), 
         #          Tab(id='Attitude', label='Attitude', value='Tab 4'), 
         #          Tab(id='gimbalFromxls', label='gimbalFromxls', value='Tab 5')]
-        for tabNum, tabSet in enumerate(divSets):
-
-            tabLabel = graphTabs[tabNum]
+        for tabNum, tabLabel in enumerate(graphTabs):
 
             # if we use callbacks only the tab is created, i.e. no data added
             # the graphs are only added to the tab when the user clicks on the tab
@@ -841,7 +5093,7 @@ class DashLinePlot():
             else:
                 lsttabs.append(
                     dcc.Tab(value='Tab ' + str(tabNum), label=tabLabel, id=tabLabel, children=[
-                        *tabSet,
+                        *divSets[tabNum],
                     ]))
 
         # create the page to be rendered in the browser, using all active tabs as requested via config
@@ -893,18 +5145,46 @@ class DashLinePlot():
 
         """
 
+        pd.set_option('display.max_rows', 500)
+
         # read the config file
         cxls = pd.ExcelFile(configfile)
 
+        # the html exports are recorded with the config that produced them
+        global exportConfig
+        exportConfig = os.path.normcase(os.path.abspath(configfile))
+
         # header dataframe, i.e the data on the 'header' tab in the xlsx file 
         global dfPlotterHeader
         dfPlotterHeader = pd.read_excel(cxls, 'header')
         dfPlotterHeader = dfPlotterHeader.set_index('Variable')
         masterDataFile =  dfPlotterHeader.loc['Datafile','Value']
 
+        # memory limit for the data files, derived arrays and figures held by the plotter
+        # TabCacheMB is still accepted when MemoryLimitMB is not given
+        memoryLimitMB = 2048
+        for variable in ['MemoryLimitMB', 'TabCacheMB']:
+            if variable in dfPlotterHeader.index and not np.isnan(dfPlotterHeader.loc[variable,'Value']):
+                memoryLimitMB = dfPlotterHeader.loc[variable,'Value']
+                break
+        memoryBudget.setLimit(memoryLimitMB * 1024**2)
+
+        # named derived columns on the optional Derived sheet, the Value is the expression 
+        derived = {}
+        for sheetname in cxls.sheet_names:
+            if sheetname.lower() == 'derived':
+                dfDerived = pd.read_excel(cxls, sheetname)
+                for index, row in dfDerived.iterrows():
+                    if isinstance(row['Variable'], str) and isinstance(row['Value'], str) and not row['Value'].startswith('#'):
+                        derived[row['Variable'].strip()] = row['Value'].strip().lstrip('=')
+                    elif isinstance(row['Variable'], str):
+                        print(f"Derived sheet, row {index + 2}: {row['Variable']} has no expression ({row['Value']}), "
+                              f"expressions are entered without a leading '=', which Excel reads as a formula")
+        expressionEngine.setDefinitions(derived)
+
         # get a list of graph sheetnames (ignore the header sheet)
-        cwb =  oxl.load_workbook(configfile)
-        sheetnames = [sn for sn in cwb.sheetnames if 'graph' in sn]
+        # the workbook is already open, do not load it a second time with openpyxl
+        sheetnames = [sn for sn in cxls.sheet_names if 'graph' in sn]
 
         # dataframe to contain ALL the sheets' info
         global dfPlotterConfig
@@ -935,6 +5215,10 @@ class DashLinePlot():
                     dft.loc[index,'Index'] = f"{row['Variable']}#{theSet:03d}-{i:03d}"
                     i = i + 1
 
+            # traces can refer to the master data file in their own Datafile column
+            if 'Datafile' in dft.columns:
+                dft.loc[dft['Datafile']=='master', 'Datafile'] = masterDataFile
+
             # make 'Index' column the index
             dft = dft.set_index('Index')
             # append this sheet to the master data frame
@@ -1005,15 +5289,13 @@ class DashLinePlot():
             else:
                 dfData = df
 
+            # rename in place, the time column stays the first column
             if '%Time' in dfData.columns.values[0]:
-                dfData['Time'] = dfData['%Time']
-                dfData.drop(['%Time'], axis=1,inplace=True)
+                dfData = dfData.rename(columns={'%Time': 'Time'})
             if '%CurrentSimTime' in dfData.columns.values[0]:
-                dfData['CurrentSimTime'] = dfData['%CurrentSimTime']
-                dfData.drop(['%CurrentSimTime'], axis=1,inplace=True)
+                dfData = dfData.rename(columns={'%CurrentSimTime': 'CurrentSimTime'})
             if '%t' in dfData.columns:
-                dfData['t'] = dfData['%t']
-                dfData.drop(['%t'], axis=1,inplace=True)
+                dfData = dfData.rename(columns={'%t': 't'})
                 
         # load comma separated data
         if comma or '.csv' in filename:
@@ -1032,7 +5314,7 @@ class DashLinePlot():
     ##########################################
     def loadData(self):
         """
-        Load all the data from all files supplied
+        Check the data files of all the sheets, the files are read by the data file cache when a tab first needs them
 
         Args:
             | None. 
@@ -1042,63 +5324,98 @@ class DashLinePlot():
             
         """
     
-        # get data filenames from all sheets
-        datafilenames = dfPlotterConfig[(dfPlotterConfig['Variable']=='Datafile')]['Value'].unique()
-
-        self.datafiles = {}
+        # get data filenames from all sheets, and from the traces with their own data file
+        # glob patterns and run lists are expanded to the individual files
+        # the runs of envelope graphs are read by the envelope statistics, only the first is loaded
+        datafilenames = []
+        for graphTab in dfPlotterConfig['Graph'].unique():
+            runFiles, envelopeOnly = self.graphRuns(dfPlotterConfig[(dfPlotterConfig['Graph']==graphTab)])
+            for datafilename in (runFiles[:1] if envelopeOnly else runFiles):
+                if datafilename not in datafilenames:
+                    datafilenames.append(datafilename)
+        if 'Datafile' in dfPlotterConfig.columns:
+            for datafilename in dfPlotterConfig['Datafile'].dropna().unique():
+                if isinstance(datafilename, str) and datafilename not in datafilenames:
+                    datafilenames.append(datafilename)
+
+        # data files of the closest approach annotations
+        if 'ClosestApproach' in dfPlotterConfig.index:
+            for value in dfPlotterConfig.loc[['ClosestApproach'], 'Value']:
+                if isinstance(value, str):
+                    datafilenames.extend(f for f in expandDatafiles(value) if f not in datafilenames)
+
+        # the data files are held in the memory budget and read again if released
+        # derived columns can use columns of other data files
+        self.datafiles = DataFileCache(self.loadDatafile, memoryBudget)
+        expressionEngine.datafiles = self.datafiles
         self.dateCreated = str(datetime.date.today())
 
         # run through all unique file names
 
         success = True
         for datafilename in datafilenames:
+            if not os.path.isfile(datafilename):
+                print(f'Data file {datafilename} for plotting not found, please provide a valid file name in the config file!\n ')
+                success = False
 
-            if os.path.isfile(datafilename):
-
-                # determine what type of file is this by looking at the file extension
-                extension = os.path.splitext(datafilename)[1]
-
-                # matlab format files
-                # note that here we rely on the Denel GTV matlab file which has 
-                #  * the data stored in 'DATA'
-                #  * the data column names in 'NAM'
-                #  * the time variable is called 'TIME'
-                # if other applications need matlab file capability this must be generalised
-                if 'mat' in extension:
+        # the files are read when a tab first needs them, see buildFigures
+        return success
 
-                    # load the gtv telemetry data in matlab format file
-                    # scipy reads in structures as structured numpy arrays of dtype object
-                    # returns a dictionary with variable names as keys, and loaded matrices as values.
-                    from scipy.io import loadmat
-                    dataMat = loadmat(datafilename)
+    ##########################################
+    def loadDatafile(self, datafilename):
+        """
+        Load the data from one file, used by the data file cache
 
-                    # create the dataframe
-                    self.datafiles[datafilename] = pd.DataFrame(dataMat['DATA'], columns=dataMat['NAM'])
+        Args:
+            | datafilename (string): data file name. 
 
-                    # set beginning of data set as time zero
-                    self.datafiles[datafilename]['TIME'] = self.datafiles[datafilename]['TIME'] - self.datafiles[datafilename]['TIME'][0]
-                    
-                    # get date 
-                    self.dateCreated = dataMat['Date_Created'][0]
-
-                # Excel data files
-                # top row is data column names
-                # Only the first sheet is loaded
-                # To be generalised to specify the sheet from the config file
-                elif 'xls' in extension:
-                    self.datafiles[datafilename] = pd.read_excel(datafilename, index_col=None)
-
-                #  csv files
-                #  top line is column names
-                else:
-                    self.datafiles[datafilename] = self.readdatafile(datafilename)
-                    # pd.read_csv(datafilename, sep="\s+|,|;", index_col=None,engine='python')
-    
-            else:
-                print(f'Data file {datafilename} for plotting not found, please provide a valid file name in the config file!\n ')
-                success = False
+        Returns:
+            | store (ColumnStore): columns of the loaded data.
+            
+        """
+        # determine what type of file is this by looking at the file extension
+        extension = os.path.splitext(datafilename)[1]
+
+        # matlab format files
+        # note that here we rely on the Denel GTV matlab file which has 
+        #  * the data stored in 'DATA'
+        #  * the data column names in 'NAM'
+        #  * the time variable is called 'TIME'
+        # if other applications need matlab file capability this must be generalised
+        if 'mat' in extension:
+
+            # load the gtv telemetry data in matlab format file
+            # scipy reads in structures as structured numpy arrays of dtype object
+            # returns a dictionary with variable names as keys, and loaded matrices as values.
+            from scipy.io import loadmat
+            dataMat = loadmat(datafilename)
+
+            # create the dataframe
+            df = pd.DataFrame(dataMat['DATA'], columns=dataMat['NAM'])
+
+            # set beginning of data set as time zero
+            df['TIME'] = df['TIME'] - df['TIME'][0]
+            
+            # get date 
+            self.dateCreated = dataMat['Date_Created'][0]
+
+        # Excel data files
+        # top row is data column names
+        # Only the first sheet is loaded
+        # To be generalised to specify the sheet from the config file
+        elif 'xls' in extension:
+            df = pd.read_excel(datafilename, index_col=None)
+
+        #  csv files
+        #  top line is column names
+        else:
+            df = self.readdatafile(datafilename)
+            # pd.read_csv(datafilename, sep="\s+|,|;", index_col=None,engine='python')
+            if df is None:
+                return None
 
-        return success
+        # pandas is only used to parse the file, the graphs use the numpy columns
+        return ColumnStore.fromDataFrame(df, datafilename)
 
     ##########################################
     #
@@ -1114,6 +5431,8 @@ class DashLinePlot():
             | None.
             
         """
+        import dash
+
         # start a dash app, which also starts a Flask server
         # it is important to set the name parameter of the Dash instance to the value __name__, 
         # so that Dash can correctly detect the location of any static assets inside an assets 
@@ -1141,6 +5460,30 @@ class DashLinePlot():
         # when you make a change in your Python or CSS code.
         dashApp.run_server(debug=False, port=port, use_reloader=False)
 
+    ##########################################
+    @staticmethod
+    def graphXRange(selectedData, relayoutData):
+        """
+        x-range of the rectangle selection on a graph, else of the zoom, else None for all data
+
+        Args:
+            | selectedData (dict): selectedData of the graph.
+            | relayoutData (dict): relayoutData of the graph.
+
+        Returns:
+            | xRange (list): x-range, None if not selected or zoomed.
+
+        """
+        if selectedData is not None and 'range' in selectedData:
+            # the first key of the range is the x-axis, also for subplots
+            rangeDict = selectedData['range']
+            return rangeDict[next(iter(rangeDict))]
+        if relayoutData is not None and 'xaxis.range[0]' in relayoutData:
+            return [relayoutData['xaxis.range[0]'], relayoutData['xaxis.range[1]']]
+        if relayoutData is not None and 'xaxis.range' in relayoutData:
+            return relayoutData['xaxis.range']
+        return None
+
     def setupCallbacks(self):
         """
         Generate all callback functions required
@@ -1152,6 +5495,10 @@ class DashLinePlot():
             | None.
             
         """
+        import dash
+        from dash.dependencies import Input, Output, State
+        from dash import html
+
         # prepare for hover labels accross shared axes
         #   * can only be done when doing subplots
         #   * used the tricks from here
@@ -1214,7 +5561,56 @@ class DashLinePlot():
         )
         def render_content(tab):
             tabNum = int(tab.split(' ')[1])
-            return [divSets[tabNum]]
+            # the tab is built on first request, tabs prepared by the background worker are in the cache
+            try:
+                divSet = divSets[tabNum]
+            except ValueError as err:
+                # e.g. a column of the config that is not in the data file, shown instead of the graphs
+                print(err)
+                return [html.Div([html.Pre(str(err))], style={'color': 'red', 'padding': '20px'})]
+
+            # prepare the neighbouring tabs and write the exports of the other tabs in the background
+            self.tabServed(tabNum)
+
+            return [divSet]
+
+        # the background worker gives way while any callback is being served
+        from flask import request, g, Response
+
+        @dashApp.server.before_request
+        def foreground_start():
+            if request.path.endswith('_dash-update-component'):
+                g.foreground = True
+                self.prefetcher.foregroundStart()
+
+        @dashApp.server.teardown_request
+        def foreground_end(exc):
+            if g.pop('foreground', False):
+                self.prefetcher.foregroundEnd()
+
+        # current memory usage of the data files, derived arrays and figures, on request
+        @dashApp.server.route('/memory')
+        def memory_usage():
+            from flask import jsonify
+            return jsonify(memoryBudget.usage())
+
+        # data of the traces of a graph in an x-range, streamed as a csv, npz or mat file
+        @dashApp.server.route('/export/<grID>')
+        def export_graph(grID):
+            fmt = request.args.get('format', 'csv')
+            if fmt not in ('csv', 'npz', 'mat') or grID not in self.traceRegistry:
+                return Response(f'No export of {grID} as {fmt}', status=404)
+            if fmt == 'mat':
+                try:
+                    import scipy.io
+                except ImportError:
+                    return Response('MAT export requires scipy', status=501)
+
+            xRange = [request.args.get(key, type=float) for key in ('x0', 'x1')]
+            columns = self.exportColumns(grID, *xRange)
+            mimetypes = {'csv': 'text/csv', 'npz': 'application/octet-stream', 'mat': 'application/octet-stream'}
+            return Response(exportStream(columns, fmt), mimetype=mimetypes[fmt],
+                            headers={'Content-Disposition': f'attachment; filename={grID}.{fmt}'})
     
         # generate data clicked and selected callback functions for all possible graphs in the config
         # i.e. subplots as well as individual graph sets
@@ -1266,6 +5662,15 @@ class DashLinePlot():
                             f'Range [x, y]: [{self.clickedData[id][3][0]:.6f}, {self.clickedData[id][3][1]:.6f}]' 
                     )
 
+                    # all traces at both cursors, with the change from the previous to the current cursor
+                    current = self.cursorReadout(id, self.clickedData[id][indCur][0])
+                    previous = self.cursorReadout(id, self.clickedData[id][indexPrev][0])
+                    if current:
+                        width = max(len(name) for name, _ in current)
+                        msg += f'\n\n{"Trace":<{width}} {"Previous":>14} {"Current":>14} {"Delta":>14}'
+                        for (name, valueCur), (_, valuePrev) in zip(current, previous):
+                            msg += f'\n{name:<{width}} {valuePrev:>14.6f} {valueCur:>14.6f} {valueCur - valuePrev:>14.6f}'
+
                 return msg 
 
             @dashApp.callback(
@@ -1301,6 +5706,142 @@ class DashLinePlot():
 
                 return msg 
 
+            @dashApp.callback(
+                Output('stats-'+theGraph, 'children'), # statistics box id and children
+                [Input(theGraph, 'selectedData')],   # graph id and selectedData
+                [State(theGraph,'id')]
+            )
+            def display_selection_stats(selectedData, id):
+
+                if selectedData is None or 'range' not in selectedData:
+                    return 'none selected'
+
+                # the first key of the range is the x-axis, also for subplots
+                rangeDict = selectedData['range']
+                xRange = rangeDict[next(iter(rangeDict))]
+                statsList = self.selectionStatistics(id, min(xRange), max(xRange))
+
+                columns = [('Trace', 'name'), ('Count', 'count'), ('Min', 'min'), ('Max', 'max'), 
+                           ('Mean', 'mean'), ('RMS', 'rms'), ('Std', 'std'), ('First', 'first'), 
+                           ('Last', 'last'), ('Peak at x', 'peak')]
+                tableRows = [html.Tr([html.Th(label) for label, _ in columns])]
+                for stats in statsList:
+                    cells = [stats['name'], str(stats['count'])]
+                    cells += [f'{stats[key]:.6g}' if key in stats else '' for _, key in columns[2:]]
+                    tableRows.append(html.Tr([html.Td(cell) for cell in cells]))
+
+                return html.Table(tableRows)
+
+            @dashApp.callback(
+                [Output('spectrum-'+theGraph, 'figure'), Output('spectrum-'+theGraph, 'style')],
+                [Input('spectrum-button-'+theGraph, 'n_clicks'), 
+                 Input('spectrum-method-'+theGraph, 'value')],
+                [State(theGraph, 'selectedData'), 
+                 State(theGraph, 'relayoutData'), 
+                 State(theGraph,'id')]
+            )
+            def display_spectrum(nClicks, method, selectedData, relayoutData, id):
+
+                if not nClicks:
+                    return {}, {'display': 'none'}
+
+                xRange = self.graphXRange(selectedData, relayoutData)
+                if xRange is None:
+                    figure = self.spectrumFigure(id, method=method)
+                else:
+                    figure = self.spectrumFigure(id, min(xRange), max(xRange), method)
+                return figure, {'display': 'block'}
+
+            @dashApp.callback(
+                [Output('xcorr-result-'+theGraph, 'children'), 
+                 Output('xcorr-'+theGraph, 'figure'), 
+                 Output('xcorr-'+theGraph, 'style')],
+                [Input('xcorr-button-'+theGraph, 'n_clicks')],
+                [State('xcorr-first-'+theGraph, 'value'),
+                 State('xcorr-second-'+theGraph, 'value'),
+                 State(theGraph, 'selectedData'), 
+                 State(theGraph, 'relayoutData'), 
+                 State(theGraph,'id')]
+            )
+            def display_correlation(nClicks, first, second, selectedData, relayoutData, id):
+
+                if not nClicks or first is None or second is None:
+                    return 'none computed', {}, {'display': 'none'}
+
+                xRange = self.graphXRange(selectedData, relayoutData) or [None, None]
+                result = self.traceCorrelation(id, first, second, 
+                                               None if xRange[0] is None else min(xRange), 
+                                               None if xRange[1] is None else max(xRange))
+                if result is None:
+                    return 'traces not available or not enough data in the x-range', {}, {'display': 'none'}
+
+                lags, correlation, lag, peak = result
+                names = [source['name'] for source in self.traceRegistry[id]]
+                msg = (f'{names[second]} delayed with respect to {names[first]} by {lag:.6f}\n'
+                       f'Peak correlation: {peak:.4f}')
+
+                # the correlation is reduced to the point budget, keeping the peaks
+                keep = decimateMinMax(correlation, spectrumPoints)
+                figure = {'layout': {'title': f'Cross-correlation of {names[first]} and {names[second]}',
+                                     'xaxis': {'title': 'Lag [x unit]'},
+                                     'yaxis': {'title': 'Correlation'},
+                                     'hovermode': 'x',
+                                     'plot_bgcolor': 'aliceblue',
+                                     'shapes': [{'type': 'line', 'xref': 'x', 'yref': 'paper', 'x0': lag, 'x1': lag, 
+                                                 'y0': 0, 'y1': 1, 'line': {'color': 'red', 'width': 1, 'dash': 'dot'}}]},
+                          'data': [{'x': lags[keep], 'y': correlation[keep], 'mode': 'lines', 'type': 'scattergl',
+                                    'name': 'correlation'}]}
+                return msg, figure, {'display': 'block'}
+
+            @dashApp.callback(
+                Output('export-'+theGraph, 'href'),
+                [Input('export-format-'+theGraph, 'value'),
+                 Input(theGraph, 'selectedData'), 
+                 Input(theGraph, 'relayoutData')],
+                [State(theGraph,'id')]
+            )
+            def update_export_link(fmt, selectedData, relayoutData, id):
+                from urllib.parse import quote, urlencode
+                query = {'format': fmt}
+                xRange = self.graphXRange(selectedData, relayoutData)
+                if xRange is not None:
+                    query.update({'x0': min(xRange), 'x1': max(xRange)})
+                return f'/export/{quote(id)}?{urlencode(query)}'
+
+        # graphs with density traces are binned again when zoomed, only these graphs 
+        # send their zoom to the server
+        for gr in allDensityGraphs:
+            theGraph = str(gr)
+
+            @dashApp.callback(
+                Output(theGraph, 'figure'),
+                [Input(theGraph, 'relayoutData')],
+                [State(theGraph,'id')]
+            )
+            def rebin_density(relayoutData, id):
+                # the figure is sent again with the density traces binned for the zoomed ranges
+                if id not in self.densityGraphs or not relayoutData:
+                    return dash.no_update
+                figdict, densityTraces = self.densityGraphs[id]
+
+                ranges = {}
+                for axis in ('xaxis', 'yaxis'):
+                    if f'{axis}.range[0]' in relayoutData:
+                        ranges[axis] = [relayoutData[f'{axis}.range[0]'], relayoutData[f'{axis}.range[1]']]
+                    elif f'{axis}.range' in relayoutData:
+                        ranges[axis] = relayoutData[f'{axis}.range']
+                    elif relayoutData.get(f'{axis}.autorange'):
+                        ranges[axis] = None
+                if not ranges:
+                    return dash.no_update
+
+                # the stored figure is not changed, it is the full range figure of the tab
+                figure = dict(figdict, data=list(figdict['data']))
+                for traceNum, source in densityTraces:
+                    trace = self.densityTrace(source, ranges.get('xaxis'), ranges.get('yaxis'))
+                    figure['data'][traceNum] = dict(figure['data'][traceNum], x=trace['x'], y=trace['y'], z=trace['z'])
+                return figure
+
         # time slider callback for each tab - display selected values of the slider
         for gr in allTabs:
             theGraph = str(gr)
@@ -1317,26 +5858,24 @@ class DashLinePlot():
             def process_xSlider_data(value, nclicks, tab, mini, maxi):
                 # tab number in the current page layout
                 tabNum = int(tab.split(' ')[1])
-                graphSetName = 'graph-'+graphTabs[tabNum]
-                # select the graph data
-                dft = dfPlotterConfig[(dfPlotterConfig['Graph']==graphSetName)] 
                 # determine which input triggered the callback
                 ctx = dash.callback_context
                 clicked_id = ctx.triggered[0]['prop_id'].split('.')[0]
                 # Get slider limits from input fields
                 if 'submit' in clicked_id:
+                    low, hi = self.sliderLimits(tabNum)
                     start = mini
-                    if start < sliderMinValues[tabNum]:
-                        start = sliderMinValues[tabNum]
+                    if start < low:
+                        start = low
                     end = maxi
-                    if end > sliderMaxValues[tabNum]:
-                        end = sliderMaxValues[tabNum] 
+                    if end > hi:
+                        end = hi 
                     value[0] = start
                     value[1] = end
 
-                # update the graph set
-                global divSets
-                divSets[tabNum], _, _, _ = self.makeGraphSet(dft, graphSetName, value[0], value[1]) 
+                # update the graph set, it is rebuilt for the new range when the tab is requested
+                self.tabRanges[tabNum] = (value[0], value[1])
+                divSets.invalidate(tabNum)
                 msg = f'Selected range [{value[0]:.6f}, {value[1]:.6f}]'
                 return msg
             
@@ -1350,8 +5889,7 @@ class DashLinePlot():
             )
             def reset_xSlider(nclicks, tab):
                 tabNum = int(tab.split(' ')[1])
-                low = sliderMinValues[tabNum]
-                hi = sliderMaxValues[tabNum]
+                low, hi = self.sliderLimits(tabNum)
                 limit = [low, hi]
                 return limit, '', ''
 
@@ -1376,17 +5914,21 @@ class DashLinePlot():
         sys.argv.append("--disable-web-security")
 
         self.loadConfig(configfile)
+        markStartup('config loaded')
 
         # load all data to be available in the class 
         # all the data files, but only once into a dict with filename as key
         
         if self.loadData():           
+            markStartup('data loaded')
+
             # prepare all required graph sets
             self.prepareGraphs()
-
+            markStartup('graphs prepared')
         
             # now create the page we want to render
             pageLayout = self.makePage() 
+            markStartup('page created')
 
             # The Python threading API defines two kinds of threads: daemons and non-daemons. 
             # A Python program is defined to end when all non-daemons are done. 
@@ -1410,77 +5952,162 @@ class DashLinePlot():
         return flaskServerRunning       
     
 ##########################################
-#
-class WebViewer(QtWebEngineWidgets.QWebEngineView):
+# 
+def exportWorker(figdict, fbasename):
     """
-    creates a web engine view widget
+    Write one figure to an html file, used in the process pool of the --export-only mode.
+
+    Args:
+        | figdict (dict): figure data
+        | fbasename (string): file base name.
+
+    Returns:
+        | filename (string): name of the html file written.
+        | seconds (double): time taken to write the file.
+        | nbytes (int): size of the file written.
 
     """
-    def __init__(self, parent, url):
-        """
-        Initialise the web browser widget
+    tStart = time.perf_counter()
+    writeGraphHtml(figdict, fbasename)
+    seconds = time.perf_counter() - tStart
 
-        Args:
-            | parent (GUI element): the parent GUI element where this widget is included.
-            | url (url):the url to be browsed
+    filename = f'{fbasename}.html'
+    return filename, seconds, os.path.getsize(filename)
 
-        Returns:
-            | None.
+##########################################
+# 
+def envelopeWorker(filename, xVarName, columns, grid, limits=None):
+    """
+    Read one run and resample columns onto the common x-values, used in the process pool of the envelope statistics.
 
-        """
-        super().__init__(parent)
+    Args:
+        | filename (string): data file name of the run.
+        | xVarName (string): x-value column.
+        | columns (list): column names.
+        | grid (np.array): common x-values.
+        | limits (dict): (lower, upper) arrays of each column, to return histogram bin numbers instead of values.
 
-        # ensure the complete view has the same style
-        # if this is not present, the tabs as well as top and bottom markdown
-        # have different style - only experienced when used as module 
-        self.setStyleSheet(external_stylesheets[0])
+    Returns:
+        | result (dict): for each column the values on the grid (NaN outside the run), or the bin 
+        |     numbers (-1 where no value) when limits are given.
 
-        # create the page
-        page = QtWebEngineWidgets.QWebEnginePage(self)
-        self.setPage(page)
-        self.setUrl(QtCore.QUrl(url))
+    """
+    store = DashLinePlot().loadDatafile(filename)
+    *alignMap, order = storeAlignmentMap(store, xVarName, grid, 'linear')
+    result = {}
+    for column in columns:
+        values = applyAlignment(alignMap, store[column] if order is None else store[column][order])
+        if limits is not None:
+            lower, upper = limits[column]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                scaled = np.where(upper > lower, (values - lower) / (upper - lower) * envelopeBins, 0.)
+            binNum = np.clip(np.nan_to_num(scaled, nan=0.), 0, envelopeBins - 1).astype(np.int16)
+            binNum[np.isnan(values)] = -1
+            values = binNum
+        result[column] = values
+    return result
 
 ##########################################
 # 
-class DashPlotWindow(QtWidgets.QMainWindow, QtWidgets.QWidget):    
+def defineQtClasses():
+    """
+    Define the Qt window classes, called by importQt() once the Qt bindings are loaded.
+
+    Args:
+        | None.
+
+    Returns:
+        | None.
+
     """
-    creates a window to run the dash server in
-    """                     
+    global WebViewer, DashPlotWindow
+
+    ##########################################
+    #
+    class WebViewer(QtWebEngineWidgets.QWebEngineView):
+        """
+        creates a web engine view widget
 
-    def __init__(self, port, title):
         """
-        Initialise the window
+        def __init__(self, parent, url):
+            """
+            Initialise the web browser widget
 
-        Args:
-            | port (int): the port to be used by the server.
-            | title (string): window title
+            Args:
+                | parent (GUI element): the parent GUI element where this widget is included.
+                | url (url):the url to be browsed, None to set the url later
 
-        Returns:
-            | None.
+            Returns:
+                | None.
+
+            """
+            super().__init__(parent)
+
+            # ensure the complete view has the same style
+            # if this is not present, the tabs as well as top and bottom markdown
+            # have different style - only experienced when used as module 
+            self.setStyleSheet(external_stylesheets[0])
+
+            # create the page
+            page = QtWebEngineWidgets.QWebEnginePage(self)
+            self.setPage(page)
+            if url is not None:
+                self.setUrl(QtCore.QUrl(url))
 
+    ##########################################
+    # 
+    class DashPlotWindow(QtWidgets.QMainWindow, QtWidgets.QWidget):    
         """
-        super().__init__()
-        self.setWindowTitle(title)
-        self.setMinimumSize(640,640)
+        creates a window to run the dash server in
+        """                     
+
+        def __init__(self, port, title, loadPage=True):
+            """
+            Initialise the window
+
+            Args:
+                | port (int): the port to be used by the server.
+                | title (string): window title
+                | loadPage (bolean): browse to the server immediately (default True),
+                |     if False the page is loaded later with loadPage()
+
+            Returns:
+                | None.
+
+            """
+            super().__init__()
+            self.setWindowTitle(title)
+            self.setMinimumSize(640,640)
+            self.url = f'http://127.0.0.1:{port}'
         
-        # browser widget
-        browserWidget = WebViewer(self,f'http://127.0.0.1:{port}')
-        browserWidget.setSizePolicy(QtWidgets.QSizePolicy.Maximum, QtWidgets.QSizePolicy.Maximum)
+            # browser widget
+            browserWidget = WebViewer(self, self.url if loadPage else None)
+            browserWidget.setSizePolicy(QtWidgets.QSizePolicy.Maximum, QtWidgets.QSizePolicy.Maximum)
         
-        # set browser as central widget
-        self.setCentralWidget(browserWidget)
+            # set browser as central widget
+            self.setCentralWidget(browserWidget)
     
-    def closeEvent(self, event):
-        """
-        captures the window close event [to be used later if required]
-        """
-        pass
-        # print('The dash window received a close event')
+        def loadPage(self):
+            """
+            browse to the server, used when the window was shown before the server was started
+            """
+            self.centralWidget().setUrl(QtCore.QUrl(self.url))
+
+        def closeEvent(self, event):
+            """
+            captures the window close event [to be used later if required]
+            """
+            pass
+            # print('The dash window received a close event')
 
 ##########################################
 # when run on the commandline this code will be executed
 #
 if __name__ == "__main__":
+
+    # required for the process pool when packaged with PyInstaller
+    import multiprocessing
+    multiprocessing.freeze_support()
        
     try:
         from docopt import docopt
@@ -1495,43 +6122,70 @@ if __name__ == "__main__":
     options = """dash-lineplot.py: Plotly dash line plotting utility.
 
         Usage:
-          dash-lineplot.py [--configfile=<configFilename>] 
+          dash-lineplot.py [--configfile=<configFilename>] [--profile-startup]
+          dash-lineplot.py [--configfile=<configFilename>] --export-only [--workers=<n>] [--profile-startup]
           dash-lineplot.py -h | --help 
  
         Options:
           -h, --help                           Show this screen.
           -f <configFilename>, --configfile <configFilename>    Excel config filename [default: ./dash-config.xlsx].
+          --export-only                        Write the html graph files and exit, no window or server.
+          -w <n>, --workers <n>                Number of export processes [default: all processors].
+          --profile-startup                    Print the import times and startup milestones.
  
     """
     # process commandline arguments
     optionArguments = docopt(options)
 
+    # time all imports from here on
+    profileStartup = optionArguments["--profile-startup"]
+    if profileStartup:
+        profileImports()
+
     # always use callbacks
     # required for the slider, click data and rectangle tool to work
     useCallbacks = True
     # Excel file that defines the plots
     configfile = optionArguments["--configfile"]
 
-    # extract the page title from the config file
-    # read the config file
-    cxls = pd.ExcelFile(configfile)
-    dfPlotterHeader = pd.read_excel(cxls, 'header')
-    dfPlotterHeader = dfPlotterHeader.set_index('Variable')
-    pagetitle = dfPlotterHeader.loc['Pagetitle','Value'] if 'Pagetitle' in dfPlotterHeader.index else 'Dash flask server for plotting'
+    # headless batch export of the html graph files
+    if optionArguments["--export-only"]:
+        workers = None
+        if optionArguments["--workers"].isdigit():
+            workers = int(optionArguments["--workers"])
+        dashlineplotter = DashLinePlot()
+        success = dashlineplotter.exportGraphs(configfile, workers)
+        if profileStartup:
+            printStartupReport()
+        sys.exit(0 if success else 1)
 
     # port used for the local Flask server
     port = '8050' 
            
     # start main app 
+    importQt()
     appMain = QtWidgets.QApplication(sys.argv)
        
     # create new window and activate
-    main_widget = DashPlotWindow(port,pagetitle)
+    # the window is shown before the config and data are loaded, 
+    # the page is only loaded once the server is started
+    main_widget = DashPlotWindow(port, 'Dash flask server for plotting', loadPage=False)
     main_widget.show()
+    appMain.processEvents()
+    markStartup('window shown')
 
     # serve the required data to this window
     dashlineplotter = DashLinePlot()
     dashlineplotter.runPlotter(port, configfile, useCallbacks)
+
+    # the page title is taken from the config file header sheet
+    if 'Pagetitle' in dfPlotterHeader.index:
+        main_widget.setWindowTitle(dfPlotterHeader.loc['Pagetitle','Value'])
+    main_widget.loadPage()
+    markStartup('page requested')
+
+    if profileStartup:
+        printStartupReport()
     
     # exit when main window closes
     sys.exit(appMain.exec_())
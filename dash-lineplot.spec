@@ -57,7 +57,8 @@ added_files = [
 a = Analysis(['dash-lineplot.py'],
              pathex=['C:\\Temp'],
              datas=added_files,
-             hiddenimports=['PyQt5.QtWebEngineWidgets','PyQt5.QtNetwork','PyQt5.QtWebEngineCore', 'PyQt5.QtWebChannel','PyQt5.QtPrintSupport'],
+             hiddenimports=['PyQt5.QtWebEngineWidgets','PyQt5.QtNetwork','PyQt5.QtWebEngineCore', 'PyQt5.QtWebChannel','PyQt5.QtPrintSupport',
+                            'pandas', 'numpy', 'openpyxl'],   # imported on first use via LazyModule, not found by the analysis
              hookspath=[],
              runtime_hooks=[],
              excludes=['tkinter'],